@@ -1,10 +1,17 @@
 from django.contrib import admin
-from .models import CategoriaMaterial, Material, EntradaMaterial, Produto, ItemComposicao, Venda, Cliente
+from django.db.models import F
+from django.utils import timezone
+from .models import CategoriaMaterial, Material, EntradaMaterial, Produto, ItemComposicao, Venda, Cliente, MovimentacaoEstoque, AlertaEstoque, SaldoEstoque, ResumoVendasDia, ResumoVendasMes, MensagemWhatsapp, Trabalho
+from .mensagens import reenviar
+from .precificacao import CENTAVOS
+from .trabalhos import situacao_da_fila
 
 # Inline para facilitar adicionar materiais na tela do Produto
 class ItemComposicaoInline(admin.TabularInline):
     model = ItemComposicao
     extra = 1
+    # Busca do material em vez de uma lista com todos os materiais em cada linha
+    autocomplete_fields = ('material',)
 
 # Inline para facilitar adicionar itens na tela da Venda (se necessário no futuro)
 class ItemVendaInline(admin.TabularInline):                
@@ -19,28 +26,68 @@ class CategoriaMaterialAdmin(admin.ModelAdmin):
 
 @admin.register(Material)
 class MaterialAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'categoria', 'quantidade_estoque', 'unidade_medida', 'preco_unitario')
+    list_display = ('nome', 'categoria', 'quantidade_estoque', 'estoque_minimo', 'estoque_baixo', 'unidade_medida', 'preco_unitario')
     search_fields = ('nome',)
-    list_filter = ('categoria', 'unidade_medida')
+    # Coluna gerada: sem o filtro explícito, o admin buscaria os valores distintos na tabela
+    list_filter = (('estoque_baixo', admin.BooleanFieldListFilter), 'categoria', 'unidade_medida')
+    list_select_related = ('categoria',)
+    autocomplete_fields = ('categoria',)
+    # Pelo índice (nome, id)
+    ordering = ('nome', 'id')
+    show_full_result_count = False
 
 @admin.register(EntradaMaterial)
 class EntradaMaterialAdmin(admin.ModelAdmin):
-    list_display = ('material', 'quantidade_adicionada', 'data_entrada')
-    list_filter = ('material', 'data_entrada')
+    list_display = ('material', 'quantidade_adicionada', 'preco_unitario_na_compra', 'data_entrada')
+    # Material pela busca, não como filtro lateral (seria um link por material cadastrado)
+    list_filter = ('data_entrada',)
+    search_fields = ('material__nome',)
+    list_select_related = ('material',)
+    autocomplete_fields = ('material',)
+    date_hierarchy = 'data_entrada'
+    ordering = ('-data_entrada', '-id')
+    show_full_result_count = False
 
 @admin.register(Produto)
 class ProdutoAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'tempo_trabalho_horas', 'margem_lucro_percentual', 'get_preco_final_sugerido')
+    list_display = ('nome', 'tempo_trabalho_horas', 'margem_lucro_percentual', 'materiais', 'mao_de_obra', 'custo_base', 'preco_sugerido', 'lucro_liquido', 'vendido')
     search_fields = ('nome',)
     inlines = [ItemComposicaoInline]
+    show_full_result_count = False
     
-    # readonly_fields = ('preco_final',) # Opcional: torna o campo preco_final não editável manualmente
+    # Valores calculados: mantidos pelo sistema, só leitura no admin
+    readonly_fields = ('custo_materiais', 'custo_mao_de_obra', 'preco_final', 'preco_sugerido', 'lucro_liquido')
+
+    # Colunas do detalhamento do preço (atelier/precificacao.py), calculado uma vez por linha
+    @admin.display(description="Materiais (R$)", ordering='custo_materiais')
+    def materiais(self, produto):
+        return produto.precificacao.custo_materiais.quantize(CENTAVOS)
+
+    @admin.display(description="Mão de Obra (R$)", ordering='custo_mao_de_obra')
+    def mao_de_obra(self, produto):
+        return produto.precificacao.custo_mao_de_obra
+
+    @admin.display(description="Custo Base (R$)", ordering='custo_base_anotado')
+    def custo_base(self, produto):
+        return produto.precificacao.custo_base
+
+    @admin.display(description="Vendido", boolean=True, ordering='vendido')
+    def vendido(self, produto):
+        return produto.vendido
+
+    def get_queryset(self, request):
+        # Situação de venda e custo base no próprio SELECT da página (colunas ordenáveis, sem consulta por linha)
+        return super().get_queryset(request).com_situacao_venda().annotate(
+            custo_base_anotado=F('custo_materiais') + F('custo_mao_de_obra'),
+        )
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'telefone', 'email', 'data_cadastro')
+    list_display = ('nome', 'telefone', 'email', 'quantidade_compras', 'total_gasto', 'ultima_compra', 'data_cadastro')
     search_fields = ('nome', 'telefone', 'email')
-    ordering = ('-data_cadastro',)
+    # Pelo índice (data_cadastro, id)
+    ordering = ('-data_cadastro', '-id')
+    show_full_result_count = False
     # inlines = [ItemVendaInline] # Opcional: mostra as vendas dentro do cliente no admin
 
 @admin.register(Venda)
@@ -48,4 +95,115 @@ class VendaAdmin(admin.ModelAdmin):
     list_display = ('cliente', 'produto', 'data_venda', 'valor_venda', 'metodo_pagamento')
     list_filter = ('metodo_pagamento', 'data_venda')
     search_fields = ('cliente__nome', 'produto__nome')
-    date_hierarchy = 'data_venda'
\ No newline at end of file
+    date_hierarchy = 'data_venda'
+    list_select_related = ('cliente', 'produto')
+    autocomplete_fields = ('cliente', 'produto')
+    # Pelo índice (data_venda, id)
+    ordering = ('-data_venda', '-id')
+    show_full_result_count = False
+
+@admin.register(MovimentacaoEstoque)
+class MovimentacaoEstoqueAdmin(admin.ModelAdmin):
+    list_display = ('material', 'tipo', 'quantidade', 'data', 'produto_id', 'entrada_id')
+    list_filter = ('tipo',)
+    date_hierarchy = 'data'
+    list_select_related = ('material',)
+    show_full_result_count = False
+
+    # Histórico somente de inclusão: nada pode ser criado, alterado ou excluído pelo admin
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(AlertaEstoque)
+class AlertaEstoqueAdmin(admin.ModelAdmin):
+    list_display = ('material', 'tipo', 'quantidade_estoque', 'estoque_minimo', 'data')
+    list_filter = ('tipo',)
+    list_select_related = ('material',)
+    # Pelo índice (data, id)
+    ordering = ('-data', '-id')
+    show_full_result_count = False
+
+    # Registradas pelas movimentações e pelo cadastro do material: só leitura no admin
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(SaldoEstoque)
+class SaldoEstoqueAdmin(admin.ModelAdmin):
+    list_display = ('material', 'data', 'quantidade')
+    date_hierarchy = 'data'
+    list_select_related = ('material',)
+
+
+# Resumos são mantidos pelas vendas (ver atelier/resumos.py): só leitura no admin
+class ResumoVendasAdmin(admin.ModelAdmin):
+    list_display = ('metodo_pagamento', 'quantidade', 'receita', 'lucro')
+    list_filter = ('metodo_pagamento',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ResumoVendasDia)
+class ResumoVendasDiaAdmin(ResumoVendasAdmin):
+    list_display = ('dia',) + ResumoVendasAdmin.list_display
+    date_hierarchy = 'dia'
+
+@admin.register(ResumoVendasMes)
+class ResumoVendasMesAdmin(ResumoVendasAdmin):
+    list_display = ('mes',) + ResumoVendasAdmin.list_display
+    date_hierarchy = 'mes'
+
+
+@admin.register(MensagemWhatsapp)
+class MensagemWhatsappAdmin(admin.ModelAdmin):
+    list_display = ('chave', 'telefone', 'situacao', 'tentativas', 'proxima_tentativa', 'enviada_em')
+    list_filter = ('situacao',)
+    search_fields = ('chave', 'telefone')
+    date_hierarchy = 'criada_em'
+    readonly_fields = ('chave', 'venda', 'telefone', 'texto', 'tentativas', 'ultimo_erro', 'criada_em', 'enviada_em')
+    actions = ['reenviar_mensagens']
+
+    @admin.action(description="Reenviar as mensagens selecionadas")
+    def reenviar_mensagens(self, request, queryset):
+        quantidade = reenviar(queryset)
+        self.message_user(request, f"{quantidade} mensagem(ns) de volta na fila de envio.")
+
+
+@admin.register(Trabalho)
+class TrabalhoAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'situacao', 'executar_em', 'tentativas', 'reservado_por', 'concluido_em')
+    list_filter = ('situacao', 'nome')
+    search_fields = ('nome', 'chave')
+    date_hierarchy = 'executar_em'
+    readonly_fields = ('tentativas', 'reservado_por', 'reservado_ate', 'resultado', 'ultimo_erro', 'criado_em', 'concluido_em')
+    actions = ['tentar_de_novo']
+    # Resumo da fila (pendentes, atrasados, falhas) acima da lista
+    change_list_template = 'admin/atelier/trabalho/change_list.html'
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'situacao_da_fila': situacao_da_fila()}
+        return super().changelist_view(request, extra_context)
+
+    @admin.action(description="Executar de novo os trabalhos selecionados")
+    def tentar_de_novo(self, request, queryset):
+        quantidade = queryset.exclude(situacao=Trabalho.EXECUTANDO).update(
+            situacao=Trabalho.PENDENTE, tentativas=0, executar_em=timezone.now(), ultimo_erro='',
+        )
+        self.message_user(request, f"{quantidade} trabalho(s) de volta na fila.")
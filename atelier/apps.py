@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class AtelierConfig(AppConfig):
     name = "atelier"
+
+    def ready(self):
+        # Registra os receivers que invalidam o cache dos totais do dashboard
+        # e os que mantêm os resumos de vendas, o índice de busca, as versões das
+        # fotos, os recibos, a caixa de saída do WhatsApp e as métricas do estoque
+        from atelier import dashboard, resumos, busca, imagens, recibos, mensagens, metricas  # noqa: F401
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Nome por conteúdo: <pasta>/<2 primeiros dígitos>/<sha256>.<extensão>; as versões
+# reduzidas (atelier/imagens.py) acrescentam -<largura> ao mesmo nome
+PADRAO_NOME_POR_CONTEUDO = re.compile(r'^(?P<hash>[0-9a-f]{64})(?P<largura>-\d+)?\.[a-z0-9]+$')
+
+EXTENSAO_VALIDA = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+TAMANHO_PEDACO = 64 * 1024
+
+# Pasta das fotos dos produtos (upload_to dos campos de imagem)
+PASTA_FOTOS = 'produtos'
+
+# Arquivos mais novos que isso não são coletados: o upload é gravado antes de o produto ser salvo
+CARENCIA_COLETA = 60 * 60  # segundos
+
+
+@deconstructible(path='atelier.armazenamento.ArmazenamentoPorConteudo')
+class ArmazenamentoPorConteudo(FileSystemStorage):
+    """
+    Grava cada arquivo com o nome do SHA-256 do conteúdo. A mesma foto enviada
+    na frente e no verso, ou em dois produtos, ocupa um arquivo só; e um nome
+    nunca muda de conteúdo, então o navegador pode guardá-lo para sempre.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final sai do conteúdo em _save(): não há colisão a evitar
+        return name
+
+    def _nome_final(self, pasta, hash_conteudo, extensao):
+        return '/'.join(filter(None, [pasta, hash_conteudo[:2], f'{hash_conteudo}{extensao}']))
+
+    def _save(self, name, content):
+        pasta, original = os.path.split(name)
+        extensao = os.path.splitext(original)[1].lower()
+        if not EXTENSAO_VALIDA.match(extensao):
+            extensao = ''
+        diretorio = self.path(pasta)
+        os.makedirs(diretorio, exist_ok=True)
+
+        soma = hashlib.sha256()
+        content.seek(0)
+        if hasattr(content, 'temporary_file_path'):
+            # Upload grande, já em arquivo temporário: lê para o hash e move
+            for pedaco in content.chunks(TAMANHO_PEDACO):
+                soma.update(pedaco)
+            temporario = None
+        else:
+            # Upload em memória: calcula o hash enquanto grava (uma passada só)
+            descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+            try:
+                with os.fdopen(descritor, 'wb') as arquivo:
+                    for pedaco in content.chunks(TAMANHO_PEDACO):
+                        soma.update(pedaco)
+                        arquivo.write(pedaco)
+            except BaseException:
+                os.unlink(temporario)
+                raise
+
+        nome = self._nome_final(pasta, soma.hexdigest(), extensao)
+        caminho = self.path(nome)
+        if os.path.exists(caminho):
+            # Conteúdo já guardado: o arquivo novo é descartado. A data é renovada
+            # para a coleta de órfãos não apagar o arquivo antes de o produto ser salvo
+            if temporario:
+                os.unlink(temporario)
+            os.utime(caminho)
+            return nome
+
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        if temporario:
+            # Renomear é atômico: quem lê nunca vê o arquivo pela metade
+            os.replace(temporario, caminho)
+        else:
+            file_move_safe(content.temporary_file_path(), caminho, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(caminho, self.file_permissions_mode)
+        return nome
+
+
+def e_nome_por_conteudo(nome):
+    """O arquivo (ou uma versão reduzida dele) tem nome de hash: o conteúdo nunca muda"""
+    return PADRAO_NOME_POR_CONTEUDO.match(os.path.basename(nome)) is not None
+
+
+def hash_do_nome(nome):
+    """O SHA-256 do conteúdo, se o nome é o do arquivo original (não de uma versão reduzida)"""
+    casamento = PADRAO_NOME_POR_CONTEUDO.match(os.path.basename(nome))
+    if casamento and not casamento['largura']:
+        return casamento['hash']
+    return None
+
+
+# --- COLETA DE ÓRFÃOS ---
+def _arquivos(pasta):
+    """(nome relativo à media, caminho, stat) de cada arquivo sob a pasta"""
+    raiz = os.path.join(settings.MEDIA_ROOT, pasta)
+    for diretorio, _subpastas, arquivos in os.walk(raiz):
+        for arquivo in arquivos:
+            caminho = os.path.join(diretorio, arquivo)
+            nome = os.path.relpath(caminho, settings.MEDIA_ROOT).replace(os.sep, '/')
+            try:
+                yield nome, caminho, os.stat(caminho)
+            except FileNotFoundError:
+                # Temporário renomeado enquanto a pasta era percorrida
+                continue
+
+
+def arquivos_orfaos(referenciados, pasta_derivados, carencia=CARENCIA_COLETA):
+    """
+    Gera (caminho, tamanho) dos arquivos da media que nenhum produto usa:
+    fotos fora de `referenciados`, versões reduzidas de fotos que não estão
+    lá e temporários esquecidos. Arquivos recentes (carência) são poupados.
+    """
+    limite = time.time() - carencia
+    bases = {os.path.splitext(nome)[0] for nome in referenciados}
+    prefixo_derivados = f'{pasta_derivados}/'
+    for pasta in (PASTA_FOTOS, pasta_derivados):
+        for nome, caminho, info in _arquivos(pasta):
+            if info.st_mtime > limite:
+                continue
+            if nome.endswith('.tmp'):
+                usado = False
+            elif nome.startswith(prefixo_derivados):
+                # derivados/<base da foto>-<largura>.<extensão>
+                base = nome[len(prefixo_derivados):].rsplit('-', 1)[0]
+                usado = base in bases
+            else:
+                usado = nome in referenciados
+            if not usado:
+                yield caminho, info.st_size
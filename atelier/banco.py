@@ -0,0 +1,103 @@
+from datetime import datetime
+from django.conf import settings
+from django.db import connections, models, DEFAULT_DB_ALIAS
+from django.db.models import Exists
+from django.utils import timezone
+
+
+def atualizar_em_massa(objetos, campos):
+    """
+    Grava os campos dos objetos (todos do mesmo modelo) com um único UPDATE
+    parametrizado executado via executemany. O bulk_update do Django monta um
+    CASE WHEN por campo e gasta mais tempo gerando a SQL do que o banco leva
+    para executá-la.
+    """
+    if not objetos:
+        return
+    meta = objetos[0]._meta
+    # Resolve o proxy "connection" uma vez só: é consultado a cada valor preparado
+    connection = connections[DEFAULT_DB_ALIAS]
+    qn = connection.ops.quote_name
+    campos = [meta.get_field(nome) for nome in campos]
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        qn(meta.db_table),
+        ', '.join(f'{qn(campo.column)} = %s' for campo in campos),
+        qn(meta.pk.column),
+    )
+    parametros = [
+        [campo.get_db_prep_save(getattr(objeto, campo.attname), connection) for campo in campos] + [objeto.pk]
+        for objeto in objetos
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def inserir_em_massa(modelo, campos, linhas):
+    """
+    Insere as linhas (tuplas com os valores dos campos, na ordem dada) com um
+    único INSERT parametrizado via executemany, sem instanciar os modelos.
+    Para quando não é preciso saber os ids gerados.
+    """
+    if not linhas:
+        return
+    connection = connections[DEFAULT_DB_ALIAS]
+    qn = connection.ops.quote_name
+    campos = [modelo._meta.get_field(nome) for nome in campos]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        qn(modelo._meta.db_table),
+        ', '.join(qn(campo.column) for campo in campos),
+        ', '.join(['%s'] * len(campos)),
+    )
+    parametros = [
+        [campo.get_db_prep_save(valor, connection) for campo, valor in zip(campos, linha)]
+        for linha in linhas
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def _proximo_periodo(inicio, tipo):
+    if tipo == 'year':
+        return inicio.replace(year=inicio.year + 1)
+    if tipo == 'month':
+        return inicio.replace(year=inicio.year + inicio.month // 12, month=inicio.month % 12 + 1)
+    return datetime.fromordinal(inicio.toordinal() + 1).replace(tzinfo=inicio.tzinfo)
+
+
+class DatasPorFaixaQuerySet(models.QuerySet):
+    """
+    datetimes() (a navegação por data do admin, date_hierarchy) sem percorrer
+    a tabela. O Django faz um SELECT DISTINCT da data truncada no fuso, que no
+    SQLite chama uma função Python por linha; aqui cada ano, mês ou dia entre
+    a primeira e a última data vira um EXISTS por faixa, que usa o índice da
+    coluna, todos numa consulta só. Devolve a lista dos períodos com registros.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        base = self.order_by().filter(**{f'{field_name}__isnull': False})
+        # Primeira e última pelo índice (MIN e MAX na mesma consulta percorreriam tudo)
+        primeira = base.order_by(field_name).values_list(field_name, flat=True).first()
+        if primeira is None:
+            return []
+        ultima = base.order_by(f'-{field_name}').values_list(field_name, flat=True).first()
+
+        fuso = (tzinfo or timezone.get_current_timezone()) if settings.USE_TZ else None
+        local = timezone.localtime(primeira, fuso) if fuso else primeira
+        inicio = datetime(
+            local.year, local.month if kind != 'year' else 1, local.day if kind == 'day' else 1, tzinfo=fuso,
+        )
+        periodos = []
+        while inicio <= ultima:
+            fim = _proximo_periodo(inicio, kind)
+            periodos.append((inicio, fim))
+            inicio = fim
+
+        faixas = {
+            f'p{numero}': Exists(base.filter(**{f'{field_name}__gte': inicio, f'{field_name}__lt': fim}))
+            for numero, (inicio, fim) in enumerate(periodos)
+        }
+        com_registros = base.annotate(**faixas).values(*faixas)[0]
+        datas = [inicio for numero, (inicio, _fim) in enumerate(periodos) if com_registros[f'p{numero}']]
+        return datas if order == 'ASC' else datas[::-1]
@@ -0,0 +1,279 @@
+import re
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.urls import reverse
+
+from atelier.models import Produto, Material, CategoriaMaterial, Cliente
+from atelier.telefones import formatar_telefone, prefixos_da_consulta
+
+# Tabela virtual FTS5 (criada na migração 0021, só no SQLite). O tokenizador
+# unicode61 com remove_diacritics 2 ignora acentos: "botao" encontra "Botão".
+# prefix='2 3' mantém índices extras de prefixo para a busca enquanto se digita.
+TABELA = 'atelier_busca'
+
+SQL_CRIAR_TABELA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+    "tipo UNINDEXED, objeto_id UNINDEXED, titulo, conteudo, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# Peso do título e do conteúdo no bm25 (colunas tipo e objeto_id não contam)
+PESOS_BM25 = (0.0, 0.0, 10.0, 1.0)
+
+LIMITE_RESULTADOS = 20
+
+# O bm25 é calculado para cada linha encontrada (~1µs por linha). Acima disso
+# a consulta é ampla demais para a ordem importar: devolve os indexados por
+# último que têm o termo no título, sem ranquear
+LIMITE_RANQUEAMENTO = 5000
+
+TAMANHO_LOTE = 2000
+
+# Sugestões do autocompletar de clientes no registro de venda
+LIMITE_AUTOCOMPLETAR = 10
+
+TIPOS = {
+    'produto': ('Produto', 'fas fa-box-open'),
+    'material': ('Material', 'fas fa-layer-group'),
+    'categoria': ('Categoria', 'fas fa-folder'),
+    'cliente': ('Cliente', 'fas fa-user'),
+}
+
+# O rowid de cada linha do índice sai do tipo e do id do objeto
+# (id * 4 + código do tipo). Assim atualizar ou remover um objeto é uma busca
+# pelo rowid, e não uma varredura do índice inteiro pelas colunas UNINDEXED.
+CODIGOS_TIPO = {'produto': 0, 'material': 1, 'categoria': 2, 'cliente': 3}
+
+
+def _rowid(tipo, objeto_id):
+    return objeto_id * len(CODIGOS_TIPO) + CODIGOS_TIPO[tipo]
+
+
+def disponivel():
+    """A busca por FTS5 só existe no SQLite; nos demais bancos cai no icontains"""
+    return connection.vendor == 'sqlite'
+
+
+# --- O QUE VAI PARA O ÍNDICE ---
+def _documentos_produtos(produtos):
+    for id, nome, descricao in produtos.values_list('id', 'nome', 'descricao'):
+        yield 'produto', id, nome, descricao or ''
+
+
+def _documentos_materiais(materiais):
+    # O nome da categoria entra no conteúdo: "tecido" também encontra os materiais da categoria
+    for id, nome, categoria in materiais.values_list('id', 'nome', 'categoria__nome'):
+        yield 'material', id, nome, categoria or ''
+
+
+def _documentos_categorias(categorias):
+    for id, nome in categorias.values_list('id', 'nome'):
+        yield 'categoria', id, nome, ''
+
+
+def _documentos_clientes(clientes):
+    for id, nome, email, endereco in clientes.values_list('id', 'nome', 'email', 'endereco'):
+        yield 'cliente', id, nome, ' '.join(filter(None, [email, endereco]))
+
+
+DOCUMENTOS = {
+    Produto: ('produto', _documentos_produtos),
+    Material: ('material', _documentos_materiais),
+    CategoriaMaterial: ('categoria', _documentos_categorias),
+    Cliente: ('cliente', _documentos_clientes),
+}
+
+
+# --- MANUTENÇÃO DO ÍNDICE ---
+def _gravar(documentos):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABELA} (rowid, tipo, objeto_id, titulo, conteudo) VALUES (%s, %s, %s, %s, %s)",
+            [(_rowid(tipo, objeto_id), tipo, objeto_id, titulo, conteudo) for tipo, objeto_id, titulo, conteudo in documentos],
+        )
+
+
+def _remover(tipo, ids):
+    ids = list(ids)
+    if not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABELA} WHERE rowid IN ({', '.join(['%s'] * len(ids))})",
+            [_rowid(tipo, objeto_id) for objeto_id in ids],
+        )
+
+
+def indexar(modelo, ids):
+    """(Re)indexa os objetos do modelo com esses ids (remove e grava de novo)"""
+    if not disponivel():
+        return
+    ids = list(ids)
+    tipo, documentos = DOCUMENTOS[modelo]
+    for inicio in range(0, len(ids), TAMANHO_LOTE):
+        lote = ids[inicio:inicio + TAMANHO_LOTE]
+        with transaction.atomic():
+            _remover(tipo, lote)
+            _gravar(documentos(modelo.objects.filter(pk__in=lote)))
+
+
+def reconstruir_indice():
+    """Apaga e refaz o índice inteiro, lendo cada tabela em blocos pelo id"""
+    if not disponivel():
+        return 0
+    total = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(SQL_CRIAR_TABELA)
+            cursor.execute(f"DELETE FROM {TABELA}")
+        for modelo, (_tipo, documentos) in DOCUMENTOS.items():
+            ultimo_id = 0
+            while True:
+                lote = list(documentos(modelo.objects.filter(pk__gt=ultimo_id).order_by('pk')[:TAMANHO_LOTE]))
+                if not lote:
+                    break
+                _gravar(lote)
+                total += len(lote)
+                ultimo_id = lote[-1][1]
+    with connection.cursor() as cursor:
+        # Junta os segmentos do índice num só (consultas mais rápidas)
+        cursor.execute(f"INSERT INTO {TABELA} ({TABELA}) VALUES ('optimize')")
+    return total
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=Material)
+@receiver(post_save, sender=CategoriaMaterial)
+@receiver(post_save, sender=Cliente)
+def indexar_ao_salvar(sender, instance, **kwargs):
+    indexar(sender, [instance.pk])
+    if sender is CategoriaMaterial and not kwargs.get('created'):
+        # O nome da categoria faz parte do conteúdo dos materiais dela
+        indexar(Material, instance.materiais.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=CategoriaMaterial)
+def guardar_materiais_da_categoria(sender, instance, **kwargs):
+    instance._materiais_ids = list(instance.materiais.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=Material)
+@receiver(post_delete, sender=CategoriaMaterial)
+@receiver(post_delete, sender=Cliente)
+def remover_ao_excluir(sender, instance, **kwargs):
+    if not disponivel():
+        return
+    _remover(DOCUMENTOS[sender][0], [instance.pk])
+    if sender is CategoriaMaterial:
+        indexar(Material, getattr(instance, '_materiais_ids', []))
+
+
+# --- CONSULTA ---
+def montar_consulta_fts(texto):
+    """
+    Converte o texto digitado numa consulta FTS5 segura: cada palavra vira
+    um termo entre aspas com * (prefixo), e todas precisam aparecer.
+    'botao mad' -> '"botao"* "mad"*'
+    """
+    palavras = re.findall(r'\w+', texto)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def _url(tipo, objeto_id):
+    if tipo == 'produto':
+        return reverse('atelier:detalhar_produto', args=[objeto_id])
+    if tipo == 'material':
+        return reverse('atelier:editar_material', args=[objeto_id])
+    if tipo == 'categoria':
+        return reverse('atelier:lista_materiais') + f'?categoria={objeto_id}'
+    return reverse('atelier:detalhe_cliente', args=[objeto_id])
+
+
+def _resultado(tipo, objeto_id, titulo):
+    rotulo, icone = TIPOS[tipo]
+    return {'tipo': tipo, 'rotulo': rotulo, 'icone': icone, 'id': objeto_id, 'titulo': titulo, 'url': _url(tipo, objeto_id)}
+
+
+def buscar(texto, tipo=None, limite=LIMITE_RESULTADOS):
+    """Resultados de todos os tipos, do mais relevante (bm25) para o menos"""
+    consulta = montar_consulta_fts(texto)
+    if not consulta:
+        return []
+
+    if not disponivel():
+        return _buscar_sem_fts(texto, tipo, limite)
+
+    filtro_tipo = 'AND tipo = %s ' if tipo else ''
+    parametros_tipo = [tipo] if tipo else []
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {TABELA} WHERE {TABELA} MATCH %s {filtro_tipo}", [consulta, *parametros_tipo])
+        encontrados = cursor.fetchone()[0]
+        if encontrados <= LIMITE_RANQUEAMENTO:
+            ordem = f"bm25({TABELA}, {', '.join(map(str, PESOS_BM25))})"
+        else:
+            consulta = f'titulo : ({consulta})'
+            ordem = 'rowid DESC'
+        cursor.execute(
+            f"SELECT tipo, objeto_id, titulo FROM {TABELA} WHERE {TABELA} MATCH %s {filtro_tipo}ORDER BY {ordem} LIMIT %s",
+            [consulta, *parametros_tipo, limite],
+        )
+        linhas = cursor.fetchall()
+    return [_resultado(tipo, int(objeto_id), titulo) for tipo, objeto_id, titulo in linhas]
+
+
+def _buscar_sem_fts(texto, tipo, limite):
+    resultados = []
+    for modelo, (tipo_modelo, _documentos) in DOCUMENTOS.items():
+        if tipo and tipo != tipo_modelo:
+            continue
+        for objeto_id, nome in modelo.objects.filter(nome__icontains=texto).values_list('id', 'nome')[:limite]:
+            resultados.append(_resultado(tipo_modelo, objeto_id, nome))
+    return resultados[:limite]
+
+
+# --- CLIENTES NO CAIXA ---
+def _comecando_com(campo, prefixo):
+    """
+    Prefixo como faixa (campo >= '119' AND campo < '119:'), que usa o índice
+    do campo. O LIKE 'x%' do SQLite não diferencia maiúsculas e por isso não
+    usa índices comuns. ':' é o caractere logo depois do '9'.
+    """
+    return Cliente.objects.filter(**{f'{campo}__gte': prefixo, f'{campo}__lt': prefixo + ':'}).order_by(campo)
+
+
+def _sugestao(objeto_id, nome, telefone):
+    return {'id': objeto_id, 'nome': nome, 'telefone': formatar_telefone(telefone) if telefone else ''}
+
+
+def autocompletar_clientes(texto, limite=LIMITE_AUTOCOMPLETAR):
+    """
+    Clientes para o registro de venda. Só dígitos: prefixo do telefone, com
+    DDD ou sem ('1198' ou '98765'), cada um pelo seu índice. Com letras:
+    nome pela busca textual (sem acentos, prefixo de cada palavra).
+    """
+    texto = texto.strip()
+    if not texto:
+        return []
+
+    campos = ('id', 'nome', 'telefone')
+    if not re.search(r'[^\W\d_]', texto):
+        prefixos = [prefixo for prefixo in prefixos_da_consulta(texto) if len(prefixo) >= 2]
+        if not prefixos:
+            return []
+        # Leituras curtas de índice (LIMIT cada) em vez de um OR que ordenaria tudo
+        linhas = {}
+        for prefixo in prefixos:
+            for campo in ('telefone_normalizado', 'telefone_local'):
+                for linha in _comecando_com(campo, prefixo).values_list(*campos)[:limite]:
+                    linhas.setdefault(linha[0], linha)
+        return [_sugestao(*linha) for linha in list(linhas.values())[:limite]]
+
+    if not disponivel():
+        clientes = Cliente.objects.filter(nome__icontains=texto).order_by('nome', 'id')
+        return [_sugestao(*linha) for linha in clientes.values_list(*campos)[:limite]]
+
+    resultados = buscar(texto, 'cliente', limite)
+    telefones = dict(Cliente.objects.filter(pk__in=[resultado['id'] for resultado in resultados]).values_list('id', 'telefone'))
+    return [_sugestao(resultado['id'], resultado['titulo'], telefones.get(resultado['id'])) for resultado in resultados]
@@ -0,0 +1,203 @@
+"""
+Base sintética para medir as views com volume (python manage.py popular_banco).
+Os dados são inseridos direto em massa, sem passar pelos save() e signals;
+no fim, as colunas e tabelas derivadas (preços, resumos, estatísticas dos
+clientes, índice de busca) são recalculadas de uma vez.
+"""
+import random
+from datetime import time, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from atelier.banco import inserir_em_massa
+from atelier.models import CategoriaMaterial, Material, EntradaMaterial, Produto, ItemComposicao, Cliente, Venda
+from atelier.telefones import normalizar_telefone, numero_local
+from tarefas.models import Tarefa
+
+# Quantidade de produtos, materiais, clientes e vendas de cada escala; cada
+# produto leva ITENS_POR_PRODUTO materiais. "teste" é a base dos testes automatizados.
+ESCALAS = {
+    'teste': 40,
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+ITENS_POR_PRODUTO = 3
+# As tarefas não têm paginação: poucas, mesmo nas escalas grandes
+TAREFAS = 50
+
+# Linhas por INSERT em massa (e por transação)
+TAMANHO_BLOCO = 10_000
+
+CATEGORIAS = ['Tecidos', 'Linhas', 'Aviamentos', 'Fitas', 'Botões', 'Rendas', 'Enchimentos', 'Embalagens']
+MATERIAIS = ['Linho', 'Algodão', 'Tricoline', 'Feltro', 'Cetim', 'Renda', 'Fita', 'Botão', 'Zíper', 'Elástico', 'Manta']
+CORES = ['Cru', 'Branco', 'Azul', 'Rosa', 'Verde', 'Vermelho', 'Preto', 'Amarelo', 'Lilás', 'Floral']
+PRODUTOS = ['Bolsa', 'Necessaire', 'Almofada', 'Toalha', 'Jogo Americano', 'Avental', 'Porta-Copos', 'Estojo', 'Tapete']
+NOMES = ['Ana', 'Beatriz', 'Carla', 'Débora', 'Eduarda', 'Fernanda', 'Gabriela', 'Helena', 'Isabel', 'Júlia', 'Lúcia', 'Márcia']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Costa', 'Ferreira', 'Rodrigues', 'Almeida']
+DDDS = ['11', '21', '31', '41', '51', '53', '61', '71', '81', '85']
+METODOS = [metodo for metodo, _nome in Venda.METODO_PAGAMENTO]
+
+# As vendas se espalham pelos últimos dois anos
+PERIODO_VENDAS = timedelta(days=730)
+
+
+def quantidade_da_escala(escala):
+    """Nome de uma escala (ESCALAS) ou um número"""
+    if escala in ESCALAS:
+        return ESCALAS[escala]
+    try:
+        quantidade = int(escala)
+    except ValueError:
+        raise ValueError(f"Escala desconhecida: {escala} (opções: {', '.join(ESCALAS)} ou um número)")
+    if quantidade < 1:
+        raise ValueError("A escala precisa ser de pelo menos 1.")
+    return quantidade
+
+
+def _inserir(modelo, campos, linhas):
+    """Insere em blocos e devolve o intervalo de ids criados (contíguos: tabela só desta transação)"""
+    antes = modelo.objects.aggregate(maior=Max('pk'))['maior'] or 0
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) == TAMANHO_BLOCO:
+            with transaction.atomic():
+                inserir_em_massa(modelo, campos, bloco)
+            bloco = []
+    with transaction.atomic():
+        inserir_em_massa(modelo, campos, bloco)
+    depois = modelo.objects.aggregate(maior=Max('pk'))['maior'] or 0
+    return range(antes + 1, depois + 1)
+
+
+def gerar_dados(escala='1k', semente=42, avisar=lambda mensagem: None):
+    """
+    Cria a base sintética da escala (ex: '100k') e recalcula os dados
+    derivados. Devolve quantos registros de cada tipo foram criados.
+    """
+    from atelier.busca import disponivel, reconstruir_indice
+    from atelier.dashboard import invalidar_totais_dashboard
+    from atelier.reprecificacao import reprecificar_produtos
+    from atelier.resumos import recalcular_resumos, recalcular_estatisticas_clientes
+
+    quantidade = quantidade_da_escala(escala)
+    sorteio = random.Random(semente)
+    agora = timezone.now()
+
+    avisar("Categorias e materiais...")
+    categorias = _inserir(CategoriaMaterial, ['nome'], ([nome] for nome in CATEGORIAS))
+    unidades = [unidade for unidade, _nome in Material.UNIDADE_CHOICES]
+    materiais = _inserir(
+        Material,
+        ['nome', 'categoria', 'unidade_medida', 'preco_unitario', 'quantidade_estoque', 'estoque_minimo'],
+        (
+            (
+                f"{sorteio.choice(MATERIAIS)} {sorteio.choice(CORES)} {numero}",
+                sorteio.choice(categorias), sorteio.choice(unidades),
+                Decimal(sorteio.randint(50, 9000)) / 100, Decimal(sorteio.randint(0, 5000)) / 100, Decimal('1.00'),
+            )
+            for numero in range(1, quantidade + 1)
+        ),
+    )
+
+    # Só o registro das compras (o saldo sintético já está nos materiais)
+    entradas = _inserir(
+        EntradaMaterial,
+        ['material', 'quantidade_adicionada', 'preco_unitario_na_compra', 'data_entrada'],
+        (
+            (
+                sorteio.choice(materiais), Decimal(sorteio.randint(1, 50)),
+                Decimal(sorteio.randint(50, 9000)) / 100, agora - sorteio.random() * PERIODO_VENDAS,
+            )
+            for _numero in range(quantidade)
+        ),
+    )
+
+    avisar("Produtos e composições...")
+    produtos = _inserir(
+        Produto,
+        [
+            'nome', 'descricao', 'tempo_trabalho_horas', 'valor_hora_trabalho', 'margem_lucro_percentual',
+            'desconto_valor', 'derivados_imagens', *Produto.CAMPOS_CALCULADOS,
+        ],
+        (
+            (
+                f"{sorteio.choice(PRODUTOS)} {sorteio.choice(CORES)} {numero}", '',
+                time(sorteio.randint(0, 8), sorteio.choice([0, 15, 30, 45])),
+                Decimal(sorteio.choice([12, 15, 20, 25])), Decimal(sorteio.choice([30, 50, 80])), Decimal('0'),
+                # Valores calculados zerados: recalculados no fim, todos de uma vez
+                {}, *[Decimal('0')] * len(Produto.CAMPOS_CALCULADOS),
+            )
+            for numero in range(1, quantidade + 1)
+        ),
+    )
+    _inserir(
+        ItemComposicao,
+        ['produto', 'material', 'quantidade_utilizada'],
+        (
+            (produto_id, material_id, Decimal(sorteio.randint(100, 3000)) / 1000)
+            for produto_id in produtos
+            for material_id in sorteio.sample(materiais, min(ITENS_POR_PRODUTO, len(materiais)))
+        ),
+    )
+
+    avisar("Clientes...")
+
+    def cliente(numero):
+        telefone = f"({sorteio.choice(DDDS)}) 9{sorteio.randint(1000, 9999)}-{sorteio.randint(1000, 9999)}"
+        normalizado = normalizar_telefone(telefone)
+        return (
+            f"{sorteio.choice(NOMES)} {sorteio.choice(SOBRENOMES)} {numero}", telefone, f"cliente{numero}@exemplo.com",
+            agora - sorteio.random() * PERIODO_VENDAS, 0, 0, normalizado, numero_local(normalizado),
+        )
+
+    clientes = _inserir(
+        Cliente,
+        ['nome', 'telefone', 'email', 'data_cadastro', 'total_gasto', 'quantidade_compras', 'telefone_normalizado', 'telefone_local'],
+        (cliente(numero) for numero in range(1, quantidade + 1)),
+    )
+
+    avisar("Vendas...")
+
+    def venda():
+        valor = Decimal(sorteio.randint(2000, 40000)) / 100
+        # Uma em cada cinco vendas é para o consumidor final (sem cliente)
+        return (
+            sorteio.choice(produtos), agora - sorteio.random() * PERIODO_VENDAS, valor, sorteio.choice(METODOS),
+            sorteio.choice(clientes) if sorteio.random() < 0.8 else None, (valor * Decimal('0.6')).quantize(Decimal('0.01')),
+        )
+
+    vendas = _inserir(
+        Venda,
+        ['produto', 'data_venda', 'valor_venda', 'metodo_pagamento', 'cliente', 'custo_total'],
+        (venda() for _numero in range(quantidade)),
+    )
+
+    tarefas = _inserir(
+        Tarefa, ['titulo', 'concluida', 'data_criacao'],
+        ((f"Tarefa {numero}", sorteio.random() < 0.5, agora) for numero in range(1, TAREFAS + 1)),
+    )
+
+    avisar("Preços dos produtos...")
+    reprecificar_produtos(Produto.objects.filter(pk__gte=produtos.start))
+    avisar("Resumos de vendas e estatísticas dos clientes...")
+    recalcular_resumos()
+    recalcular_estatisticas_clientes()
+    if disponivel():
+        avisar("Índice de busca...")
+        reconstruir_indice()
+    invalidar_totais_dashboard()
+
+    return {
+        'categorias': len(categorias),
+        'materiais': len(materiais),
+        'entradas': len(entradas),
+        'produtos': len(produtos),
+        'composicoes': len(produtos) * min(ITENS_POR_PRODUTO, len(materiais)),
+        'clientes': len(clientes),
+        'vendas': len(vendas),
+        'tarefas': len(tarefas),
+    }
@@ -0,0 +1,167 @@
+import os
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum, F, Q, DecimalField
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from atelier.models import Produto, Material, Venda, ItemComposicao, EntradaMaterial, ResumoVendasMes
+
+# Os totais ficam guardados sob uma "geração": invalidar = incrementar a geração,
+# assim um recálculo que já estava em andamento grava numa chave que ninguém lê mais.
+CHAVE_GERACAO = 'atelier:dashboard:geracao'
+CHAVE_TOTAIS = 'atelier:dashboard:totais:{}'
+CHAVE_TRAVA = 'atelier:dashboard:recalculando:{}'
+
+TEMPO_CACHE = 60 * 60  # segundos
+TEMPO_TRAVA = 30  # se quem recalcula travar, outro pode assumir depois disso
+ESPERA_MAXIMA = 5  # quanto tempo os demais esperam pelo recálculo
+INTERVALO_ESPERA = 0.05
+
+
+def calcular_totais_dashboard():
+    """
+    Calcula os cards financeiros da página inicial com agregações no banco
+    (uma consulta por tabela), em vez de percorrer produtos e materiais em Python.
+    """
+    dinheiro = DecimalField(max_digits=20, decimal_places=5)
+
+    # 1. Investimento em materiais (quantidade x preço de cada material)
+    total_estoque_valor = Material.objects.aggregate(
+        total=Sum(F('quantidade_estoque') * F('preco_unitario'), output_field=dinheiro)
+    )['total'] or Decimal('0')
+
+    # 2. Potencial (produtos disponíveis) e lucro real (produtos já vendidos),
+    #    somando as colunas de preço e lucro guardadas em cada produto
+    produtos = Produto.objects.com_situacao_venda().aggregate(
+        faturamento_potencial=Sum('preco_sugerido', filter=Q(vendido=False)),
+        lucro_estimado=Sum('lucro_liquido', filter=Q(vendido=False)),
+        lucro_real_acumulado=Sum('lucro_liquido', filter=Q(vendido=True)),
+    )
+
+    # 3. Total faturado: soma dos resumos mensais (poucas linhas), não da tabela de vendas
+    total_faturado_real = ResumoVendasMes.objects.aggregate(total=Sum('receita'))['total'] or Decimal('0')
+
+    return {
+        'total_estoque_valor': total_estoque_valor,
+        'faturamento_potencial': produtos['faturamento_potencial'] or Decimal('0'),
+        'lucro_estimado': produtos['lucro_estimado'] or Decimal('0'),
+        'total_faturado_real': total_faturado_real,
+        'lucro_real_acumulado': produtos['lucro_real_acumulado'] or Decimal('0'),
+    }
+
+
+def _geracao_atual():
+    geracao = cache.get(CHAVE_GERACAO)
+    if geracao is None:
+        cache.add(CHAVE_GERACAO, 1, None)
+        geracao = cache.get(CHAVE_GERACAO, 1)
+    return geracao
+
+
+def _arquivo_trava(geracao):
+    """
+    No cache em arquivo, cache.add não é atômico entre processos (lê, vê que
+    não existe e grava): a trava passa a ser um arquivo na pasta do cache,
+    criado com O_CREAT | O_EXCL. Nos outros backends (memória, Redis) o
+    cache.add já é atômico e vale a CHAVE_TRAVA.
+    """
+    configuracao = settings.CACHES['default']
+    if not configuracao['BACKEND'].endswith('.FileBasedCache'):
+        return None
+    return os.path.join(configuracao['LOCATION'], f'dashboard-recalculando-{geracao}.trava')
+
+
+def _travar(geracao):
+    """True se esta requisição ficou com o recálculo"""
+    arquivo = _arquivo_trava(geracao)
+    if arquivo is None:
+        return cache.add(CHAVE_TRAVA.format(geracao), True, TEMPO_TRAVA)
+    os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    for _tentativa in range(2):
+        try:
+            os.close(os.open(arquivo, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(arquivo).st_mtime < TEMPO_TRAVA:
+                    return False
+                # Quem travou caiu sem soltar: a trava vencida é descartada e disputada de novo
+                os.unlink(arquivo)
+            except FileNotFoundError:
+                # Soltou entre o open e o stat
+                pass
+    return False
+
+
+def _destravar(geracao):
+    arquivo = _arquivo_trava(geracao)
+    if arquivo is None:
+        cache.delete(CHAVE_TRAVA.format(geracao))
+        return
+    try:
+        os.unlink(arquivo)
+    except FileNotFoundError:
+        pass
+
+
+def obter_totais_dashboard():
+    """
+    Devolve os totais do cache. Numa falta, apenas uma requisição recalcula
+    (ver _travar); as outras aguardam o resultado e, se a espera estourar,
+    calculam por conta própria.
+    """
+    geracao = _geracao_atual()
+    chave = CHAVE_TOTAIS.format(geracao)
+
+    totais = cache.get(chave)
+    if totais is not None:
+        return totais
+
+    if _travar(geracao):
+        try:
+            totais = calcular_totais_dashboard()
+            cache.set(chave, totais, TEMPO_CACHE)
+        finally:
+            _destravar(geracao)
+        return totais
+
+    # Outra requisição já está recalculando: espera o valor aparecer no cache
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_ESPERA)
+        totais = cache.get(chave)
+        if totais is not None:
+            return totais
+
+    return calcular_totais_dashboard()
+
+
+def invalidar_totais_dashboard():
+    """Descarta os totais em cache; o próximo acesso recalcula"""
+    try:
+        cache.incr(CHAVE_GERACAO)
+    except ValueError:
+        # Geração ainda não existe (cache vazio): não há totais a descartar
+        cache.add(CHAVE_GERACAO, 1, None)
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_save, sender=ItemComposicao)
+@receiver(post_delete, sender=ItemComposicao)
+@receiver(post_save, sender=Venda)
+@receiver(post_delete, sender=Venda)
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+@receiver(post_save, sender=EntradaMaterial)
+@receiver(post_delete, sender=EntradaMaterial)
+def invalidar_totais_ao_alterar(sender, **kwargs):
+    """
+    Qualquer mudança que afete os cards da página inicial invalida os totais,
+    depois do commit (antes disso um recálculo ainda veria os dados antigos).
+    """
+    transaction.on_commit(invalidar_totais_dashboard)
@@ -0,0 +1,85 @@
+"""
+Geração das versões reduzidas das fotos, executada nos processos do pool de
+atelier/imagens.py. Só depende do Pillow (nada de Django): os processos
+filhos importam este módulo sem carregar o projeto.
+"""
+import os
+import tempfile
+from PIL import Image, ImageOps
+
+# (extensão, formato do Pillow, opções de gravação)
+FORMATOS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+FUNDO = (255, 255, 255)
+
+
+def caminho_derivado(base, largura, extensao):
+    return f'{base}-{largura}.{extensao}'
+
+
+def _gravar(imagem, caminho, formato, opcoes):
+    """Grava num arquivo temporário e renomeia: quem lê nunca vê um arquivo pela metade"""
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            imagem.save(arquivo, formato, **opcoes)
+        # mkstemp cria o arquivo só para o dono (0600); as versões são públicas como as fotos
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def gerar_derivados(origem, base, larguras):
+    """
+    Gera as versões da foto `origem` em cada largura (sem ampliar) e em cada
+    formato, em `base`-<largura>.<extensão>. A orientação EXIF é aplicada
+    (foto de celular "deitada" sai em pé) e os metadados são descartados.
+    Devolve as larguras geradas, em ordem crescente.
+    """
+    with Image.open(origem) as imagem:
+        # JPEG: decodifica já reduzido (escala 1/2, 1/4, 1/8 do DCT) quando a
+        # foto é bem maior que a maior versão pedida; bem mais rápido que ler tudo
+        maior = max(larguras)
+        imagem.draft('RGB', (maior, maior))
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.mode in ('RGBA', 'LA', 'P'):
+            imagem = imagem.convert('RGBA')
+            fundo = Image.new('RGB', imagem.size, FUNDO)
+            fundo.paste(imagem, mask=imagem.getchannel('A'))
+            imagem = fundo
+        elif imagem.mode != 'RGB':
+            imagem = imagem.convert('RGB')
+
+        geradas = sorted({min(largura, imagem.width) for largura in larguras}, reverse=True)
+        atual = imagem
+        for largura in geradas:
+            altura = max(1, round(imagem.height * largura / imagem.width))
+            if atual.width != largura:
+                # Cada versão sai da anterior (já menor), não da foto inteira
+                atual = atual.resize((largura, altura), Image.LANCZOS, reducing_gap=3.0)
+            for extensao, formato, opcoes in FORMATOS:
+                _gravar(atual, caminho_derivado(base, largura, extensao), formato, opcoes)
+    return sorted(geradas)
+
+
+def processar(tarefas, larguras):
+    """
+    Ponto de entrada dos processos do pool. tarefas = [(campo, nome da foto,
+    caminho da foto, caminho base das versões)]; devolve {campo: (nome,
+    larguras geradas)} ou {campo: (nome, None, erro)} se a foto não abriu.
+    """
+    resultado = {}
+    for campo, nome, origem, base in tarefas:
+        try:
+            resultado[campo] = (nome, gerar_derivados(origem, base, larguras))
+        except (OSError, ValueError) as erro:
+            # Foto ausente ou corrompida: fica sem versões e a página usa a original
+            resultado[campo] = (nome, None, str(erro))
+    return resultado
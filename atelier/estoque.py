@@ -0,0 +1,206 @@
+from decimal import Decimal
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import Sum, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from atelier.banco import inserir_em_massa
+from atelier.metricas import movimentacoes_registradas
+from atelier.models import AlertaEstoque, Material, MovimentacaoEstoque, SaldoEstoque
+from atelier.trabalhos import reprecificar_em_segundo_plano
+
+
+def movimentar_estoque(material, tipo, quantidade, preco_unitario=None, **origem):
+    """
+    Único ponto que altera o saldo do estoque. O banco aplica a diferença
+    (quantidade_estoque = quantidade_estoque + X) numa transação curta que
+    mexe só nas colunas envolvidas, então gravações simultâneas no mesmo
+    material nunca se sobrescrevem. A movimentação entra no histórico na
+    mesma transação.
+    """
+    with transaction.atomic():
+        preco_alterado = False
+        if preco_unitario is not None:
+            # Só grava (e reprecifica) se o preço realmente mudou
+            preco_alterado = Material.objects.filter(pk=material.pk).exclude(
+                preco_unitario=preco_unitario
+            ).update(preco_unitario=preco_unitario) > 0
+
+        Material.objects.filter(pk=material.pk).update(quantidade_estoque=F('quantidade_estoque') + quantidade)
+        movimentacao = MovimentacaoEstoque.objects.create(
+            material_id=material.pk, tipo=tipo, quantidade=quantidade, **origem
+        )
+
+        if preco_alterado:
+            # Na mesma transação: o trabalho só existe se o novo preço foi gravado
+            reprecificar_em_segundo_plano([material.pk])
+
+        # Como estava o material logo depois do UPDATE (antes do commit, ninguém mais mexeu nele)
+        atual = Material.objects.filter(pk=material.pk).values(
+            'quantidade_estoque', 'estoque_minimo', 'estoque_baixo', 'preco_unitario'
+        ).first()
+        if atual:
+            registrar_passagens([_passagem(material.pk, quantidade, atual)])
+
+    # Atualiza o objeto em memória com o que está no banco agora
+    if atual:
+        material.quantidade_estoque = material._quantidade_estoque_original = atual['quantidade_estoque']
+        material.preco_unitario = material._preco_unitario_original = atual['preco_unitario']
+    return movimentacao
+
+
+def movimentar_estoque_em_massa(movimentacoes):
+    """
+    Versão em lote do movimentar_estoque, para importações: recebe
+    [(material_id, tipo, quantidade, origem), ...], soma as diferenças por
+    material, aplica todas com um UPDATE parametrizado (executemany) e grava
+    o histórico com um INSERT em massa, tudo na mesma transação.
+    """
+    if not movimentacoes:
+        return
+    diferencas = defaultdict(Decimal)
+    for material_id, _tipo, quantidade, _origem in movimentacoes:
+        diferencas[material_id] += quantidade
+
+    qn = connection.ops.quote_name
+    coluna = qn(Material._meta.get_field('quantidade_estoque').column)
+    sql = 'UPDATE {} SET {} = {} + %s WHERE {} = %s'.format(
+        qn(Material._meta.db_table), coluna, coluna, qn(Material._meta.pk.column)
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(diferenca, material_id) for material_id, diferenca in diferencas.items()])
+        atuais = Material.objects.filter(pk__in=diferencas).values(
+            'pk', 'quantidade_estoque', 'estoque_minimo', 'estoque_baixo'
+        )
+        registrar_passagens([_passagem(atual['pk'], diferencas[atual['pk']], atual) for atual in atuais])
+        agora = timezone.now()
+        inserir_em_massa(
+            MovimentacaoEstoque,
+            ['material', 'tipo', 'quantidade', 'data', 'entrada', 'produto'],
+            [
+                (material_id, tipo, quantidade, agora, origem.get('entrada_id'), origem.get('produto_id'))
+                for material_id, tipo, quantidade, origem in movimentacoes
+            ],
+        )
+        # O INSERT em massa não passa pelo post_save que conta as movimentações
+        movimentacoes_registradas([tipo for _material_id, tipo, _quantidade, _origem in movimentacoes])
+
+
+def _passagem(material_id, diferenca, atual):
+    # O saldo antes da movimentação é o de agora menos a diferença aplicada
+    estava_baixo = atual['quantidade_estoque'] - diferenca <= atual['estoque_minimo']
+    return material_id, estava_baixo, atual['estoque_baixo'], atual['quantidade_estoque'], atual['estoque_minimo']
+
+
+def registrar_passagens(estados):
+    """
+    Grava um AlertaEstoque para cada material que entrou ou saiu do estoque
+    baixo. estados: [(material_id, estava_baixo, esta_baixo, saldo, mínimo)],
+    com saldo e mínimo de agora. Sem passagens, não consulta o banco.
+    """
+    alertas = [
+        AlertaEstoque(
+            material_id=material_id, tipo=AlertaEstoque.ENTROU if esta_baixo else AlertaEstoque.SAIU,
+            quantidade_estoque=quantidade, estoque_minimo=minimo,
+        )
+        for material_id, estava_baixo, esta_baixo, quantidade, minimo in estados
+        if estava_baixo != esta_baixo
+    ]
+    if alertas:
+        AlertaEstoque.objects.bulk_create(alertas)
+    return alertas
+
+
+def saldo_em(material, data):
+    """
+    Saldo do material numa data: última fotografia até a data (busca no índice)
+    mais as movimentações feitas entre a fotografia e a data.
+    """
+    fotografia = (
+        SaldoEstoque.objects.filter(material=material, data__lte=data)
+        .order_by('-data')
+        .values('data', 'quantidade')
+        .first()
+    )
+
+    movimentacoes = MovimentacaoEstoque.objects.filter(material=material, data__lte=data)
+    saldo = Decimal('0')
+    if fotografia:
+        movimentacoes = movimentacoes.filter(data__gt=fotografia['data'])
+        saldo = fotografia['quantidade']
+
+    return saldo + (movimentacoes.aggregate(total=Sum('quantidade'))['total'] or Decimal('0'))
+
+
+def consumo_por_mes(material=None, inicio=None, fim=None):
+    """
+    Consumo líquido (consumo menos estornos) por material e mês, em quantidade
+    positiva: [{'material': id, 'mes': date, 'consumo': Decimal}, ...]
+    """
+    movimentacoes = MovimentacaoEstoque.objects.filter(
+        tipo__in=[MovimentacaoEstoque.CONSUMO, MovimentacaoEstoque.ESTORNO]
+    )
+    if material is not None:
+        movimentacoes = movimentacoes.filter(material=material)
+    if inicio is not None:
+        movimentacoes = movimentacoes.filter(data__gte=inicio)
+    if fim is not None:
+        movimentacoes = movimentacoes.filter(data__lt=fim)
+
+    resultado = (
+        movimentacoes.annotate(mes=TruncMonth('data'))
+        .values('material', 'mes')
+        .annotate(total=Sum('quantidade'))
+        .order_by('mes', 'material')
+    )
+    return [
+        {'material': linha['material'], 'mes': linha['mes'].date(), 'consumo': -linha['total']}
+        for linha in resultado
+    ]
+
+
+def gerar_fotografias(data=None):
+    """
+    Grava uma fotografia do saldo de cada material na data (padrão: agora),
+    partindo da fotografia anterior. Um único INSERT ... SELECT: para cada
+    material sem fotografia na data, a última fotografia até ela mais a soma
+    das movimentações depois dela (agrupadas no banco, pelo índice
+    material + data). Retorna quantas fotografias foram criadas.
+    """
+    data = data or timezone.now()
+    qn = connection.ops.quote_name
+    campo_data = SaldoEstoque._meta.get_field('data')
+    nomes = {
+        'material': qn(Material._meta.db_table),
+        'material_id': qn(Material._meta.pk.column),
+        'saldo': qn(SaldoEstoque._meta.db_table),
+        'saldo_material': qn(SaldoEstoque._meta.get_field('material').column),
+        'saldo_data': qn(campo_data.column),
+        'saldo_quantidade': qn(SaldoEstoque._meta.get_field('quantidade').column),
+        'movimentacao': qn(MovimentacaoEstoque._meta.db_table),
+        'mov_material': qn(MovimentacaoEstoque._meta.get_field('material').column),
+        'mov_data': qn(MovimentacaoEstoque._meta.get_field('data').column),
+        'mov_quantidade': qn(MovimentacaoEstoque._meta.get_field('quantidade').column),
+    }
+    sql = """
+        INSERT INTO {saldo} ({saldo_material}, {saldo_data}, {saldo_quantidade})
+        SELECT m.{material_id}, %s, COALESCE(f.{saldo_quantidade}, 0) + COALESCE(SUM(mov.{mov_quantidade}), 0)
+        FROM {material} m
+        LEFT JOIN {saldo} f ON f.{saldo_material} = m.{material_id} AND f.{saldo_data} = (
+            SELECT MAX(anterior.{saldo_data}) FROM {saldo} anterior
+            WHERE anterior.{saldo_material} = m.{material_id} AND anterior.{saldo_data} <= %s
+        )
+        LEFT JOIN {movimentacao} mov ON mov.{mov_material} = m.{material_id} AND mov.{mov_data} <= %s
+            AND (f.{saldo_data} IS NULL OR mov.{mov_data} > f.{saldo_data})
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {saldo} existente
+            WHERE existente.{saldo_material} = m.{material_id} AND existente.{saldo_data} = %s
+        )
+        GROUP BY m.{material_id}, f.{saldo_quantidade}
+    """.format(**nomes)
+    data_banco = campo_data.get_db_prep_value(data, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [data_banco] * 4)
+        return cursor.rowcount
@@ -0,0 +1,151 @@
+import csv
+import datetime
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from atelier.models import Venda, Cliente, Produto
+
+# Linhas buscadas por consulta: cada bloco é uma consulta curta (keyset por id),
+# então a exportação nunca segura a tabela inteira nem um cursor aberto
+TAMANHO_BLOCO = 2000
+
+FORMATOS = ('csv', 'jsonl')
+
+TIPOS_CONTEUDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Colunas de cada conjunto: (cabeçalho, caminho no values_list). O id vem primeiro (usado no keyset)
+COLUNAS = {
+    'vendas': [
+        ('id', 'id'),
+        ('data_venda', 'data_venda'),
+        ('produto_id', 'produto_id'),
+        ('produto', 'produto__nome'),
+        ('cliente_id', 'cliente_id'),
+        ('cliente', 'cliente__nome'),
+        ('metodo_pagamento', 'metodo_pagamento'),
+        ('valor_venda', 'valor_venda'),
+        ('observacoes', 'observacoes'),
+    ],
+    'clientes': [
+        ('id', 'id'),
+        ('nome', 'nome'),
+        ('telefone', 'telefone'),
+        ('email', 'email'),
+        ('endereco', 'endereco'),
+        ('data_cadastro', 'data_cadastro'),
+    ],
+    'produtos': [
+        ('id', 'id'),
+        ('nome', 'nome'),
+        ('custo_materiais', 'custo_materiais'),
+        ('custo_mao_de_obra', 'custo_mao_de_obra'),
+        ('margem_lucro_percentual', 'margem_lucro_percentual'),
+        ('desconto_valor', 'desconto_valor'),
+        ('preco_sugerido', 'preco_sugerido'),
+        ('lucro_liquido', 'lucro_liquido'),
+    ],
+}
+
+CONJUNTOS = tuple(COLUNAS)
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.datetime.combine(data, datetime.time.min))
+
+
+def filtrar_periodo(queryset, campo, inicio=None, fim=None):
+    """Linhas com o campo de data e hora no período (datas inclusivas, no fuso local)"""
+    if inicio:
+        queryset = queryset.filter(**{f'{campo}__gte': _inicio_do_dia(inicio)})
+    if fim:
+        queryset = queryset.filter(**{f'{campo}__lt': _inicio_do_dia(fim + datetime.timedelta(days=1))})
+    return queryset
+
+
+def filtrar_vendas(inicio=None, fim=None, metodo=None):
+    """Vendas no período (datas inclusivas, no fuso local) e no método de pagamento"""
+    vendas = filtrar_periodo(Venda.objects.all(), 'data_venda', inicio, fim)
+    if metodo:
+        vendas = vendas.filter(metodo_pagamento=metodo)
+    return vendas
+
+
+def montar_consulta(conjunto, inicio=None, fim=None, metodo=None):
+    """
+    Consulta do conjunto com os filtros. Em clientes e produtos, os filtros
+    de período e pagamento selecionam quem teve alguma venda que os atenda.
+    """
+    vendas = filtrar_vendas(inicio, fim, metodo)
+    filtrado = bool(inicio or fim or metodo)
+
+    if conjunto == 'vendas':
+        return vendas
+    if conjunto == 'clientes':
+        clientes = Cliente.objects.all()
+        return clientes.filter(Exists(vendas.filter(cliente=OuterRef('pk')))) if filtrado else clientes
+    if conjunto == 'produtos':
+        produtos = Produto.objects.all()
+        return produtos.filter(Exists(vendas.filter(produto=OuterRef('pk')))) if filtrado else produtos
+    raise ValueError(f"Conjunto desconhecido: {conjunto}")
+
+
+def iterar_blocos(queryset, caminhos, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Percorre a consulta em blocos pelo id (WHERE id > último ORDER BY id LIMIT n),
+    trazendo só as tuplas de valores, sem instanciar os modelos.
+    """
+    ultimo_id = 0
+    while True:
+        bloco = list(queryset.filter(pk__gt=ultimo_id).order_by('pk').values_list(*caminhos)[:tamanho_bloco])
+        if not bloco:
+            return
+        yield bloco
+        ultimo_id = bloco[-1][0]
+
+
+def _formatar(valor):
+    if isinstance(valor, datetime.datetime):
+        return timezone.localtime(valor).isoformat()
+    return valor
+
+
+class _Eco:
+    """Buffer falso: o csv.writer escreve e a linha volta pronta para o streaming"""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar_exportacao(conjunto, formato='csv', inicio=None, fim=None, metodo=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera o arquivo em pedaços de texto, um por bloco lido do banco"""
+    colunas = COLUNAS[conjunto]
+    cabecalho = [nome for nome, _caminho in colunas]
+    blocos = iterar_blocos(montar_consulta(conjunto, inicio, fim, metodo), [caminho for _nome, caminho in colunas], tamanho_bloco)
+
+    if formato == 'jsonl':
+        for bloco in blocos:
+            yield ''.join(
+                json.dumps(dict(zip(cabecalho, map(_formatar, linha))), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+                for linha in bloco
+            )
+        return
+
+    escritor = csv.writer(_Eco())
+    # Cabeçalho sai na hora; BOM para o Excel reconhecer o arquivo como UTF-8
+    yield '\ufeff' + escritor.writerow(cabecalho)
+    for bloco in blocos:
+        yield ''.join(escritor.writerow([_formatar(valor) for valor in linha]) for linha in bloco)
+
+
+def nome_do_arquivo(conjunto, formato, inicio=None, fim=None):
+    partes = [conjunto]
+    if inicio:
+        partes.append(f'de-{inicio:%Y-%m-%d}')
+    if fim:
+        partes.append(f'ate-{fim:%Y-%m-%d}')
+    return '_'.join(partes) + f'.{formato}'
@@ -96,7 +96,8 @@ class VendaForm(forms.ModelForm):
         fields = ['valor_venda', 'metodo_pagamento', 'cliente', 'observacoes']
         
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'form-select'}), # Agora é um dropdown de clientes
+            # O cliente é escolhido pelo autocompletar (telefone ou nome); o campo guarda só o id
+            'cliente': forms.HiddenInput(),
             'valor_venda': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'metodo_pagamento': forms.Select(attrs={'class': 'form-select'}),
             'observacoes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
@@ -109,6 +110,16 @@ class VendaForm(forms.ModelForm):
         for field in self.fields.values():
             if not field.widget.attrs.get('class'):
                 field.widget.attrs['class'] = 'form-control'
+
+    def cliente_selecionado(self):
+        """Cliente já escolhido (formulário reexibido com erro), para preencher a caixa de busca"""
+        valor = self['cliente'].value()
+        if not valor:
+            return None
+        try:
+            return Cliente.objects.filter(pk=valor).first()
+        except (ValueError, TypeError):
+            return None
  
  # Entrada de material para o estoque       
 class EntradaMaterialForm(forms.ModelForm):
@@ -141,4 +152,48 @@ class ClienteForm(forms.ModelForm):
             'telefone': forms.TextInput(attrs={'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'endereco': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
-        }
\ No newline at end of file
+        }
+
+class ImportacaoEstoqueForm(forms.Form):
+    arquivo = forms.FileField(
+        label='Arquivo CSV ou JSONL',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.json'}),
+    )
+
+
+class ExportacaoForm(forms.Form):
+    conjunto = forms.ChoiceField(
+        choices=[('vendas', 'Vendas'), ('clientes', 'Clientes'), ('produtos', 'Produtos')],
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    formato = forms.ChoiceField(
+        choices=[('csv', 'CSV (Excel)'), ('jsonl', 'JSONL')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    inicio = forms.DateField(label='De', required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    fim = forms.DateField(label='Até', required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    metodo = forms.ChoiceField(
+        label='Pagamento',
+        choices=[('', 'Todos')] + Venda.METODO_PAGAMENTO,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get('inicio') and dados.get('fim') and dados['inicio'] > dados['fim']:
+            raise forms.ValidationError("A data inicial precisa ser anterior à final.")
+        dados['formato'] = dados.get('formato') or 'csv'
+        return dados
+
+
+class RecibosLoteForm(forms.Form):
+    inicio = forms.DateField(label='De', widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    fim = forms.DateField(label='Até', widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get('inicio') and dados.get('fim') and dados['inicio'] > dados['fim']:
+            raise forms.ValidationError("A data inicial precisa ser anterior à final.")
+        return dados
@@ -0,0 +1,176 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from atelier.derivados import processar, caminho_derivado, FORMATOS
+from atelier.models import Produto
+
+logger = logging.getLogger(__name__)
+
+# Larguras geradas: 100 cobre a miniatura de 50px da lista em telas 2x;
+# 400/800/1600 cobrem o carrossel do detalhe do celular ao monitor 2x
+LARGURAS = (100, 400, 800, 1600)
+
+CAMPOS_IMAGEM = Produto.CAMPOS_IMAGEM
+
+# As versões ficam em media/derivados/, espelhando o caminho da foto original
+PASTA_DERIVADOS = 'derivados'
+
+# Processos que reduzem as fotos fora da requisição (Pillow usa CPU cheia)
+PROCESSOS = 2
+
+_pool = None
+_trava_pool = threading.Lock()
+
+
+def _obter_pool():
+    global _pool
+    with _trava_pool:
+        if _pool is None:
+            # spawn: os filhos não herdam o estado do servidor (threads, conexões abertas)
+            _pool = ProcessPoolExecutor(max_workers=PROCESSOS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _descartar_pool():
+    global _pool
+    with _trava_pool:
+        _pool = None
+
+
+# --- NOMES E CAMINHOS ---
+def _base(nome_origem):
+    return f'{PASTA_DERIVADOS}/{os.path.splitext(nome_origem)[0]}'
+
+
+def campos_pendentes(produto):
+    """Campos com foto cujas versões ainda não foram geradas (ou são de uma foto anterior)"""
+    derivados = produto.derivados_imagens or {}
+    return [
+        campo for campo in CAMPOS_IMAGEM
+        if getattr(produto, campo) and derivados.get(campo, {}).get('origem') != getattr(produto, campo).name
+    ]
+
+
+def _tarefas(produto, campos):
+    """(campo, nome da foto, caminho da foto, caminho base das versões) de cada campo"""
+    tarefas = []
+    for campo in campos:
+        nome = getattr(produto, campo).name
+        try:
+            tarefas.append((campo, nome, default_storage.path(nome), default_storage.path(_base(nome))))
+        except NotImplementedError:
+            # Armazenamento sem caminho local (S3 etc.): as páginas seguem usando a foto original
+            return []
+    return tarefas
+
+
+# --- REGISTRO DO RESULTADO ---
+def registrar_derivados(produto_id, resultado):
+    """
+    Grava no produto as versões geradas, só para os campos cuja foto ainda é
+    a mesma que foi processada (a foto pode ter sido trocada no meio tempo).
+    """
+    with transaction.atomic():
+        produto = Produto.objects.select_for_update().only('derivados_imagens', *CAMPOS_IMAGEM).filter(pk=produto_id).first()
+        if produto is None:
+            return
+        derivados = dict(produto.derivados_imagens or {})
+        for campo, (nome, larguras, *erro) in resultado.items():
+            if getattr(produto, campo).name != nome:
+                continue
+            if larguras is None:
+                logger.warning("Versões de %s não geradas: %s", nome, erro[0] if erro else '')
+                continue
+            derivados[campo] = {'origem': nome, 'larguras': larguras}
+        # update() e não save(): não dispara os sinais (nem reagenda este produto)
+        Produto.objects.filter(pk=produto_id).update(derivados_imagens=derivados)
+
+
+def _ao_concluir(produto_id):
+    def callback(futuro):
+        # Roda numa thread do pool, com conexão própria com o banco
+        try:
+            registrar_derivados(produto_id, futuro.result())
+        except BrokenProcessPool:
+            _descartar_pool()
+            logger.exception("Pool de imagens interrompido (produto %s)", produto_id)
+        except Exception:
+            logger.exception("Falha ao registrar as versões das fotos do produto %s", produto_id)
+        finally:
+            close_old_connections()
+    return callback
+
+
+def agendar_derivados(produto):
+    """Envia as fotos pendentes do produto para o pool; a requisição não espera"""
+    tarefas = _tarefas(produto, campos_pendentes(produto))
+    if not tarefas:
+        return None
+    try:
+        futuro = _obter_pool().submit(processar, tarefas, LARGURAS)
+    except BrokenProcessPool:
+        _descartar_pool()
+        futuro = _obter_pool().submit(processar, tarefas, LARGURAS)
+    futuro.add_done_callback(_ao_concluir(produto.pk))
+    return futuro
+
+
+def gerar_em_lote(produtos, refazer=False):
+    """
+    Envia as fotos de todos os produtos ao pool e registra cada resultado
+    assim que fica pronto (carga inicial das fotos já cadastradas).
+    Gera (id do produto, resultado) na ordem em que terminam.
+    """
+    pool = _obter_pool()
+    futuros = {}
+    for produto in produtos:
+        campos = [campo for campo in CAMPOS_IMAGEM if getattr(produto, campo)] if refazer else campos_pendentes(produto)
+        tarefas = _tarefas(produto, campos)
+        if tarefas:
+            futuros[pool.submit(processar, tarefas, LARGURAS)] = produto.pk
+    for futuro in as_completed(futuros):
+        resultado = futuro.result()
+        registrar_derivados(futuros[futuro], resultado)
+        yield futuros[futuro], resultado
+
+
+@receiver(post_save, sender=Produto)
+def agendar_ao_salvar(sender, instance, **kwargs):
+    # Só fotos novas para esta instância: criar_produto e editar_produto gravam
+    # duas vezes (o formulário e depois o preço), e lido do banco sem trocar a
+    # foto não há o que refazer
+    conhecidas = getattr(instance, '_imagens_conhecidas', {})
+    novas = {
+        campo: getattr(instance, campo).name for campo in campos_pendentes(instance)
+        if conhecidas.get(campo) != getattr(instance, campo).name
+    }
+    if not novas:
+        return
+    instance._imagens_conhecidas = {**conhecidas, **novas}
+    # Só depois do commit: o processo lê o arquivo já gravado e o produto já existe
+    transaction.on_commit(lambda: agendar_derivados(instance))
+
+
+# --- USO NOS TEMPLATES ---
+def versoes(produto, campo):
+    """
+    {extensão: [(url, largura), ...]} das versões da foto do campo, ou None
+    se ainda não existem (o template usa a foto original).
+    """
+    arquivo = getattr(produto, campo)
+    info = (produto.derivados_imagens or {}).get(campo)
+    if not arquivo or not info or info.get('origem') != arquivo.name:
+        return None
+    base = _base(arquivo.name)
+    return {
+        extensao: [(default_storage.url(caminho_derivado(base, largura, extensao)), largura) for largura in info['larguras']]
+        for extensao, _formato, _opcoes in FORMATOS
+    }
@@ -0,0 +1,309 @@
+import csv
+import json
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from atelier.banco import atualizar_em_massa, inserir_em_massa
+from atelier.busca import indexar
+from atelier.dashboard import invalidar_totais_dashboard
+from atelier.estoque import movimentar_estoque_em_massa, registrar_passagens
+from atelier.forms import MaterialForm, EntradaMaterialForm
+from atelier.models import CategoriaMaterial, Material, EntradaMaterial, MovimentacaoEstoque
+from atelier.trabalhos import reprecificar_em_segundo_plano
+
+# Linhas validadas e gravadas por vez: a memória fica do tamanho de um lote
+TAMANHO_LOTE = 2000
+
+# Erros guardados para exibir (os demais só entram na contagem)
+MAXIMO_ERROS = 200
+
+FORMATOS = ('csv', 'jsonl')
+
+# Colunas aceitas no arquivo (a coluna "tipo" diz o que é cada linha):
+#   tipo=categoria: nome
+#   tipo=material:  nome, categoria, unidade_medida, preco_unitario, quantidade_estoque, estoque_minimo
+#   tipo=entrada:   material, quantidade_adicionada, preco_unitario_na_compra
+TIPOS = ('categoria', 'material', 'entrada')
+
+
+class ResultadoImportacao:
+
+    def __init__(self):
+        self.linhas = 0
+        self.categorias_criadas = 0
+        self.materiais_criados = 0
+        self.materiais_atualizados = 0
+        self.entradas_criadas = 0
+        self.total_erros = 0
+        self.erros = []
+
+    def adicionar_erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < MAXIMO_ERROS:
+            self.erros.append((linha, mensagem))
+
+    def __str__(self):
+        return (
+            f"{self.linhas} linha(s) lidas: {self.categorias_criadas} categoria(s) criada(s), "
+            f"{self.materiais_criados} material(is) criado(s), {self.materiais_atualizados} atualizado(s), "
+            f"{self.entradas_criadas} entrada(s) registrada(s), {self.total_erros} erro(s)."
+        )
+
+
+def detectar_formato(nome_arquivo):
+    return 'jsonl' if nome_arquivo.lower().endswith(('.jsonl', '.json', '.ndjson')) else 'csv'
+
+
+def ler_linhas(arquivo, formato='csv'):
+    """
+    Lê o arquivo (texto) linha a linha, sem carregar tudo na memória.
+    Gera (número da linha, dicionário com as colunas).
+    """
+    if formato == 'jsonl':
+        for numero, texto in enumerate(arquivo, start=1):
+            if not texto.strip():
+                continue
+            try:
+                dados = json.loads(texto)
+            except ValueError:
+                dados = None
+            if not isinstance(dados, dict):
+                dados = {'_erro': "JSON inválido."}
+            yield numero, dados
+        return
+
+    # CSV: aceita vírgula ou ponto e vírgula (padrão do Excel em português)
+    primeira = arquivo.readline()
+    delimitador = ';' if primeira.count(';') > primeira.count(',') else ','
+    cabecalho = [coluna.strip().lower() for coluna in next(csv.reader([primeira], delimiter=delimitador), [])]
+    for numero, valores in enumerate(csv.reader(arquivo, delimiter=delimitador), start=2):
+        if any(valor.strip() for valor in valores):
+            yield numero, dict(zip(cabecalho, (valor.strip() for valor in valores)))
+
+
+def _campos_do_formulario(classe_formulario, excluir=()):
+    """
+    Campos do formulário (com as mesmas regras de validação: tamanho, casas
+    decimais, opções de unidade...), criados uma única vez e reaproveitados em
+    todas as linhas em vez de instanciar um formulário por linha.
+    """
+    return {nome: campo for nome, campo in classe_formulario().fields.items() if nome not in excluir}
+
+
+class ImportadorEstoque:
+    """
+    Importa categorias, materiais e entradas de estoque em lotes. Dentro de
+    cada lote as categorias são gravadas primeiro, depois os materiais e por
+    fim as entradas; tudo com bulk_create e atualizações em massa.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+        self.resultado = ResultadoImportacao()
+        # Materiais identificados pelo nome; categoria vem em coluna própria
+        self.campos_material = _campos_do_formulario(MaterialForm, excluir=['categoria'])
+        self.campo_estoque_minimo = Material._meta.get_field('estoque_minimo').formfield(required=False)
+        # Entradas apontam para o material pelo nome
+        self.campos_entrada = _campos_do_formulario(EntradaMaterialForm, excluir=['material'])
+        self.categorias = {}  # nome -> id, reaproveitado entre os lotes
+        self.materiais = {}  # nome -> Material, reaproveitado entre os lotes
+        self.materiais_com_preco_alterado = set()
+
+    def importar(self, linhas):
+        linhas = iter(linhas)
+        while True:
+            lote = list(islice(linhas, self.tamanho_lote))
+            if not lote:
+                break
+            self.resultado.linhas += len(lote)
+            with transaction.atomic():
+                self._processar_lote(lote)
+
+        if self.materiais_com_preco_alterado:
+            reprecificar_em_segundo_plano(self.materiais_com_preco_alterado)
+        invalidar_totais_dashboard()
+        return self.resultado
+
+    # --- VALIDAÇÃO ---
+    def _validar(self, campos, dados, numero):
+        limpos = {}
+        erros = []
+        for nome, campo in campos.items():
+            try:
+                limpos[nome] = campo.clean(dados.get(nome))
+            except ValidationError as erro:
+                erros.append(f"{nome}: {' '.join(erro.messages)}")
+        if erros:
+            self.resultado.adicionar_erro(numero, '; '.join(erros))
+            return None
+        return limpos
+
+    def _processar_lote(self, lote):
+        categorias, materiais, entradas = [], [], []
+
+        for numero, dados in lote:
+            if '_erro' in dados:
+                self.resultado.adicionar_erro(numero, dados['_erro'])
+                continue
+            tipo = (dados.get('tipo') or '').strip().lower()
+
+            if tipo == 'categoria':
+                nome = (dados.get('nome') or '').strip()
+                if not nome or len(nome) > CategoriaMaterial._meta.get_field('nome').max_length:
+                    self.resultado.adicionar_erro(numero, "nome: nome da categoria inválido.")
+                else:
+                    categorias.append(nome)
+
+            elif tipo == 'material':
+                limpos = self._validar(self.campos_material, dados, numero)
+                if limpos is None:
+                    continue
+                try:
+                    estoque_minimo = self.campo_estoque_minimo.clean(dados.get('estoque_minimo'))
+                except ValidationError as erro:
+                    self.resultado.adicionar_erro(numero, f"estoque_minimo: {' '.join(erro.messages)}")
+                    continue
+                if estoque_minimo is not None:
+                    limpos['estoque_minimo'] = estoque_minimo
+                categoria = (dados.get('categoria') or '').strip()
+                if categoria:
+                    categorias.append(categoria)
+                materiais.append((numero, limpos, categoria))
+
+            elif tipo == 'entrada':
+                limpos = self._validar(self.campos_entrada, dados, numero)
+                if limpos is None:
+                    continue
+                material = (dados.get('material') or '').strip()
+                if not material:
+                    self.resultado.adicionar_erro(numero, "material: Este campo é obrigatório.")
+                    continue
+                entradas.append((numero, limpos, material))
+
+            else:
+                self.resultado.adicionar_erro(numero, f"tipo: use um de {', '.join(TIPOS)}.")
+
+        self._gravar_categorias(categorias)
+        self._gravar_materiais(materiais)
+        self._gravar_entradas(entradas)
+
+    # --- GRAVAÇÃO ---
+    def _gravar_categorias(self, nomes):
+        faltando = set(nomes) - self.categorias.keys()
+        if not faltando:
+            return
+        self.categorias.update(CategoriaMaterial.objects.filter(nome__in=faltando).values_list('nome', 'id'))
+        novas = [CategoriaMaterial(nome=nome) for nome in faltando - self.categorias.keys()]
+        CategoriaMaterial.objects.bulk_create(novas)
+        # bulk_create não dispara os sinais: o índice de busca é atualizado aqui
+        indexar(CategoriaMaterial, [categoria.pk for categoria in novas])
+        self.categorias.update((categoria.nome, categoria.pk) for categoria in novas)
+        self.resultado.categorias_criadas += len(novas)
+
+    def _buscar_materiais(self, nomes):
+        """
+        Carrega no cache os materiais que ainda não foram vistos (havendo nomes
+        repetidos no cadastro, vale o mais antigo). Os objetos do cache são
+        mantidos em dia pelo próprio importador.
+        """
+        faltando = set(nomes) - self.materiais.keys()
+        if faltando:
+            for material in Material.objects.filter(nome__in=faltando).order_by('-id'):
+                self.materiais[material.nome] = material
+
+    def _gravar_materiais(self, linhas):
+        # A última linha de cada nome no lote prevalece
+        por_nome = {limpos['nome']: (limpos, categoria) for _numero, limpos, categoria in linhas}
+        self._buscar_materiais(por_nome.keys())
+
+        novos, alterados, ajustes, passagens = [], [], [], []
+        for nome, (limpos, categoria) in por_nome.items():
+            quantidade = limpos.pop('quantidade_estoque')
+            limpos['categoria_id'] = self.categorias.get(categoria) if categoria else None
+            material = self.materiais.get(nome)
+
+            if material is None:
+                material = Material(quantidade_estoque=quantidade, **limpos)
+                novos.append(material)
+                self.materiais[nome] = material
+                continue
+
+            if material.preco_unitario != limpos['preco_unitario']:
+                self.materiais_com_preco_alterado.add(material.pk)
+            estava_baixo = material.precisa_repor
+            for campo, valor in limpos.items():
+                setattr(material, campo, valor)
+            alterados.append(material)
+            # Um mínimo novo pode, sozinho, fazer o material entrar ou sair do alerta
+            # (a passagem pelo saldo informado fica com o movimentar_estoque_em_massa)
+            passagens.append((
+                material.pk, estava_baixo, material.precisa_repor, material.quantidade_estoque, material.estoque_minimo,
+            ))
+            # Saldo informado no arquivo: a diferença entra como ajuste
+            diferenca = quantidade - material.quantidade_estoque
+            if diferenca:
+                ajustes.append((material.pk, MovimentacaoEstoque.AJUSTE, diferenca, {}))
+                material.quantidade_estoque = quantidade
+
+        Material.objects.bulk_create(novos)
+        # Saldo inicial dos materiais novos entra no histórico como ajuste
+        inserir_em_massa(
+            MovimentacaoEstoque,
+            ['material', 'tipo', 'quantidade', 'data'],
+            [
+                (material.pk, MovimentacaoEstoque.AJUSTE, material.quantidade_estoque, timezone.now())
+                for material in novos if material.quantidade_estoque
+            ],
+        )
+        atualizar_em_massa(alterados, ['unidade_medida', 'preco_unitario', 'categoria', 'estoque_minimo'])
+        # bulk_create e atualizar_em_massa não chamam o post_save que registra as passagens pelo alerta
+        registrar_passagens(passagens + [
+            (material.pk, False, material.precisa_repor, material.quantidade_estoque, material.estoque_minimo)
+            for material in novos
+        ])
+        movimentar_estoque_em_massa(ajustes)
+        indexar(Material, [material.pk for material in novos + alterados])
+
+        self.resultado.materiais_criados += len(novos)
+        self.resultado.materiais_atualizados += len(alterados)
+
+    def _gravar_entradas(self, linhas):
+        self._buscar_materiais(nome for _numero, _limpos, nome in linhas)
+
+        entradas = []
+        ultima_entrada = {}
+        for numero, limpos, nome in linhas:
+            material = self.materiais.get(nome)
+            if material is None:
+                self.resultado.adicionar_erro(numero, f"material: '{nome}' não encontrado.")
+                continue
+            entradas.append(EntradaMaterial(material_id=material.pk, **limpos))
+            ultima_entrada[nome] = limpos['preco_unitario_na_compra']
+            # O cache acompanha o saldo: um saldo informado num lote seguinte é comparado com este
+            material.quantidade_estoque += limpos['quantidade_adicionada']
+
+        # bulk_create não chama o save(): estoque, preço e histórico são aplicados em lote abaixo
+        EntradaMaterial.objects.bulk_create(entradas)
+        movimentar_estoque_em_massa([
+            (entrada.material_id, MovimentacaoEstoque.ENTRADA, entrada.quantidade_adicionada, {'entrada_id': entrada.pk})
+            for entrada in entradas
+        ])
+
+        # O preço da última entrada de cada material vira o preço unitário
+        alterados = []
+        for nome, preco in ultima_entrada.items():
+            material = self.materiais[nome]
+            if preco != material.preco_unitario:
+                material.preco_unitario = preco
+                alterados.append(material)
+                self.materiais_com_preco_alterado.add(material.pk)
+        atualizar_em_massa(alterados, ['preco_unitario'])
+
+        self.resultado.entradas_criadas += len(entradas)
+
+
+def importar_estoque(arquivo, formato='csv', tamanho_lote=TAMANHO_LOTE):
+    """Importa um arquivo (texto) CSV ou JSONL e devolve o ResultadoImportacao"""
+    return ImportadorEstoque(tamanho_lote).importar(ler_linhas(arquivo, formato))
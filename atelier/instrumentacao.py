@@ -0,0 +1,191 @@
+"""
+Instrumentação das requisições (opcional, ver INSTRUMENTACAO em settings.py):
+para cada requisição, a view, o tempo total, as consultas SQL (quantidade,
+tempo e as repetidas, sinal de N+1) e o tempo de renderização dos templates.
+Cada requisição vira uma linha de log no formato chave=valor; as que passam
+do orçamento saem como aviso, com as consultas repetidas. As estatísticas
+por view (estatisticas()) ficam em /instrumentacao/, só para a equipe.
+Desligada, o middleware sai da cadeia na inicialização e não custa nada.
+"""
+import hashlib
+import logging
+import re
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Requisições guardadas por view para as estatísticas (as mais recentes)
+JANELA = 500
+# Limites dos intervalos do histograma de tempo, em ms
+INTERVALOS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Consultas repetidas mostradas no aviso de orçamento estourado
+REPETIDAS_NO_AVISO = 3
+
+# Medição da requisição em andamento (lida pela renderização dos templates)
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+_historico = {}
+_trava_historico = threading.Lock()
+
+_LISTA_IN = re.compile(r'\((?:%s, )+%s\)')
+
+
+def assinatura(sql):
+    """
+    Identifica a consulta independentemente dos valores (os parâmetros vêm
+    separados, como %s; listas do IN de tamanhos diferentes contam como a mesma).
+    """
+    return hashlib.sha1(_LISTA_IN.sub('(%s...)', sql).encode()).hexdigest()[:8]
+
+
+class Medicao:
+    __slots__ = ('consultas', 'tempo_sql', 'sql_por_assinatura', 'assinaturas', 'tempo_templates', '_profundidade')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.sql_por_assinatura = {}
+        self.assinaturas = Counter()
+        self.tempo_templates = 0.0
+        self._profundidade = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper do Django: envolve cada consulta da conexão
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            chave = assinatura(sql)
+            self.assinaturas[chave] += 1
+            self.sql_por_assinatura.setdefault(chave, sql)
+
+    def repetidas(self):
+        """[(assinatura, vezes, sql)] das consultas executadas mais de uma vez, as mais repetidas primeiro"""
+        return [
+            (chave, vezes, self.sql_por_assinatura[chave])
+            for chave, vezes in self.assinaturas.most_common() if vezes > 1
+        ]
+
+
+_render_original = Template._render
+
+
+def _render_medido(self, context):
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return _render_original(self, context)
+    # Só o template de fora conta ({% extends %} e {% include %} renderizam outros dentro dele)
+    medicao._profundidade += 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context)
+    finally:
+        medicao._profundidade -= 1
+        if not medicao._profundidade:
+            medicao.tempo_templates += time.perf_counter() - inicio
+
+
+def _medir_templates():
+    """Passa a renderização dos templates por _render_medido (uma vez por processo)"""
+    global _render_original
+    if Template._render is not _render_medido:
+        _render_original = Template._render
+        Template._render = _render_medido
+
+
+class InstrumentacaoMiddleware:
+    def __init__(self, get_response):
+        configuracao = settings.INSTRUMENTACAO
+        if not configuracao['ATIVA']:
+            # O Django tira o middleware da cadeia: desligado, não há custo nenhum
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.orcamento_consultas = configuracao['ORCAMENTO_CONSULTAS']
+        self.orcamento_ms = configuracao['ORCAMENTO_MS']
+        _medir_templates()
+
+    def __call__(self, request):
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        resposta = None
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(medicao))
+                # Respostas em streaming (exportações, lotes de recibos) geram o corpo
+                # depois daqui: essas consultas ficam fora da medição
+                resposta = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+            self._registrar(request, resposta, medicao, (time.perf_counter() - inicio) * 1000)
+        return resposta
+
+    def _registrar(self, request, resposta, medicao, duracao):
+        correspondencia = request.resolver_match
+        view = correspondencia.view_name if correspondencia else '<sem rota>'
+        status = resposta.status_code if resposta is not None else 500
+        registrar_requisicao(view, duracao, medicao.consultas)
+
+        repetidas = medicao.repetidas()
+        linha = (
+            f"view={view} metodo={request.method} status={status} ms={duracao:.1f} "
+            f"sql={medicao.consultas} sql_ms={medicao.tempo_sql * 1000:.1f} "
+            f"repetidas={sum(vezes for _chave, vezes, _sql in repetidas)} "
+            f"template_ms={medicao.tempo_templates * 1000:.1f}"
+        )
+        acima = []
+        if medicao.consultas > self.orcamento_consultas:
+            acima.append(f"sql>{self.orcamento_consultas}")
+        if duracao > self.orcamento_ms:
+            acima.append(f"ms>{self.orcamento_ms}")
+        if not acima:
+            logger.info(linha)
+            return
+        detalhes = ''.join(
+            f"\n  {vezes}x [{chave}] {sql[:200]}" for chave, vezes, sql in repetidas[:REPETIDAS_NO_AVISO]
+        )
+        logger.warning("%s acima_do_orcamento=%s%s", linha, ','.join(acima), detalhes)
+
+
+# --- HISTÓRICO POR VIEW ---
+def registrar_requisicao(view, duracao_ms, consultas):
+    historico = _historico.get(view)
+    if historico is None:
+        with _trava_historico:
+            historico = _historico.setdefault(view, deque(maxlen=JANELA))
+    historico.append((duracao_ms, consultas))
+
+
+def histograma(tempos):
+    """Quantas requisições em cada intervalo de INTERVALOS_MS (acumulado, como no Prometheus; o último é o total)"""
+    return [sum(1 for tempo in tempos if tempo <= limite) for limite in INTERVALOS_MS] + [len(tempos)]
+
+
+def estatisticas():
+    """Por view, das últimas JANELA requisições deste processo: tempos, consultas e histograma"""
+    resultado = {}
+    for view, historico in sorted(_historico.items()):
+        amostras = list(historico)
+        tempos = sorted(duracao for duracao, _consultas in amostras)
+        resultado[view] = {
+            'requisicoes': len(amostras),
+            'mediana_ms': statistics.median(tempos),
+            'p95_ms': tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+            'maximo_ms': tempos[-1],
+            'consultas_media': statistics.fmean(consultas for _duracao, consultas in amostras),
+            'histograma': histograma(tempos),
+        }
+    return resultado
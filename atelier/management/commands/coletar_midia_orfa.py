@@ -0,0 +1,44 @@
+import os
+from django.core.management.base import BaseCommand
+
+from atelier.armazenamento import arquivos_orfaos, CARENCIA_COLETA
+from atelier.imagens import CAMPOS_IMAGEM, PASTA_DERIVADOS
+from atelier.models import Produto
+
+
+class Command(BaseCommand):
+    help = (
+        "Lista (ou apaga, com --apagar) as fotos e versões reduzidas da media que nenhum produto usa mais: "
+        "fotos trocadas, produtos excluídos e temporários esquecidos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apagar', action='store_true', help="Apaga os arquivos órfãos (sem isso só lista).")
+        parser.add_argument(
+            '--carencia', type=int, default=CARENCIA_COLETA,
+            help="Ignora arquivos modificados há menos de N segundos (padrão: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        referenciados = set()
+        for nomes in Produto.objects.values_list(*CAMPOS_IMAGEM).iterator(chunk_size=2000):
+            referenciados.update(filter(None, nomes))
+
+        quantidade = tamanho_total = 0
+        for caminho, tamanho in arquivos_orfaos(referenciados, PASTA_DERIVADOS, options['carencia']):
+            quantidade += 1
+            tamanho_total += tamanho
+            if options['apagar']:
+                try:
+                    os.unlink(caminho)
+                    # Remove a pasta do hash se ficou vazia (rmdir falha se não estiver)
+                    os.rmdir(os.path.dirname(caminho))
+                except OSError:
+                    pass
+            elif options['verbosity'] > 1:
+                self.stdout.write(caminho)
+
+        acao = "apagado(s)" if options['apagar'] else "órfão(s) encontrado(s) (use --apagar para remover)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{quantidade} arquivo(s) {acao}: {tamanho_total / 1024 / 1024:.1f} MB."
+        ))
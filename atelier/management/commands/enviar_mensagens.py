@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from atelier.mensagens import obter_transporte, reservar_lote, enviar_lote, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker da caixa de saída do WhatsApp: envia as mensagens pendentes em lotes, "
+        "com novas tentativas espaçadas para as que falharem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help="Envia o que está vencido e termina (para o cron).")
+        parser.add_argument('--intervalo', type=float, default=5, help="Segundos entre as consultas à fila vazia (padrão: 5).")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help=f"Mensagens por lote (padrão: {TAMANHO_LOTE}).")
+
+    def handle(self, *args, **options):
+        with obter_transporte() as transporte:
+            try:
+                while True:
+                    close_old_connections()
+                    mensagens = reservar_lote(options['lote'])
+                    if mensagens:
+                        enviadas, reagendadas, falhas = enviar_lote(transporte, mensagens)
+                        self.stdout.write(
+                            f"{enviadas} enviada(s), {reagendadas} para tentar de novo, {falhas} com falha definitiva."
+                        )
+                        continue
+                    if options['uma_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+            except KeyboardInterrupt:
+                # Mensagens reservadas e não enviadas voltam à fila quando a reserva vencer
+                self.stdout.write("Worker interrompido.")
+                return
+        self.stdout.write(self.style.SUCCESS("Nenhuma mensagem pendente."))
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+
+from atelier.estoque import movimentar_estoque
+from atelier.models import Material, MovimentacaoEstoque
+
+ENTRADA = Decimal('1.25')
+CONSUMO = Decimal('-0.75')
+
+
+def _trabalhador(material_id, operacoes, ingenuo, fila):
+    # Cada processo abre a própria conexão com o banco
+    connections.close_all()
+    material = Material.objects.get(pk=material_id)
+    erros = 0
+
+    for numero in range(operacoes):
+        quantidade = ENTRADA if numero % 2 == 0 else CONSUMO
+        try:
+            if ingenuo:
+                # Jeito antigo: lê, soma em Python e grava a linha inteira
+                material = Material.objects.get(pk=material_id)
+                material.quantidade_estoque += quantidade
+                material.save()
+            else:
+                tipo = MovimentacaoEstoque.ENTRADA if quantidade > 0 else MovimentacaoEstoque.CONSUMO
+                movimentar_estoque(material, tipo, quantidade)
+        except Exception:
+            erros += 1
+
+    connections.close_all()
+    fila.put(erros)
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de estresse de concorrência: vários processos movimentam o mesmo material "
+        "ao mesmo tempo e o saldo final é conferido. Roda num banco SQLite temporário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=8)
+        parser.add_argument('--operacoes', type=int, default=200, help="Movimentações por processo.")
+        parser.add_argument('--ingenuo', action='store_true',
+                            help="Usa ler-modificar-gravar (material.save()) para comparar.")
+
+    def handle(self, *args, **options):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("Este teste precisa de processos com fork (Linux/macOS).")
+
+        processos = options['processos']
+        operacoes = options['operacoes']
+
+        # Banco descartável: não mexe nos dados reais
+        pasta = tempfile.mkdtemp(prefix='atelier-estresse-')
+        connection.close()
+        connection.settings_dict['NAME'] = os.path.join(pasta, 'estresse.sqlite3')
+        call_command('migrate', verbosity=0)
+
+        inicial = Decimal('1000.00')
+        material = Material.objects.create(
+            nome='Material de estresse', unidade_medida='metro',
+            preco_unitario=Decimal('10.00'), quantidade_estoque=inicial,
+        )
+        connections.close_all()
+
+        contexto = multiprocessing.get_context('fork')
+        fila = contexto.Queue()
+        trabalhadores = [
+            contexto.Process(target=_trabalhador, args=(material.pk, operacoes, options['ingenuo'], fila))
+            for _ in range(processos)
+        ]
+
+        inicio = time.perf_counter()
+        for trabalhador in trabalhadores:
+            trabalhador.start()
+        erros = sum(fila.get() for _ in trabalhadores)
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+        duracao = time.perf_counter() - inicio
+
+        entradas = (operacoes + 1) // 2
+        consumos = operacoes // 2
+        bem_sucedidas = processos * operacoes - erros
+        esperado = inicial + processos * (entradas * ENTRADA + consumos * CONSUMO)
+
+        final = Material.objects.get(pk=material.pk).quantidade_estoque
+        historico = MovimentacaoEstoque.objects.filter(material=material).aggregate(total=Sum('quantidade'))['total'] or Decimal('0')
+
+        self.stdout.write(f"Processos: {processos} | operações por processo: {operacoes} | falhas: {erros}")
+        self.stdout.write(f"Tempo: {duracao:.2f}s | vazão: {bem_sucedidas / duracao:.0f} movimentações/s")
+        self.stdout.write(f"Saldo esperado: {esperado} | saldo final: {final} | soma do histórico: {historico}")
+
+        if erros:
+            raise CommandError(f"{erros} movimentação(ões) falharam; o saldo esperado não vale.")
+        if final != esperado:
+            raise CommandError(f"Atualizações perdidas: diferença de {esperado - final}.")
+        if historico != final:
+            raise CommandError(f"Histórico fora do saldo: a soma das movimentações difere em {final - historico}.")
+        self.stdout.write(self.style.SUCCESS("Nenhuma atualização perdida; o histórico fecha com o saldo."))
@@ -0,0 +1,65 @@
+import multiprocessing
+import signal
+import threading
+from django.core.management.base import BaseCommand
+
+PROCESSOS = 2
+
+
+def _processo_trabalhador(intervalo, somente_vencidos):
+    """
+    Corpo de cada processo worker (iniciado com spawn: carrega o Django do
+    zero). SIGTERM termina o trabalho em andamento antes de sair.
+    """
+    import django
+    django.setup()
+    from atelier.trabalhos import trabalhar
+
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    signal.signal(signal.SIGINT, lambda *_: parar.set())
+    trabalhar(intervalo, parar.is_set, somente_vencidos)
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa os trabalhos em segundo plano da fila (reprecificação, fotografias do estoque...) "
+        "em vários processos, e mantém os trabalhos recorrentes agendados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=PROCESSOS, help=f"Processos worker (padrão: {PROCESSOS}).")
+        parser.add_argument('--intervalo', type=float, default=5, help="Segundos entre as consultas à fila vazia (padrão: 5).")
+        parser.add_argument('--uma-vez', action='store_true', help="Executa o que está vencido e termina (para o cron).")
+
+    def handle(self, *args, **options):
+        from atelier.trabalhos import agendar_recorrentes
+
+        agendar_recorrentes()
+        contexto = multiprocessing.get_context('spawn')
+        processos = [
+            contexto.Process(
+                target=_processo_trabalhador, args=(options['intervalo'], options['uma_vez']),
+                name=f'trabalhador-{numero}',
+            )
+            for numero in range(1, options['processos'] + 1)
+        ]
+        for processo in processos:
+            processo.start()
+        # SIGTERM no processo principal (systemd, docker stop) é repassado aos workers
+        signal.signal(signal.SIGTERM, lambda *_: [processo.terminate() for processo in processos])
+        self.stdout.write(f"{len(processos)} processo(s) worker iniciado(s).")
+
+        try:
+            for processo in processos:
+                processo.join()
+        except KeyboardInterrupt:
+            # Ctrl+C chega a todo o grupo; os processos terminam o trabalho atual
+            self.stdout.write("Encerrando: aguardando os trabalhos em andamento...")
+            for processo in processos:
+                processo.join()
+        falhas = [processo.name for processo in processos if processo.exitcode]
+        if falhas:
+            self.stderr.write(f"Processo(s) encerrado(s) com erro: {', '.join(falhas)}")
+        else:
+            self.stdout.write(self.style.SUCCESS("Workers encerrados."))
@@ -0,0 +1,41 @@
+import datetime
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.exportacao import gerar_exportacao, CONJUNTOS, FORMATOS, TAMANHO_BLOCO
+from atelier.models import Venda
+
+
+def _data(texto):
+    try:
+        return datetime.date.fromisoformat(texto)
+    except ValueError:
+        raise CommandError(f"Data inválida: {texto} (use AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = "Exporta vendas, clientes ou produtos em CSV ou JSONL, em streaming (sem carregar a tabela na memória)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('conjunto', choices=CONJUNTOS)
+        parser.add_argument('--formato', choices=FORMATOS, default='csv')
+        parser.add_argument('--inicio', type=_data, help="Data inicial (AAAA-MM-DD), inclusiva.")
+        parser.add_argument('--fim', type=_data, help="Data final (AAAA-MM-DD), inclusiva.")
+        parser.add_argument('--metodo', choices=[codigo for codigo, _nome in Venda.METODO_PAGAMENTO])
+        parser.add_argument('--saida', help="Arquivo de saída (padrão: saída padrão).")
+        parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO, help="Linhas por consulta (padrão: %(default)s).")
+
+    def handle(self, *args, **options):
+        pedacos = gerar_exportacao(
+            options['conjunto'], options['formato'],
+            options['inicio'], options['fim'], options['metodo'], options['bloco'],
+        )
+        if not options['saida']:
+            for pedaco in pedacos:
+                sys.stdout.write(pedaco)
+            return
+
+        with open(options['saida'], 'w', encoding='utf-8', newline='') as arquivo:
+            for pedaco in pedacos:
+                arquivo.write(pedaco)
+        self.stdout.write(self.style.SUCCESS(f"Exportação gravada em {options['saida']}."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from atelier.estoque import gerar_fotografias
+
+
+class Command(BaseCommand):
+    help = "Grava a fotografia do saldo de cada material (rodar periodicamente, ex: todo dia)."
+
+    def handle(self, *args, **options):
+        total = gerar_fotografias()
+        self.stdout.write(self.style.SUCCESS(f"{total} fotografia(s) de saldo gravada(s)."))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+
+from atelier.models import Venda
+from atelier.recibos import gerar_recibos_por_ids, vendas_sem_recibo
+
+
+class Command(BaseCommand):
+    help = "Monta e guarda os recibos (HTML e PDF) das vendas que ainda não têm, como as anteriores a este recurso."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help="Refaz os recibos de todas as vendas.")
+
+    def handle(self, *args, **options):
+        vendas = Venda.objects.all() if options['todos'] else vendas_sem_recibo()
+        inicio = time.perf_counter()
+        total = gerar_recibos_por_ids(vendas.order_by('pk').values_list('pk', flat=True))
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"{total} recibo(s) gerado(s) em {duracao:.2f}s."))
@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from atelier.imagens import gerar_em_lote, CAMPOS_IMAGEM
+from atelier.models import Produto
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as versões reduzidas (WebP e JPEG, várias larguras) das fotos dos produtos "
+        "que ainda não as têm, usando o pool de processos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help="Refaz as versões de todas as fotos, não só das pendentes.")
+
+    def handle(self, *args, **options):
+        com_foto = Q()
+        for campo in CAMPOS_IMAGEM:
+            com_foto |= Q(**{f'{campo}__gt': ''})
+        produtos = Produto.objects.filter(com_foto).only('id', 'derivados_imagens', *CAMPOS_IMAGEM)
+
+        inicio = time.perf_counter()
+        quantidade_produtos = fotos = falhas = 0
+        for _produto_id, resultado in gerar_em_lote(produtos.iterator(chunk_size=500), options['todas']):
+            quantidade_produtos += 1
+            for _nome, larguras, *_erro in resultado.values():
+                if larguras is None:
+                    falhas += 1
+                else:
+                    fotos += 1
+            if quantidade_produtos % 100 == 0:
+                self.stdout.write(f"{quantidade_produtos} produto(s) processado(s)...")
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{fotos} foto(s) com versões geradas, {falhas} com erro, em {quantidade_produtos} produto(s) ({duracao:.2f}s)."
+        ))
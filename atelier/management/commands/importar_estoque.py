@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.importacao import importar_estoque, detectar_formato, FORMATOS, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = "Importa categorias, materiais e entradas de estoque de um arquivo CSV ou JSONL, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo (.csv ou .jsonl).")
+        parser.add_argument('--formato', choices=FORMATOS, help="Formato do arquivo (padrão: pela extensão).")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Linhas por lote (padrão: %(default)s).")
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or detectar_formato(options['arquivo'])
+        inicio = time.perf_counter()
+
+        try:
+            with open(options['arquivo'], encoding='utf-8-sig', newline='') as arquivo:
+                resultado = importar_estoque(arquivo, formato, options['lote'])
+        except OSError as erro:
+            raise CommandError(f"Não foi possível ler o arquivo: {erro}")
+
+        duracao = time.perf_counter() - inicio
+        for linha, mensagem in resultado.erros:
+            self.stderr.write(f"Linha {linha}: {mensagem}")
+        if resultado.total_erros > len(resultado.erros):
+            self.stderr.write(f"... e mais {resultado.total_erros - len(resultado.erros)} erro(s).")
+        self.stdout.write(self.style.SUCCESS(f"{resultado} ({duracao:.2f}s)"))
@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sqlite import PERFIS
+
+MATERIAIS = 200
+CLIENTES = 5000
+
+
+def _configurar(arquivo, perfil):
+    """Django carregado no processo filho, apontando para a cópia do banco com o perfil pedido"""
+    import django
+    django.setup()
+    from django.db import connections
+    from core.sqlite import banco_sqlite
+
+    # Antes da primeira conexão: vale só para este processo
+    connections['default'].settings_dict.update(banco_sqlite(arquivo, perfil))
+
+
+def _preparar(arquivo):
+    """Cria o banco de teste (migrações e dados) no arquivo, no modo básico"""
+    _configurar(arquivo, 'basico')
+    from decimal import Decimal
+    from django.core.management import call_command
+    from atelier.models import CategoriaMaterial, Material, Cliente
+
+    call_command('migrate', verbosity=0)
+    categoria = CategoriaMaterial.objects.create(nome='Tecidos')
+    Material.objects.bulk_create([
+        Material(nome=f'Material {numero}', categoria=categoria, unidade_medida='m',
+                 preco_unitario=Decimal('10.00'), quantidade_estoque=Decimal('1000'))
+        for numero in range(MATERIAIS)
+    ])
+    Cliente.objects.bulk_create([Cliente(nome=f'Cliente {numero:05d}') for numero in range(CLIENTES)], batch_size=1000)
+
+
+def _trabalhador(arquivo, perfil, papel, segundos, largada, resultados, semente):
+    """
+    Um "worker do servidor": cada operação é uma requisição (a conexão é
+    devolvida ao fim de cada uma, como faz o Django). Leitores fazem as
+    consultas das listagens e do dashboard; escritores, movimentações de estoque.
+    """
+    _configurar(arquivo, perfil)
+    from decimal import Decimal
+    from django.db import OperationalError, close_old_connections
+    from django.db.models import F, Sum
+    from atelier.estoque import movimentar_estoque
+    from atelier.models import Cliente, Material, MovimentacaoEstoque
+
+    sorteio = random.Random(semente)
+    materiais = list(Material.objects.values_list('pk', flat=True))
+    close_old_connections()
+
+    def ler():
+        consulta = sorteio.randrange(3)
+        if consulta == 0:
+            list(Material.objects.filter(pk__gte=sorteio.choice(materiais)).order_by('pk')[:20])
+        elif consulta == 1:
+            list(Cliente.objects.filter(nome__startswith=f'Cliente {sorteio.randrange(50):02d}')[:10])
+        else:
+            Material.objects.aggregate(total=Sum(F('quantidade_estoque') * F('preco_unitario')))
+
+    def escrever():
+        material = Material(pk=sorteio.choice(materiais))
+        movimentar_estoque(material, MovimentacaoEstoque.AJUSTE, Decimal('-1'))
+
+    operacao = ler if papel == 'leitura' else escrever
+    tempos = []
+    erros = 0
+    largada.wait()
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        try:
+            operacao()
+        except OperationalError:
+            # "database is locked": a requisição falharia com erro 500
+            erros += 1
+        else:
+            tempos.append(time.perf_counter() - inicio)
+        # Fim da "requisição": fecha a conexão ou a mantém, conforme o CONN_MAX_AGE do perfil
+        close_old_connections()
+    resultados.put((papel, tempos, erros))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara os perfis do SQLite (core/sqlite.py) com vários processos lendo e escrevendo "
+        "ao mesmo tempo, numa cópia de teste do banco (o banco de verdade não é usado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leitores', type=int, default=8, help="Processos só de leitura (padrão: 8).")
+        parser.add_argument('--escritores', type=int, default=4, help="Processos que gravam (padrão: 4).")
+        parser.add_argument('--segundos', type=float, default=10, help="Duração de cada rodada (padrão: 10).")
+        parser.add_argument('--perfis', default=','.join(PERFIS), help="Perfis comparados, separados por vírgula.")
+
+    def handle(self, *args, **options):
+        perfis = [perfil.strip() for perfil in options['perfis'].split(',') if perfil.strip()]
+        desconhecidos = set(perfis) - set(PERFIS)
+        if desconhecidos:
+            raise CommandError(f"Perfil desconhecido: {', '.join(sorted(desconhecidos))}")
+
+        contexto = multiprocessing.get_context('spawn')
+        pasta = tempfile.mkdtemp(prefix='medir_banco_')
+        try:
+            base = os.path.join(pasta, 'base.sqlite3')
+            self.stdout.write("Preparando o banco de teste...")
+            preparo = contexto.Process(target=_preparar, args=(base,))
+            preparo.start()
+            preparo.join()
+            if preparo.exitcode:
+                raise CommandError("Falha ao preparar o banco de teste.")
+
+            self.stdout.write(
+                f"{options['leitores']} leitor(es) e {options['escritores']} escritor(es), {options['segundos']:g}s por perfil\n"
+            )
+            self.stdout.write(
+                f"{'perfil':<12} {'leituras/s':>11} {'escritas/s':>11} {'p95 leitura':>12} {'p95 escrita':>12} {'erros':>6}"
+            )
+            for perfil in perfis:
+                arquivo = os.path.join(pasta, f'{perfil}.sqlite3')
+                shutil.copyfile(base, arquivo)
+                linha = self._rodada(contexto, arquivo, perfil, options)
+                self.stdout.write(
+                    f"{perfil:<12} {linha['leitura']['vazao']:>11.0f} {linha['escrita']['vazao']:>11.0f} "
+                    f"{linha['leitura']['p95']:>10.1f}ms {linha['escrita']['p95']:>10.1f}ms {linha['erros']:>6}"
+                )
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    def _rodada(self, contexto, arquivo, perfil, options):
+        papeis = ['leitura'] * options['leitores'] + ['escrita'] * options['escritores']
+        largada = contexto.Barrier(len(papeis))
+        resultados = contexto.Queue()
+        processos = [
+            contexto.Process(
+                target=_trabalhador, args=(arquivo, perfil, papel, options['segundos'], largada, resultados, semente),
+            )
+            for semente, papel in enumerate(papeis)
+        ]
+        for processo in processos:
+            processo.start()
+        coletados = [resultados.get() for _processo in processos]
+        for processo in processos:
+            processo.join()
+
+        linha = {'erros': sum(erros for _papel, _tempos, erros in coletados)}
+        for papel in ('leitura', 'escrita'):
+            tempos = [tempo for tipo, lista, _erros in coletados if tipo == papel for tempo in lista]
+            linha[papel] = {
+                'vazao': len(tempos) / options['segundos'],
+                'p95': statistics.quantiles(tempos, n=20)[-1] * 1000 if len(tempos) > 1 else 0,
+            }
+        return linha
@@ -0,0 +1,110 @@
+import random
+import time
+from datetime import time as horario
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.models import Material, Produto, ItemComposicao
+from atelier.precificacao import precificar, CENTAVOS
+
+
+def _detalhamento_antigo(produto, itens):
+    """
+    O cálculo como era feito nos métodos get_* do Produto (e repetido na
+    página do produto): cada método refaz os anteriores e reconverte os
+    valores com Decimal(str(...)). Mantido aqui só como base de comparação.
+    """
+    def tempo_em_decimal():
+        if not produto.tempo_trabalho_horas:
+            return Decimal('0.0')
+        horas = Decimal(str(produto.tempo_trabalho_horas.hour))
+        minutos = Decimal(str(produto.tempo_trabalho_horas.minute))
+        return horas + (minutos / Decimal('60.0'))
+
+    def custo_total_materiais():
+        soma = sum(item.quantidade_utilizada * item.material.preco_unitario for item in itens)
+        return Decimal(str(soma)) if soma else Decimal('0.0')
+
+    def preco_final_sugerido():
+        total_base = custo_total_materiais() + tempo_em_decimal() * Decimal(str(produto.valor_hora_trabalho))
+        margem = Decimal(str(produto.margem_lucro_percentual))
+        desconto = Decimal(str(produto.desconto_valor))
+        return total_base * (Decimal('1') + (margem / Decimal('100'))) - desconto
+
+    def lucro_liquido():
+        preco_venda = preco_final_sugerido()
+        custo_total = custo_total_materiais() + tempo_em_decimal() * Decimal(str(produto.valor_hora_trabalho))
+        return preco_venda - custo_total
+
+    custo_materiais = custo_total_materiais()
+    custo_mao_de_obra = tempo_em_decimal() * Decimal(str(produto.valor_hora_trabalho))
+    return {
+        'custo_materiais': custo_materiais,
+        'custo_mao_de_obra': custo_mao_de_obra,
+        'custo_base': custo_materiais + custo_mao_de_obra,
+        'preco_sugerido': preco_final_sugerido(),
+        'lucro_liquido': lucro_liquido(),
+    }
+
+
+def _catalogo(quantidade, itens_por_produto, semente=42):
+    """Produtos e composições só em memória (nada é gravado)"""
+    sorteio = random.Random(semente)
+    materiais = [
+        Material(pk=numero, nome=f'Material {numero}', preco_unitario=Decimal(sorteio.randint(50, 9000)) / 100)
+        for numero in range(1, 201)
+    ]
+    catalogo = []
+    for numero in range(1, quantidade + 1):
+        produto = Produto(
+            pk=numero, nome=f'Produto {numero}',
+            tempo_trabalho_horas=horario(sorteio.randint(0, 8), sorteio.choice([0, 15, 30, 45])),
+            valor_hora_trabalho=Decimal(sorteio.choice([12, 15, 20, 25])),
+            margem_lucro_percentual=Decimal(sorteio.choice([30, 50, 80])),
+            desconto_valor=Decimal(sorteio.choice([0, 0, 5])),
+        )
+        itens = [
+            ItemComposicao(produto=produto, material=material, quantidade_utilizada=Decimal(sorteio.randint(100, 3000)) / 1000)
+            for material in sorteio.sample(materiais, itens_por_produto)
+        ]
+        catalogo.append((produto, itens))
+    return catalogo
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o detalhamento do preço em uma passada (atelier/precificacao.py) com o "
+        "cálculo antigo dos métodos get_* do Produto, em produtos montados só em memória."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=2000, help="Produtos por rodada (padrão: 2000).")
+        parser.add_argument('--itens', type=int, default=5, help="Materiais na composição de cada produto (padrão: 5).")
+        parser.add_argument('--repeticoes', type=int, default=5, help="Rodadas; vale a mais rápida (padrão: 5).")
+
+    def handle(self, *args, **options):
+        if not 1 <= options['itens'] <= 200:
+            raise CommandError("--itens precisa estar entre 1 e 200.")
+        catalogo = _catalogo(options['produtos'], options['itens'])
+
+        # Os dois cálculos precisam chegar aos mesmos valores (em centavos)
+        for produto, itens in catalogo:
+            antigo, novo = _detalhamento_antigo(produto, itens), precificar(produto, itens)
+            for campo, valor in antigo.items():
+                if valor.quantize(CENTAVOS) != getattr(novo, campo).quantize(CENTAVOS):
+                    raise CommandError(f"{produto.nome}: {campo} antigo {valor} x novo {getattr(novo, campo)}")
+
+        tempos = {}
+        for nome, calcular in (('antigo', _detalhamento_antigo), ('uma passada', precificar)):
+            rodadas = []
+            for _rodada in range(options['repeticoes']):
+                inicio = time.perf_counter()
+                for produto, itens in catalogo:
+                    calcular(produto, itens)
+                rodadas.append(time.perf_counter() - inicio)
+            tempos[nome] = min(rodadas) / len(catalogo) * 1_000_000
+            self.stdout.write(f"{nome:<12} {tempos[nome]:>8.1f} µs por produto")
+        self.stdout.write(self.style.SUCCESS(
+            f"{tempos['antigo'] / tempos['uma passada']:.1f}x mais rápido "
+            f"({options['produtos']} produtos com {options['itens']} materiais cada)"
+        ))
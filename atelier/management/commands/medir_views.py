@@ -0,0 +1,94 @@
+import json
+import platform
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from atelier.medicao import urls_das_views, medir, novo_cliente
+from atelier.models import Produto, Material, Venda, Cliente
+
+# Regressão: mais consultas que antes, ou mediana acima de (1 + tolerância) x a anterior
+TOLERANCIA = 0.25
+# e pelo menos esta diferença em ms (variações de 1-2ms em views rápidas são ruído)
+DIFERENCA_MINIMA_MS = 2
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo e o número de consultas de cada view (atelier e tarefas) na base atual "
+        "e grava em JSON; com --comparar, aponta as regressões em relação a uma medição anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--saida', help="Arquivo JSON com o resultado (padrão: só mostra na tela).")
+        parser.add_argument('--comparar', help="JSON de uma medição anterior; termina com erro se houver regressão.")
+        parser.add_argument('--repeticoes', type=int, default=5, help="Requisições medidas por view (padrão: 5).")
+        parser.add_argument('--tolerancia', type=float, default=TOLERANCIA, help=f"Aumento de tempo tolerado (padrão: {TOLERANCIA}).")
+        parser.add_argument('--filtro', default='', help="Mede só as views cujo nome contém este texto.")
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError("--repeticoes precisa ser pelo menos 1.")
+        cliente = novo_cliente()
+        views = {}
+        self.stdout.write(f"{'view':<36} {'status':>6} {'consultas':>9} {'mediana':>10} {'p95':>10} {'bytes':>10}")
+        for nome, url, parametros in urls_das_views():
+            if options['filtro'] not in nome:
+                continue
+            resultado = {'url': url, 'parametros': parametros, **medir(cliente, url, parametros, options['repeticoes'])}
+            views[nome] = resultado
+            self.stdout.write(
+                f"{nome:<36} {resultado['status']:>6} {resultado['consultas']:>9} "
+                f"{resultado['mediana_ms']:>8.1f}ms {resultado['p95_ms']:>8.1f}ms {resultado['bytes']:>10}"
+            )
+
+        medicao = {
+            'gerado_em': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': {
+                'arquivo': str(settings.DATABASES['default']['NAME']),
+                'perfil': settings.DATABASES['default'].get('PERFIL', ''),
+            },
+            'base': {
+                'produtos': Produto.objects.count(),
+                'materiais': Material.objects.count(),
+                'clientes': Cliente.objects.count(),
+                'vendas': Venda.objects.count(),
+            },
+            'repeticoes': options['repeticoes'],
+            'views': views,
+        }
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(medicao, arquivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Medição gravada em {options['saida']}."))
+
+        if options['comparar']:
+            self._comparar(medicao, options['comparar'], options['tolerancia'])
+
+    def _comparar(self, medicao, caminho, tolerancia):
+        with open(caminho, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        if anterior.get('base') != medicao['base']:
+            self.stderr.write(f"Atenção: bases diferentes ({anterior.get('base')} x {medicao['base']}).")
+
+        regressoes = []
+        for nome, atual in medicao['views'].items():
+            antes = anterior.get('views', {}).get(nome)
+            if antes is None:
+                continue
+            if atual['consultas'] > antes['consultas']:
+                regressoes.append(f"{nome}: {antes['consultas']} -> {atual['consultas']} consultas")
+            limite = max(antes['mediana_ms'] * (1 + tolerancia), antes['mediana_ms'] + DIFERENCA_MINIMA_MS)
+            if atual['mediana_ms'] > limite:
+                regressoes.append(f"{nome}: mediana {antes['mediana_ms']:.1f}ms -> {atual['mediana_ms']:.1f}ms")
+            if atual['status'] != antes['status']:
+                regressoes.append(f"{nome}: status {antes['status']} -> {atual['status']}")
+
+        if regressoes:
+            for regressao in regressoes:
+                self.stderr.write(f"REGRESSÃO {regressao}")
+            raise CommandError(f"{len(regressoes)} regressão(ões) em relação a {caminho}.")
+        self.stdout.write(self.style.SUCCESS(f"Sem regressões em relação a {caminho}."))
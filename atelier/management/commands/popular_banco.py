@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.dados_sinteticos import gerar_dados, ESCALAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria uma base sintética para medir as views com volume (produtos, materiais, composições, "
+        "clientes e vendas). Use um arquivo separado: SQLITE_ARQUIVO=/tmp/medicao.sqlite3"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escala', default='1k',
+            help=f"Quantidade de cada tipo de registro: {', '.join(ESCALAS)} ou um número (padrão: 1k).",
+        )
+        parser.add_argument('--semente', type=int, default=42, help="Semente do sorteio (mesma semente, mesma base).")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            criados = gerar_dados(options['escala'], options['semente'], avisar=self.stdout.write)
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        duracao = time.perf_counter() - inicio
+        resumo = ', '.join(f"{quantidade} {tipo}" for tipo, quantidade in criados.items())
+        self.stdout.write(self.style.SUCCESS(f"Base criada em {duracao:.1f}s: {resumo}."))
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+
+from atelier.resumos import recalcular_resumos, recalcular_estatisticas_clientes
+
+
+class Command(BaseCommand):
+    help = "Refaz os resumos diários e mensais de vendas e as estatísticas dos clientes a partir de todas as vendas (carga inicial ou correção)."
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        dias, meses = recalcular_resumos()
+        clientes = recalcular_estatisticas_clientes()
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{dias} resumo(s) diário(s), {meses} mensal(is) e {clientes} cliente(s) atualizados em {duracao:.2f}s."
+        ))
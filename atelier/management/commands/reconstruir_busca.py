@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.busca import reconstruir_indice, disponivel
+
+
+class Command(BaseCommand):
+    help = "Refaz o índice de busca textual (FTS5) de produtos, materiais, categorias e clientes."
+
+    def handle(self, *args, **options):
+        if not disponivel():
+            raise CommandError("A busca textual usa FTS5 e só está disponível no SQLite.")
+        inicio = time.perf_counter()
+        total = reconstruir_indice()
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"{total} registro(s) indexado(s) em {duracao:.2f}s."))
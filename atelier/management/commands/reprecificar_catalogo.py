@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+
+from atelier.reprecificacao import reprecificar_produtos, reprecificar_por_material, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = "Recalcula custo, preço e lucro de todo o catálogo (ou dos produtos de um material) em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--material', type=int, help="Reprecifica apenas os produtos que usam este material (id).")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Produtos por lote (padrão: %(default)s).")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+
+        if options['material']:
+            total = reprecificar_por_material(options['material'], options['lote'])
+        else:
+            total = reprecificar_produtos(tamanho_lote=options['lote'])
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"{total} produto(s) reprecificado(s) em {duracao:.2f}s."))
@@ -0,0 +1,117 @@
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+
+
+class TratadorFalso(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _responder(self, status, dados, cabecalhos=()):
+        corpo = json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in cabecalhos:
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_POST(self):
+        servidor = self.server
+        dados = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        chave = self.headers.get('Idempotency-Key', '')
+        time.sleep(servidor.atraso)
+        if random.random() < servidor.falhas:
+            servidor.escrever(f"503 simulado para {chave}")
+            self._responder(503, {'error': 'indisponível (simulado)'})
+            return
+        espera = servidor.espera_do_limite()
+        if espera:
+            servidor.escrever(f"429 para {chave}: limite por minuto (Retry-After {espera}s)")
+            self._responder(429, {'error': 'limite de envios'}, [('Retry-After', str(espera))])
+            return
+        if not dados.get('to') or not dados.get('text', {}).get('body'):
+            self._responder(400, {'error': 'mensagem incompleta'})
+            return
+        if not str(dados['to']).isdigit() or len(str(dados['to'])) not in (12, 13):
+            self._responder(400, {'error': 'número inválido'})
+            return
+        with servidor.trava:
+            repetida = chave in servidor.recebidas
+            if not repetida:
+                servidor.recebidas[chave] = f'wamid.falso.{len(servidor.recebidas) + 1}'
+            identificador = servidor.recebidas[chave]
+        if repetida:
+            servidor.escrever(f"Repetida (ignorada): {chave}")
+        else:
+            servidor.escrever(f"Para {dados['to']} [{chave}]: {dados['text']['body']}")
+        self._responder(200, {'messages': [{'id': identificador}]})
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorFalso(ThreadingHTTPServer):
+    """
+    Imita a API do WhatsApp: 200 com um id por chave de idempotência (repetir a
+    chave não gera outra mensagem), 400 para mensagem incompleta ou número
+    inválido, 503 numa fração das chamadas e 429 com Retry-After acima do
+    limite por minuto. porta=0 escolhe uma porta livre (server_address).
+    """
+
+    def __init__(self, porta=8025, falhas=0, atraso=0, limite_por_minuto=0, escrever=lambda texto: None):
+        super().__init__(('127.0.0.1', porta), TratadorFalso)
+        self.falhas = falhas
+        self.atraso = atraso
+        self.limite_por_minuto = limite_por_minuto
+        self.escrever = escrever
+        self.recebidas = {}
+        self.trava = threading.Lock()
+        self.inicio_janela = time.monotonic()
+        self.chamadas_na_janela = 0
+
+    def espera_do_limite(self):
+        """Segundos até a próxima janela de um minuto se o limite estourou (0: pode enviar)"""
+        if not self.limite_por_minuto:
+            return 0
+        with self.trava:
+            decorrido = time.monotonic() - self.inicio_janela
+            if decorrido >= 60:
+                self.inicio_janela, self.chamadas_na_janela, decorrido = time.monotonic(), 0, 0
+            if self.chamadas_na_janela >= self.limite_por_minuto:
+                return max(1, math.ceil(60 - decorrido))
+            self.chamadas_na_janela += 1
+            return 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Servidor HTTP local que imita a API do WhatsApp, para testar o worker de envio sem "
+        "chamar o serviço de verdade. Aponte WHATSAPP_URL para ele."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--porta', type=int, default=8025)
+        parser.add_argument('--falhas', type=float, default=0, help="Fração das chamadas respondidas com erro 503 (0 a 1).")
+        parser.add_argument('--atraso', type=float, default=0, help="Segundos de espera antes de cada resposta.")
+        parser.add_argument(
+            '--limite-por-minuto', type=int, default=0,
+            help="Chamadas aceitas por minuto; as demais recebem 429 com Retry-After (padrão: sem limite).",
+        )
+
+    def handle(self, *args, **options):
+        servidor = ServidorFalso(
+            options['porta'], options['falhas'], options['atraso'], options['limite_por_minuto'], self.stdout.write,
+        )
+        self.stdout.write(f"API falsa do WhatsApp em http://127.0.0.1:{options['porta']}/ (Ctrl+C para sair)")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+        self.stdout.write(f"{len(servidor.recebidas)} mensagem(ns) diferente(s) recebida(s).")
@@ -0,0 +1,105 @@
+"""
+Medição das views: as URLs de atelier/urls.py e tarefas/urls.py montadas com
+registros de exemplo da base, tempo e número de consultas de cada uma. Usado
+pelo comando medir_views (com a base do popular_banco) e pelos orçamentos de
+consultas dos testes.
+"""
+import statistics
+import time
+from importlib import import_module
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from atelier.models import Produto, Material, Venda, Cliente
+from tarefas.models import Tarefa
+
+MODULOS_URLS = ('atelier.urls', 'tarefas.urls')
+
+# Parâmetros de GET que exercitam o caso principal de cada view (busca com texto, etc.)
+PARAMETROS = {
+    'atelier:busca': {'q': 'linho'},
+    'atelier:autocompletar_clientes': {'q': '119'},
+}
+
+
+def amostras():
+    """
+    Valor de cada parâmetro das URLs (<int:produto_id> etc.): registros que
+    exercitam a página inteira (produto com composição e vendas, cliente com compras).
+    """
+    produto_vendido = Venda.objects.order_by('pk').values_list('produto_id', flat=True).first()
+    return {
+        'produto_id': produto_vendido or Produto.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'material_id': Material.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'venda_id': Venda.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'cliente_id': Cliente.objects.order_by('-quantidade_compras', 'pk').values_list('pk', flat=True).first(),
+        'pk': Tarefa.objects.order_by('pk').values_list('pk', flat=True).first(),
+    }
+
+
+def urls_das_views(valores=None, modulos=MODULOS_URLS):
+    """
+    [(nome, url, parâmetros do GET)] de todas as rotas dos módulos, com os parâmetros
+    preenchidos; rotas cujo parâmetro não tem registro de exemplo ficam de fora.
+    """
+    valores = amostras() if valores is None else valores
+    urls = []
+    for modulo in modulos:
+        configuracao = import_module(modulo)
+        prefixo = f"{configuracao.app_name}:" if getattr(configuracao, 'app_name', None) else ''
+        for rota in configuracao.urlpatterns:
+            nome = prefixo + rota.name
+            parametros = {parametro: valores.get(parametro) for parametro in rota.pattern.converters}
+            if None in parametros.values():
+                continue
+            urls.append((nome, reverse(nome, kwargs=parametros), PARAMETROS.get(nome, {})))
+    return urls
+
+
+def _consumir(resposta):
+    """Tamanho do corpo; respostas em streaming são lidas até o fim (o tempo inclui gerá-las)"""
+    if resposta.streaming:
+        return sum(len(pedaco) for pedaco in resposta.streaming_content)
+    return len(resposta.content)
+
+
+def medir(cliente, url, parametros=None, repeticoes=5, cache_frio=False):
+    """
+    Uma requisição de aquecimento e `repeticoes` medidas. As consultas são as
+    da última (com cache_frio, o cache é limpo antes de cada uma).
+    """
+    tempos = []
+    for numero in range(repeticoes + 1):
+        if cache_frio:
+            cache.clear()
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            resposta = cliente.get(url, parametros or {})
+            tamanho = _consumir(resposta)
+            duracao = time.perf_counter() - inicio
+        if numero:
+            tempos.append(duracao * 1000)
+    return {
+        'status': resposta.status_code,
+        'consultas': len(consultas),
+        'bytes': tamanho,
+        'mediana_ms': round(statistics.median(tempos), 2),
+        'p95_ms': round(statistics.quantiles(tempos, n=20)[-1], 2) if len(tempos) > 1 else round(tempos[0], 2),
+        'minimo_ms': round(min(tempos), 2),
+    }
+
+
+def contar_consultas(cliente, url, parametros=None):
+    """Consultas de uma requisição com o cache vazio (o pior caso, o mesmo em toda execução)"""
+    cache.clear()
+    with CaptureQueriesContext(connection) as consultas:
+        _consumir(cliente.get(url, parametros or {}))
+    return len(consultas)
+
+
+def novo_cliente():
+    # Host aceito pelo ALLOWED_HOSTS de desenvolvimento, fora do executor de testes
+    return Client(HTTP_HOST='localhost')
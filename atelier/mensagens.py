@@ -0,0 +1,268 @@
+import http.client
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import timedelta
+from urllib.parse import quote, urlsplit
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from atelier.models import Venda, MensagemWhatsapp
+from atelier.telefones import numero_whatsapp
+
+logger = logging.getLogger(__name__)
+
+# Mensagens reservadas (e enviadas) por vez pelo worker
+TAMANHO_LOTE = 50
+
+# Tempo que um lote fica reservado para o worker; se ele cair, outro retoma depois disso
+RESERVA = timedelta(minutes=5)
+
+# O lote para de enviar na metade da reserva (a folga cobre o último envio, que
+# pode levar o tempo limite do transporte); as restantes voltam para a fila
+DURACAO_MAXIMA_LOTE = RESERVA / 2
+
+# Nova tentativa em 30s, 1min, 2min... (com variação aleatória), até 1h entre tentativas
+ESPERA_INICIAL = 30  # segundos
+ESPERA_MAXIMA = 60 * 60
+MAXIMO_TENTATIVAS = 10
+
+
+# --- MENSAGEM ---
+def link_whatsapp(venda):
+    """Link wa.me com o recibo já escrito, para enviar à mão pelo celular"""
+    numero = numero_whatsapp(venda.cliente.telefone) if venda.cliente else ''
+    if not numero:
+        return ''
+    return f"https://wa.me/{numero}?text={quote(venda.gerar_mensagem_whatsapp())}"
+
+
+def mensagem_do_recibo(venda):
+    """A mensagem da caixa de saída para o recibo da venda (None se o cliente não tem WhatsApp)"""
+    numero = numero_whatsapp(venda.cliente.telefone) if venda.cliente else ''
+    if not numero:
+        return None
+    return MensagemWhatsapp(
+        chave=f'recibo-{venda.pk}', venda=venda, telefone=numero, texto=venda.gerar_mensagem_whatsapp(),
+    )
+
+
+@receiver(post_save, sender=Venda)
+def enfileirar_recibo(sender, instance, created, **kwargs):
+    # Ainda dentro da transação de Venda.save(): a venda e a mensagem gravam
+    # juntas, e nenhuma chamada externa atrasa o registro da venda
+    if created:
+        mensagem = mensagem_do_recibo(instance)
+        if mensagem is not None:
+            mensagem.save()
+
+
+# --- TRANSPORTES ---
+class ErroTemporario(Exception):
+    """Falha que vale tentar de novo (rede, API fora do ar, limite de envios)"""
+
+    def __init__(self, mensagem, espera=None):
+        super().__init__(mensagem)
+        # Segundos pedidos pela API (Retry-After), se informados
+        self.espera = espera
+
+
+class ErroPermanente(Exception):
+    """Falha que se repetiria em toda tentativa (número inválido, mensagem recusada)"""
+
+
+class Transporte:
+    """
+    Entrega das mensagens. enviar() devolve normalmente quando a mensagem foi
+    aceita e levanta ErroTemporario ou ErroPermanente quando não. Usado como
+    context manager pelo worker, para reaproveitar a conexão entre os envios.
+    """
+
+    def __init__(self, **opcoes):
+        self.opcoes = opcoes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        self.fechar()
+
+    def fechar(self):
+        pass
+
+    def enviar(self, mensagem):
+        raise NotImplementedError
+
+
+class TransporteLog(Transporte):
+    """Só registra a mensagem no log (desenvolvimento, sem API configurada)"""
+
+    def enviar(self, mensagem):
+        logger.info("WhatsApp para %s [%s]: %s", mensagem.telefone, mensagem.chave, mensagem.texto)
+
+
+class TransporteHttp(Transporte):
+    """
+    POST JSON no formato da API do WhatsApp Business (Cloud API), com a chave
+    de idempotência no cabeçalho Idempotency-Key. Serve também para o
+    servidor falso local (python manage.py whatsapp_falso).
+    """
+
+    def __init__(self, url, token='', tempo_limite=10, **opcoes):
+        super().__init__(**opcoes)
+        partes = urlsplit(url)
+        self.https = partes.scheme == 'https'
+        self.servidor = partes.netloc
+        self.caminho = (partes.path or '/') + (f'?{partes.query}' if partes.query else '')
+        self.token = token
+        self.tempo_limite = tempo_limite
+        self.conexao = None
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
+
+    def _conexao(self):
+        if self.conexao is None:
+            classe = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conexao = classe(self.servidor, timeout=self.tempo_limite)
+        return self.conexao
+
+    def enviar(self, mensagem):
+        corpo = json.dumps({
+            'messaging_product': 'whatsapp',
+            'to': mensagem.telefone,
+            'type': 'text',
+            'text': {'body': mensagem.texto},
+        }).encode()
+        cabecalhos = {'Content-Type': 'application/json', 'Idempotency-Key': mensagem.chave}
+        if self.token:
+            cabecalhos['Authorization'] = f'Bearer {self.token}'
+        try:
+            conexao = self._conexao()
+            conexao.request('POST', self.caminho, body=corpo, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            detalhe = resposta.read()[:500].decode(errors='replace')
+        except (OSError, http.client.HTTPException) as erro:
+            # Conexão caída ou recusada: a próxima tentativa abre outra
+            self.fechar()
+            raise ErroTemporario(f"{type(erro).__name__}: {erro}") from erro
+
+        if 200 <= resposta.status < 300:
+            return
+        erro = f"HTTP {resposta.status}: {detalhe}"
+        if resposta.status in (408, 425, 429) or resposta.status >= 500:
+            espera = resposta.getheader('Retry-After')
+            raise ErroTemporario(erro, int(espera) if espera and espera.isdigit() else None)
+        raise ErroPermanente(erro)
+
+
+def obter_transporte():
+    """O transporte configurado em settings.WHATSAPP"""
+    configuracao = getattr(settings, 'WHATSAPP', {})
+    classe = import_string(configuracao.get('TRANSPORTE', 'atelier.mensagens.TransporteLog'))
+    return classe(**configuracao.get('OPCOES', {}))
+
+
+# --- ENVIO (worker) ---
+def reservar_lote(tamanho=TAMANHO_LOTE):
+    """
+    Reserva as próximas mensagens vencidas para este worker. O UPDATE só pega
+    as que continuam vencidas: se outro worker reservou antes, a data delas
+    já foi para o futuro e elas ficam de fora.
+    """
+    agora = timezone.now()
+    reserva = uuid.uuid4().hex
+    ids = list(
+        MensagemWhatsapp.objects
+        .filter(situacao=MensagemWhatsapp.PENDENTE, proxima_tentativa__lte=agora)
+        .order_by('proxima_tentativa', 'pk')
+        .values_list('pk', flat=True)[:tamanho]
+    )
+    if not ids:
+        return []
+    MensagemWhatsapp.objects.filter(
+        pk__in=ids, situacao=MensagemWhatsapp.PENDENTE, proxima_tentativa__lte=agora,
+    ).update(reserva=reserva, proxima_tentativa=agora + RESERVA)
+    return list(MensagemWhatsapp.objects.filter(pk__in=ids, reserva=reserva).order_by('proxima_tentativa', 'pk'))
+
+
+def espera_da_tentativa(tentativas):
+    """Espera exponencial com variação aleatória (os reenvios não chegam todos juntos)"""
+    espera = min(ESPERA_MAXIMA, ESPERA_INICIAL * 2 ** (tentativas - 1))
+    return timedelta(seconds=espera * random.uniform(0.5, 1))
+
+
+def _gravar_resultado(mensagem):
+    # Só grava se a reserva ainda é deste lote (nenhum outro worker retomou a mensagem)
+    MensagemWhatsapp.objects.filter(pk=mensagem.pk, reserva=mensagem.reserva).update(
+        situacao=mensagem.situacao, tentativas=mensagem.tentativas, proxima_tentativa=mensagem.proxima_tentativa,
+        ultimo_erro=mensagem.ultimo_erro, enviada_em=mensagem.enviada_em,
+    )
+
+
+def enviar_lote(transporte, mensagens):
+    """
+    Envia as mensagens reservadas, gravando o resultado de cada uma assim que
+    sai (uma queda no meio do lote não reenvia as que já foram). Passado
+    DURACAO_MAXIMA_LOTE, as que faltam voltam para a fila sem tentativa
+    contada. Devolve (enviadas, reagendadas, falhas).
+    """
+    enviadas = reagendadas = falhas = 0
+    prazo = time.monotonic() + DURACAO_MAXIMA_LOTE.total_seconds()
+    for posicao, mensagem in enumerate(mensagens):
+        if time.monotonic() >= prazo:
+            restantes = mensagens[posicao:]
+            logger.warning("Lote interrompido pelo tempo: %s mensagem(ns) voltam para a fila", len(restantes))
+            for restante in restantes:
+                MensagemWhatsapp.objects.filter(pk=restante.pk, reserva=restante.reserva).update(
+                    proxima_tentativa=timezone.now(),
+                )
+            break
+
+        mensagem.tentativas += 1
+        try:
+            transporte.enviar(mensagem)
+        except ErroPermanente as erro:
+            mensagem.situacao = MensagemWhatsapp.FALHOU
+            mensagem.ultimo_erro = str(erro)
+        except Exception as erro:
+            # ErroTemporario ou falha inesperada do transporte: tenta de novo mais tarde
+            if not isinstance(erro, ErroTemporario):
+                logger.exception("Falha inesperada ao enviar a mensagem %s", mensagem.chave)
+            mensagem.ultimo_erro = str(erro)
+            if mensagem.tentativas >= MAXIMO_TENTATIVAS:
+                mensagem.situacao = MensagemWhatsapp.FALHOU
+            else:
+                espera = getattr(erro, 'espera', None)
+                mensagem.proxima_tentativa = timezone.now() + (
+                    timedelta(seconds=espera) if espera else espera_da_tentativa(mensagem.tentativas)
+                )
+        else:
+            mensagem.situacao = MensagemWhatsapp.ENVIADA
+            mensagem.enviada_em = timezone.now()
+            mensagem.ultimo_erro = ''
+        _gravar_resultado(mensagem)
+
+        if mensagem.situacao == MensagemWhatsapp.ENVIADA:
+            enviadas += 1
+        elif mensagem.situacao == MensagemWhatsapp.FALHOU:
+            falhas += 1
+            logger.warning("Mensagem %s desistida: %s", mensagem.chave, mensagem.ultimo_erro)
+        else:
+            reagendadas += 1
+
+    return enviadas, reagendadas, falhas
+
+
+def reenviar(mensagens):
+    """Volta mensagens (as que falharam, por exemplo) para a fila, para já"""
+    return mensagens.exclude(situacao=MensagemWhatsapp.ENVIADA).update(
+        situacao=MensagemWhatsapp.PENDENTE, tentativas=0, proxima_tentativa=timezone.now(), ultimo_erro='',
+    )
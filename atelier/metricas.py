@@ -0,0 +1,249 @@
+"""
+Métricas no formato do Prometheus (GET /metrics), somadas entre todos os
+processos do servidor num arquivo SQLite próprio (METRICAS em settings.py):
+a coleta lê só esse arquivo, nunca o banco principal. Cada processo acumula
+em memória e grava a soma no arquivo no máximo uma vez por INTERVALO_GRAVACAO.
+"""
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from atelier.models import Material, MovimentacaoEstoque
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_GRAVACAO = 1  # segundos
+VIEW_DA_COLETA = 'atelier:metricas'
+# Limites do histograma de tempo das requisições, em segundos
+INTERVALOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# nome -> (tipo, descrição)
+DEFINICOES = {
+    'atelier_requisicoes_total': ('counter', "Requisições atendidas, por view e status."),
+    'atelier_requisicao_segundos': ('histogram', "Tempo das requisições, por view."),
+    'atelier_consultas_sql_total': ('counter', "Consultas SQL feitas pelas requisições, por view."),
+    'atelier_vendas_total': ('counter', "Vendas registradas, por método de pagamento."),
+    'atelier_vendas_valor_reais_total': ('counter', "Valor das vendas registradas, em reais."),
+    'atelier_entradas_estoque_total': ('counter', "Entradas de material registradas."),
+    'atelier_movimentacoes_estoque_total': ('counter', "Movimentações de estoque, por tipo."),
+    'atelier_materiais_estoque_baixo': ('gauge', "Materiais com saldo no estoque mínimo ou abaixo."),
+    'atelier_recibos_gerados_total': ('counter', "Recibos montados (novos ou refeitos)."),
+}
+
+_CRIAR_TABELA = """
+CREATE TABLE IF NOT EXISTS serie (
+    familia TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    rotulos TEXT NOT NULL,
+    valor REAL NOT NULL,
+    PRIMARY KEY (nome, rotulos)
+)
+"""
+
+# (familia, nome, rotulos) -> valor; somas e valores absolutos (gauges) ainda não gravados
+_somas = {}
+_valores = {}
+_trava = threading.Lock()
+_ultima_gravacao = time.monotonic()
+_estoque_baixo_pendente = False
+
+
+def _rotulos(rotulos):
+    escapar = lambda valor: str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{chave}="{escapar(valor)}"' for chave, valor in sorted(rotulos.items()))
+
+
+def incrementar(nome, valor=1, **rotulos):
+    with _trava:
+        chave = (nome, nome, _rotulos(rotulos))
+        _somas[chave] = _somas.get(chave, 0) + valor
+    _talvez_gravar()
+
+
+def observar(nome, valor, **rotulos):
+    """Uma observação no histograma (os intervalos são acumulados, como pede o Prometheus)"""
+    base = _rotulos(rotulos)
+    separador = ',' if base else ''
+    with _trava:
+        for limite in (*INTERVALOS, '+Inf'):
+            if limite == '+Inf' or valor <= limite:
+                chave = (nome, f'{nome}_bucket', f'{base}{separador}le="{limite}"')
+                _somas[chave] = _somas.get(chave, 0) + 1
+        for sufixo, quantidade in (('_sum', valor), ('_count', 1)):
+            chave = (nome, nome + sufixo, base)
+            _somas[chave] = _somas.get(chave, 0) + quantidade
+    _talvez_gravar()
+
+
+# --- ARQUIVO COMPARTILHADO ---
+def _conectar():
+    conexao = sqlite3.connect(settings.METRICAS['ARQUIVO'], timeout=5)
+    # Métricas podem perder os últimos segundos numa queda: sem esperar o disco
+    conexao.execute('PRAGMA journal_mode = WAL')
+    conexao.execute('PRAGMA synchronous = OFF')
+    conexao.execute(_CRIAR_TABELA)
+    return conexao
+
+
+def _talvez_gravar():
+    if time.monotonic() - _ultima_gravacao >= INTERVALO_GRAVACAO:
+        gravar()
+
+
+def gravar(recontar_estoque=True):
+    """
+    Soma no arquivo o que este processo acumulou desde a última gravação.
+    recontar_estoque=False: não consulta o banco principal (a recontagem fica para a próxima).
+    """
+    global _ultima_gravacao, _estoque_baixo_pendente
+    with _trava:
+        somas, valores = dict(_somas), dict(_valores)
+        _somas.clear()
+        _valores.clear()
+        _ultima_gravacao = time.monotonic()
+        recontar = recontar_estoque and _estoque_baixo_pendente
+        if recontar:
+            _estoque_baixo_pendente = False
+    if recontar:
+        try:
+            valores[('atelier_materiais_estoque_baixo', 'atelier_materiais_estoque_baixo', '')] = contar_estoque_baixo()
+        except Exception:
+            logger.warning("Contagem dos materiais com estoque baixo falhou", exc_info=True)
+    if not somas and not valores:
+        return
+    try:
+        conexao = _conectar()
+        try:
+            with conexao:
+                conexao.executemany(
+                    'INSERT INTO serie (familia, nome, rotulos, valor) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (nome, rotulos) DO UPDATE SET valor = valor + excluded.valor',
+                    [(*chave, valor) for chave, valor in somas.items()],
+                )
+                conexao.executemany(
+                    'INSERT OR REPLACE INTO serie (familia, nome, rotulos, valor) VALUES (?, ?, ?, ?)',
+                    [(*chave, valor) for chave, valor in valores.items()],
+                )
+        finally:
+            conexao.close()
+    except sqlite3.Error:
+        # As métricas nunca derrubam a requisição: o acumulado volta para a próxima gravação
+        logger.warning("Gravação das métricas falhou", exc_info=True)
+        with _trava:
+            for chave, valor in somas.items():
+                _somas[chave] = _somas.get(chave, 0) + valor
+            for chave, valor in valores.items():
+                _valores.setdefault(chave, valor)
+
+
+atexit.register(gravar)
+
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(valor)
+
+
+def _ordem(linha):
+    # Intervalos do histograma em ordem numérica, com o +Inf por último
+    nome, rotulos, _valor = linha
+    if not nome.endswith('_bucket'):
+        return nome, rotulos, 0.0
+    base, _le, limite = rotulos.rpartition('le="')
+    return nome, base, float(limite.rstrip('"'))
+
+
+def exportar():
+    """O texto da coleta (formato de exposição do Prometheus), lido só do arquivo de métricas"""
+    gravar(recontar_estoque=False)
+    conexao = _conectar()
+    try:
+        linhas = conexao.execute('SELECT familia, nome, rotulos, valor FROM serie').fetchall()
+    finally:
+        conexao.close()
+    por_familia = {}
+    for familia, nome, rotulos, valor in linhas:
+        por_familia.setdefault(familia, []).append((nome, rotulos, valor))
+
+    saida = []
+    for familia, (tipo, descricao) in DEFINICOES.items():
+        saida.append(f'# HELP {familia} {descricao}')
+        saida.append(f'# TYPE {familia} {tipo}')
+        for nome, rotulos, valor in sorted(por_familia.get(familia, []), key=_ordem):
+            saida.append(f'{nome}{{{rotulos}}} {_numero(valor)}' if rotulos else f'{nome} {_numero(valor)}')
+    return '\n'.join(saida) + '\n'
+
+
+# --- REQUISIÇÕES ---
+class _ContadorConsultas:
+    def __init__(self):
+        self.consultas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas += 1
+        return execute(sql, params, many, context)
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICAS['ATIVAS']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        contador = _ContadorConsultas()
+        inicio = time.perf_counter()
+        with connections['default'].execute_wrapper(contador):
+            resposta = self.get_response(request)
+        duracao = time.perf_counter() - inicio
+
+        correspondencia = request.resolver_match
+        # Sem rota (404) fica tudo numa série só: cada URL inventada não vira uma série nova
+        view = correspondencia.view_name if correspondencia else '<sem rota>'
+        if view == VIEW_DA_COLETA:
+            # A coleta não se conta: uma gravação aqui poderia recontar o estoque no banco principal
+            return resposta
+        incrementar('atelier_requisicoes_total', view=view, status=resposta.status_code)
+        incrementar('atelier_consultas_sql_total', contador.consultas, view=view)
+        observar('atelier_requisicao_segundos', duracao, view=view)
+        return resposta
+
+
+# --- ESTOQUE ---
+def contar_estoque_baixo():
+    return Material.objects.filter(estoque_baixo=True).count()
+
+
+def estoque_alterado():
+    """O número de materiais com estoque baixo é recontado na próxima gravação (uma vez, por mais que o estoque mude)"""
+    global _estoque_baixo_pendente
+    _estoque_baixo_pendente = True
+    _talvez_gravar()
+
+
+def movimentacoes_registradas(tipos):
+    """Depois do commit: conta as movimentações (lista com o tipo de cada uma) e marca o estoque para recontagem"""
+    def registrar():
+        for tipo in set(tipos):
+            incrementar('atelier_movimentacoes_estoque_total', tipos.count(tipo), tipo=tipo)
+        estoque_alterado()
+    transaction.on_commit(registrar)
+
+
+@receiver(post_save, sender=MovimentacaoEstoque)
+def contar_movimentacao(sender, instance, created, **kwargs):
+    # Movimentações dos receivers do estoque (consumo, estorno, ajuste) e das entradas
+    if created:
+        movimentacoes_registradas([instance.tipo])
+
+
+@receiver(post_save, sender=Material)
+def material_alterado(sender, instance, **kwargs):
+    # O estoque mínimo pode ter mudado no cadastro, sem movimentação
+    transaction.on_commit(estoque_alterado)
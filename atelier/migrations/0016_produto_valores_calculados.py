@@ -0,0 +1,106 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:00
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def preencher_valores_calculados(apps, schema_editor):
+    """Calcula as novas colunas para os produtos já cadastrados"""
+    Produto = apps.get_model("atelier", "Produto")
+    ItemComposicao = apps.get_model("atelier", "ItemComposicao")
+    centavos = Decimal("0.01")
+
+    for produto in Produto.objects.all():
+        custo_materiais = sum(
+            (
+                item.quantidade_utilizada * item.material.preco_unitario
+                for item in ItemComposicao.objects.filter(
+                    produto=produto
+                ).select_related("material")
+            ),
+            Decimal("0"),
+        )
+        tempo = produto.tempo_trabalho_horas
+        horas = (
+            Decimal(tempo.hour) + Decimal(tempo.minute) / Decimal("60")
+            if tempo
+            else Decimal("0")
+        )
+        custo_mao_de_obra = horas * Decimal(str(produto.valor_hora_trabalho))
+        custo_total = custo_materiais + custo_mao_de_obra
+        valor_com_margem = custo_total * (
+            Decimal("1")
+            + Decimal(str(produto.margem_lucro_percentual)) / Decimal("100")
+        )
+        preco_sugerido = valor_com_margem - Decimal(str(produto.desconto_valor))
+
+        produto.custo_materiais = custo_materiais
+        produto.custo_mao_de_obra = custo_mao_de_obra.quantize(centavos)
+        produto.preco_final = valor_com_margem.quantize(centavos)
+        produto.preco_sugerido = preco_sugerido.quantize(centavos)
+        produto.lucro_liquido = (preco_sugerido - custo_total).quantize(centavos)
+        produto.save(
+            update_fields=[
+                "custo_materiais",
+                "custo_mao_de_obra",
+                "preco_final",
+                "preco_sugerido",
+                "lucro_liquido",
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0015_alter_material_unidade_medida"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="produto",
+            name="custo_mao_de_obra",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=10,
+                verbose_name="Mão de Obra (R$)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="produto",
+            name="custo_materiais",
+            field=models.DecimalField(
+                decimal_places=5,
+                default=0,
+                editable=False,
+                max_digits=15,
+                verbose_name="Custo dos Materiais (R$)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="produto",
+            name="lucro_liquido",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=10,
+                verbose_name="Lucro Líquido (R$)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="produto",
+            name="preco_sugerido",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=10,
+                verbose_name="Preço Sugerido (R$)",
+            ),
+        ),
+        migrations.RunPython(preencher_valores_calculados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0016_produto_valores_calculados"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(fields=["nome", "id"], name="cliente_nome_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(fields=["nome", "id"], name="material_nome_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                fields=["categoria", "nome", "id"], name="material_cat_nome_id_idx"
+            ),
+        ),
+    ]
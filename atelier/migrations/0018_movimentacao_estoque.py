@@ -0,0 +1,141 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def registrar_saldo_inicial(apps, schema_editor):
+    """
+    O histórico começa agora: o saldo atual de cada material entra como um
+    ajuste inicial, mantendo a soma das movimentações igual ao saldo.
+    """
+    Material = apps.get_model("atelier", "Material")
+    MovimentacaoEstoque = apps.get_model("atelier", "MovimentacaoEstoque")
+    agora = timezone.now()
+    MovimentacaoEstoque.objects.bulk_create(
+        MovimentacaoEstoque(
+            material_id=material.pk,
+            tipo="AJUSTE",
+            quantidade=material.quantidade_estoque,
+            data=agora,
+        )
+        for material in Material.objects.exclude(quantidade_estoque=0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0017_indices_listagens"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MovimentacaoEstoque",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("ENTRADA", "Entrada (Compra)"),
+                            ("CONSUMO", "Consumo em Produto"),
+                            ("ESTORNO", "Estorno de Consumo"),
+                            ("AJUSTE", "Ajuste Manual"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("quantidade", models.DecimalField(decimal_places=3, max_digits=12)),
+                ("data", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "entrada",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="atelier.entradamaterial",
+                    ),
+                ),
+                (
+                    "material",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="movimentacoes",
+                        to="atelier.material",
+                    ),
+                ),
+                (
+                    "produto",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="atelier.produto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Movimentação de Estoque",
+                "verbose_name_plural": "Movimentações de Estoque",
+                "indexes": [
+                    models.Index(
+                        fields=["material", "data"],
+                        name="movimentacao_material_data_idx",
+                    ),
+                    models.Index(
+                        fields=["tipo", "data"], name="movimentacao_tipo_data_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SaldoEstoque",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("data", models.DateTimeField()),
+                ("quantidade", models.DecimalField(decimal_places=3, max_digits=12)),
+                (
+                    "material",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="saldos",
+                        to="atelier.material",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Saldo de Estoque",
+                "verbose_name_plural": "Saldos de Estoque",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("material", "data"), name="saldo_material_data_unico"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(registrar_saldo_inicial, migrations.RunPython.noop),
+    ]
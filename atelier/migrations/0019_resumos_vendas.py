@@ -0,0 +1,182 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:10
+
+from collections import defaultdict
+from zoneinfo import ZoneInfo
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+
+def preencher_resumos(apps, schema_editor):
+    """
+    Vendas antigas recebem como custo o custo atual do produto (o histórico
+    não existe) e os resumos diários e mensais são montados a partir delas.
+    """
+    Venda = apps.get_model("atelier", "Venda")
+    Produto = apps.get_model("atelier", "Produto")
+    ResumoVendasDia = apps.get_model("atelier", "ResumoVendasDia")
+    ResumoVendasMes = apps.get_model("atelier", "ResumoVendasMes")
+
+    produto = Produto.objects.filter(pk=OuterRef("produto_id"))
+    Venda.objects.filter(custo_total__isnull=True).update(
+        custo_total=Subquery(
+            produto.annotate(
+                custo=F("custo_materiais") + F("custo_mao_de_obra")
+            ).values("custo")[:1]
+        )
+    )
+
+    por_dia = (
+        Venda.objects.annotate(
+            dia=TruncDate("data_venda", tzinfo=ZoneInfo("America/Sao_Paulo"))
+        )
+        .values("dia", "metodo_pagamento")
+        .annotate(
+            receita=Sum("valor_venda"),
+            quantidade=Count("id"),
+            custo=Sum("custo_total"),
+        )
+        .order_by()
+    )
+    meses = defaultdict(lambda: {"receita": 0, "quantidade": 0, "lucro": 0})
+    dias = []
+    for linha in por_dia:
+        lucro = linha["receita"] - (linha["custo"] or 0)
+        dias.append(
+            ResumoVendasDia(
+                dia=linha["dia"],
+                metodo_pagamento=linha["metodo_pagamento"],
+                receita=linha["receita"],
+                quantidade=linha["quantidade"],
+                lucro=lucro,
+            )
+        )
+        mes = meses[(linha["dia"].replace(day=1), linha["metodo_pagamento"])]
+        mes["receita"] += linha["receita"]
+        mes["quantidade"] += linha["quantidade"]
+        mes["lucro"] += lucro
+
+    ResumoVendasDia.objects.bulk_create(dias, batch_size=1000)
+    ResumoVendasMes.objects.bulk_create(
+        [
+            ResumoVendasMes(mes=mes, metodo_pagamento=metodo, **totais)
+            for (mes, metodo), totais in meses.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0018_movimentacao_estoque"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="venda",
+            name="custo_total",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                editable=False,
+                max_digits=12,
+                null=True,
+                verbose_name="Custo na Venda (R$)",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ResumoVendasDia",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dia", models.DateField()),
+                (
+                    "metodo_pagamento",
+                    models.CharField(
+                        choices=[
+                            ("PIX", "Pix"),
+                            ("CREDITO", "Cartão de Crédito"),
+                            ("DEBITO", "Cartão de Débito"),
+                            ("DINHEIRO", "Dinheiro"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "receita",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("quantidade", models.IntegerField(default=0)),
+                (
+                    "lucro",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumo de Vendas (Dia)",
+                "verbose_name_plural": "Resumos de Vendas (Dia)",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dia", "metodo_pagamento"),
+                        name="resumo_dia_metodo_unico",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ResumoVendasMes",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mes", models.DateField()),
+                (
+                    "metodo_pagamento",
+                    models.CharField(
+                        choices=[
+                            ("PIX", "Pix"),
+                            ("CREDITO", "Cartão de Crédito"),
+                            ("DEBITO", "Cartão de Débito"),
+                            ("DINHEIRO", "Dinheiro"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "receita",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("quantidade", models.IntegerField(default=0)),
+                (
+                    "lucro",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumo de Vendas (Mês)",
+                "verbose_name_plural": "Resumos de Vendas (Mês)",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("mes", "metodo_pagamento"),
+                        name="resumo_mes_metodo_unico",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+
+def preencher_estatisticas(apps, schema_editor):
+    """Estatísticas de compras dos clientes já cadastrados, a partir das vendas"""
+    Cliente = apps.get_model("atelier", "Cliente")
+    Venda = apps.get_model("atelier", "Venda")
+    vendas = Venda.objects.filter(cliente=OuterRef("pk")).order_by().values("cliente")
+    Cliente.objects.update(
+        total_gasto=Coalesce(
+            Round(
+                Subquery(vendas.annotate(total=Sum("valor_venda")).values("total")), 2
+            ),
+            Value(0),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        quantidade_compras=Coalesce(
+            Subquery(vendas.annotate(quantidade=Count("id")).values("quantidade")),
+            Value(0),
+        ),
+        primeira_compra=Subquery(
+            vendas.annotate(primeira=Min("data_venda")).values("primeira")
+        ),
+        ultima_compra=Subquery(
+            vendas.annotate(ultima=Max("data_venda")).values("ultima")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0019_resumos_vendas"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cliente",
+            name="primeira_compra",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="cliente",
+            name="quantidade_compras",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Compras"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cliente",
+            name="total_gasto",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=12,
+                verbose_name="Total Gasto (R$)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="cliente",
+            name="ultima_compra",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                fields=["total_gasto", "id"], name="cliente_gasto_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="venda",
+            index=models.Index(
+                fields=["cliente", "data_venda"], name="venda_cliente_data_idx"
+            ),
+        ),
+        migrations.RunPython(preencher_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:20
+
+from django.db import migrations
+
+# Mesma definição de atelier/busca.py (a migração não importa o código do app)
+SQL_CRIAR_TABELA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS atelier_busca USING fts5("
+    "tipo UNINDEXED, objeto_id UNINDEXED, titulo, conteudo, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# rowid = id * 4 + código do tipo (produto 0, material 1, categoria 2, cliente 3)
+SQL_PREENCHER = [
+    "INSERT INTO atelier_busca (rowid, tipo, objeto_id, titulo, conteudo) "
+    "SELECT id * 4, 'produto', id, nome, COALESCE(descricao, '') FROM atelier_produto",
+    "INSERT INTO atelier_busca (rowid, tipo, objeto_id, titulo, conteudo) "
+    "SELECT m.id * 4 + 1, 'material', m.id, m.nome, COALESCE(c.nome, '') "
+    "FROM atelier_material m "
+    "LEFT JOIN atelier_categoriamaterial c ON c.id = m.categoria_id",
+    "INSERT INTO atelier_busca (rowid, tipo, objeto_id, titulo, conteudo) "
+    "SELECT id * 4 + 2, 'categoria', id, nome, '' FROM atelier_categoriamaterial",
+    "INSERT INTO atelier_busca (rowid, tipo, objeto_id, titulo, conteudo) "
+    "SELECT id * 4 + 3, 'cliente', id, nome, "
+    "TRIM(COALESCE(email, '') || ' ' || COALESCE(endereco, '')) FROM atelier_cliente",
+]
+
+
+def criar_indice(apps, schema_editor):
+    """Índice FTS5 só existe no SQLite; nos outros bancos a busca usa icontains"""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in [SQL_CRIAR_TABELA, *SQL_PREENCHER]:
+        schema_editor.execute(sql)
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS atelier_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0020_estatisticas_clientes"),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:10
+
+import re
+
+from django.db import migrations, models
+
+# Cópia de atelier/telefones.py como estava nesta migração (a migração não
+# importa o código do app: ele pode mudar depois sem mudar o que ela grava)
+TAMANHOS_COM_DDD = (10, 11)
+
+
+def normalizar_telefone(valor):
+    """Só os dígitos, com DDD e sem o código do país nem o zero (e a operadora) da longa distância"""
+    digitos = re.sub(r"\D", "", valor or "")
+    if len(digitos) in (12, 13) and digitos.startswith("55"):
+        digitos = digitos[2:]
+    elif digitos.startswith("0"):
+        sem_zero = digitos[1:]
+        if len(sem_zero) - 2 in TAMANHOS_COM_DDD:
+            sem_zero = sem_zero[2:]
+        digitos = sem_zero
+    return digitos
+
+
+def numero_local(normalizado):
+    """O número sem o DDD"""
+    if len(normalizado) in TAMANHOS_COM_DDD:
+        return normalizado[2:]
+    return normalizado
+
+
+def preencher_telefones(apps, schema_editor):
+    """Chaves de busca do telefone dos clientes já cadastrados"""
+    Cliente = apps.get_model("atelier", "Cliente")
+    telefones = Cliente.objects.exclude(telefone=None).values_list("id", "telefone")
+    linhas = []
+    for id, telefone in telefones.iterator(chunk_size=2000):
+        normalizado = normalizar_telefone(telefone)
+        linhas.append((normalizado, numero_local(normalizado), id))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            "UPDATE atelier_cliente SET telefone_normalizado = %s, telefone_local = %s "
+            "WHERE id = %s",
+            linhas,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0021_busca_textual"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cliente",
+            name="telefone_local",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name="cliente",
+            name="telefone_normalizado",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=20
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                fields=["telefone_normalizado"], name="cliente_telefone_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                fields=["telefone_local"], name="cliente_telefone_local_idx"
+            ),
+        ),
+        migrations.RunPython(preencher_telefones, migrations.RunPython.noop),
+    ]
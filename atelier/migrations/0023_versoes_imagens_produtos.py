@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0022_telefone_normalizado_clientes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="produto",
+            name="derivados_imagens",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0023_versoes_imagens_produtos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Recibo",
+            fields=[
+                (
+                    "venda",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="recibo",
+                        serialize=False,
+                        to="atelier.venda",
+                    ),
+                ),
+                ("data_venda", models.DateTimeField()),
+                ("html", models.TextField()),
+                ("pagina_pdf", models.BinaryField()),
+                ("gerado_em", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["data_venda", "venda"], name="recibo_data_venda_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0024_recibos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MensagemWhatsapp",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chave", models.CharField(max_length=64, unique=True)),
+                ("telefone", models.CharField(max_length=20)),
+                ("texto", models.TextField()),
+                (
+                    "situacao",
+                    models.CharField(
+                        choices=[
+                            ("PENDENTE", "Pendente"),
+                            ("ENVIADA", "Enviada"),
+                            ("FALHOU", "Falhou"),
+                        ],
+                        default="PENDENTE",
+                        max_length=10,
+                    ),
+                ),
+                ("tentativas", models.PositiveIntegerField(default=0)),
+                (
+                    "proxima_tentativa",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "reserva",
+                    models.CharField(
+                        blank=True, default="", editable=False, max_length=32
+                    ),
+                ),
+                ("ultimo_erro", models.TextField(blank=True, default="")),
+                ("criada_em", models.DateTimeField(auto_now_add=True)),
+                ("enviada_em", models.DateTimeField(blank=True, null=True)),
+                (
+                    "venda",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="mensagens_whatsapp",
+                        to="atelier.venda",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Mensagem de WhatsApp",
+                "verbose_name_plural": "Mensagens de WhatsApp",
+                "indexes": [
+                    models.Index(
+                        fields=["situacao", "proxima_tentativa"],
+                        name="mensagem_fila_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0025_caixa_saida_whatsapp"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Trabalho",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nome", models.CharField(max_length=100)),
+                ("argumentos", models.JSONField(blank=True, default=dict)),
+                ("chave", models.CharField(blank=True, default="", max_length=150)),
+                (
+                    "situacao",
+                    models.CharField(
+                        choices=[
+                            ("PENDENTE", "Pendente"),
+                            ("EXECUTANDO", "Executando"),
+                            ("CONCLUIDO", "Concluído"),
+                            ("FALHOU", "Falhou"),
+                        ],
+                        default="PENDENTE",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "executar_em",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("tentativas", models.PositiveIntegerField(default=0)),
+                ("maximo_tentativas", models.PositiveIntegerField(default=3)),
+                (
+                    "reservado_por",
+                    models.CharField(
+                        blank=True, default="", editable=False, max_length=100
+                    ),
+                ),
+                (
+                    "reservado_ate",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                ("resultado", models.JSONField(blank=True, null=True)),
+                ("ultimo_erro", models.TextField(blank=True, default="")),
+                ("criado_em", models.DateTimeField(auto_now_add=True)),
+                ("concluido_em", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Trabalho em Segundo Plano",
+                "verbose_name_plural": "Trabalhos em Segundo Plano",
+                "indexes": [
+                    models.Index(
+                        fields=["situacao", "executar_em"], name="trabalho_fila_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(
+                            ("situacao", "PENDENTE"),
+                            models.Q(("chave", ""), _negated=True),
+                        ),
+                        fields=("chave",),
+                        name="trabalho_pendente_chave_unica",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0026_trabalhos_segundo_plano"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                fields=["data_cadastro", "id"], name="cliente_cadastro_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entradamaterial",
+            index=models.Index(
+                fields=["data_entrada", "id"], name="entrada_data_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="venda",
+            index=models.Index(fields=["data_venda", "id"], name="venda_data_id_idx"),
+        ),
+    ]
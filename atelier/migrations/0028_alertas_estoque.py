@@ -0,0 +1,85 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("atelier", "0027_indices_admin"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AlertaEstoque",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("ENTROU", "Entrou no estoque baixo"),
+                            ("SAIU", "Saiu do estoque baixo"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "quantidade_estoque",
+                    models.DecimalField(decimal_places=2, max_digits=10),
+                ),
+                (
+                    "estoque_minimo",
+                    models.DecimalField(decimal_places=2, max_digits=10),
+                ),
+                ("data", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Alerta de Estoque",
+                "verbose_name_plural": "Alertas de Estoque",
+            },
+        ),
+        migrations.AddField(
+            model_name="material",
+            name="estoque_baixo",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Q(
+                    ("quantidade_estoque__lte", models.F("estoque_minimo"))
+                ),
+                output_field=models.BooleanField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                condition=models.Q(("estoque_baixo", True)),
+                fields=["nome", "id"],
+                name="material_baixo_nome_id_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="alertaestoque",
+            name="material",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="alertas",
+                to="atelier.material",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="alertaestoque",
+            index=models.Index(fields=["data", "id"], name="alerta_data_id_idx"),
+        ),
+    ]
@@ -1,17 +1,66 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef, Subquery, Sum, F, Q, DecimalField
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from datetime import time
 from decimal import Decimal
 import datetime
 
+from atelier.banco import DatasPorFaixaQuerySet
+from atelier.precificacao import custo_dos_itens, precificar
+from atelier.telefones import normalizar_telefone, numero_local
+
 class Cliente(models.Model):
     nome = models.CharField(max_length=150, verbose_name="Nome Completo")
     telefone = models.CharField(max_length=20, blank=True, null=True, verbose_name="Telefone/WhatsApp")
     email = models.EmailField(blank=True, null=True, verbose_name="E-mail")
     endereco = models.TextField(blank=True, null=True, verbose_name="Endereço")
     data_cadastro = models.DateTimeField(auto_now_add=True)
+    # Estatísticas de compras, mantidas a cada venda salva ou excluída (ver atelier/resumos.py)
+    total_gasto = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, verbose_name="Total Gasto (R$)")
+    quantidade_compras = models.PositiveIntegerField(default=0, editable=False, verbose_name="Compras")
+    primeira_compra = models.DateTimeField(null=True, blank=True, editable=False)
+    ultima_compra = models.DateTimeField(null=True, blank=True, editable=False)
+    # Chaves de busca do telefone, mantidas pelo save(): só dígitos com DDD e o número sem DDD
+    telefone_normalizado = models.CharField(max_length=20, blank=True, default='', editable=False)
+    telefone_local = models.CharField(max_length=20, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # Listagem paginada por (nome, id)
+            models.Index(fields=['nome', 'id'], name='cliente_nome_id_idx'),
+            # Listagem "melhores clientes" por (total_gasto, id), lida de trás para frente
+            models.Index(fields=['total_gasto', 'id'], name='cliente_gasto_id_idx'),
+            # Autocompletar do caixa: prefixo do telefone, com ou sem DDD
+            models.Index(fields=['telefone_normalizado'], name='cliente_telefone_idx'),
+            models.Index(fields=['telefone_local'], name='cliente_telefone_local_idx'),
+            # Admin: clientes mais recentes primeiro
+            models.Index(fields=['data_cadastro', 'id'], name='cliente_cadastro_id_idx'),
+        ]
+
+    # Gravadas só pelos UPDATEs das vendas: o save() de uma instância lida antes
+    # de uma venda (o formulário de edição, o admin) não pode voltar os valores antigos
+    CAMPOS_ESTATISTICAS = ('total_gasto', 'quantidade_compras', 'primeira_compra', 'ultima_compra')
+
+    def save(self, *args, **kwargs):
+        self.telefone_normalizado = normalizar_telefone(self.telefone)
+        self.telefone_local = numero_local(self.telefone_normalizado)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_ESTATISTICAS
+            ]
+        elif update_fields is not None and 'telefone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'telefone_normalizado', 'telefone_local'}
+        super().save(*args, **kwargs)
+
+    @property
+    def ticket_medio(self):
+        if not self.quantidade_compras:
+            return Decimal('0')
+        return (Decimal(str(self.total_gasto)) / self.quantidade_compras).quantize(Decimal('0.01'))
 
     def __str__(self):
         return self.nome
@@ -42,6 +91,32 @@ class Material(models.Model):
     preco_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     quantidade_estoque = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     estoque_minimo = models.DecimalField(max_digits=10, decimal_places=2, default=1.0) # Alerta quando sobrar só 1 unidade
+    # Coluna calculada pelo próprio banco a cada gravação do saldo ou do mínimo (formulário,
+    # UPDATE com F(), importação em massa), então nunca fica desatualizada
+    estoque_baixo = models.GeneratedField(
+        expression=Q(quantidade_estoque__lte=F('estoque_minimo')),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Listagem paginada por (nome, id), com ou sem filtro de categoria
+            models.Index(fields=['nome', 'id'], name='material_nome_id_idx'),
+            models.Index(fields=['categoria', 'nome', 'id'], name='material_cat_nome_id_idx'),
+            # Alerta e reposição: só os materiais com estoque baixo entram no índice
+            models.Index(fields=['nome', 'id'], condition=Q(estoque_baixo=True), name='material_baixo_nome_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda preço, saldo e mínimo lidos do banco para saber, no post_save, o que mudou
+        valores = dict(zip(field_names, values))
+        instance._preco_unitario_original = valores.get('preco_unitario')
+        instance._quantidade_estoque_original = valores.get('quantidade_estoque')
+        instance._estoque_minimo_original = valores.get('estoque_minimo')
+        return instance
 
     @property
     def precisa_repor(self):
@@ -56,20 +131,47 @@ class EntradaMaterial(models.Model):
     preco_unitario_na_compra = models.DecimalField(max_digits=10, decimal_places=2, help_text="Preço pago por unidade nesta compra")
     data_entrada = models.DateTimeField(auto_now_add=True)
 
+    # Navegação por data do admin pelo índice de data_entrada
+    objects = DatasPorFaixaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Admin: entradas mais recentes primeiro
+            models.Index(fields=['data_entrada', 'id'], name='entrada_data_id_idx'),
+        ]
+
     def save(self, *args, **kwargs):
-        # 1. Quando salvamos a entrada, atualizamos o estoque principal
-        self.material.quantidade_estoque += self.quantidade_adicionada
-        
-        # 2. Atualizamos também o preço unitário do material para os próximos cálculos
-        self.material.preco_unitario = self.preco_unitario_na_compra
-        
-        self.material.save()
-        super().save(*args, **kwargs)
+        from atelier.estoque import movimentar_estoque
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Soma a quantidade ao estoque e atualiza o preço unitário do material
+            # direto no banco (UPDATE ... SET quantidade = quantidade + X), sem
+            # ler-modificar-gravar: entradas simultâneas não se perdem.
+            movimentar_estoque(
+                self.material, MovimentacaoEstoque.ENTRADA, self.quantidade_adicionada,
+                preco_unitario=self.preco_unitario_na_compra, entrada=self,
+            )
 
     def __str__(self):
         return f"Entrada: {self.material.nome} (+{self.quantidade_adicionada})"
 
 
+class ProdutoQuerySet(models.QuerySet):
+
+    def com_situacao_venda(self):
+        """
+        Anota se o produto já foi vendido e o id da primeira venda (para o link
+        do recibo), evitando uma consulta por linha na listagem.
+        """
+        vendas = Venda.objects.filter(produto=OuterRef('pk'))
+        return self.annotate(
+            vendido=Exists(vendas),
+            venda_id=Subquery(vendas.order_by('pk').values('pk')[:1]),
+        )
+
+
 class Produto(models.Model):
     nome = models.CharField(max_length=100, verbose_name="Nome do Produto")
     descricao = models.TextField(blank=True, verbose_name="Descrição do Produto")
@@ -87,59 +189,99 @@ class Produto(models.Model):
     imagem_frente = models.ImageField(upload_to='produtos/', null=True, blank=True)
     imagem_lado = models.ImageField(upload_to='produtos/', null=True, blank=True)
     imagem_tras = models.ImageField(upload_to='produtos/', null=True, blank=True)
+    # Versões reduzidas (WebP/JPEG) de cada foto, geradas fora da requisição (ver atelier/imagens.py):
+    # {campo: {'origem': nome da foto, 'larguras': [100, 400, ...]}}
+    derivados_imagens = models.JSONField(default=dict, blank=True, editable=False)
     
     # Campo para salvar o preço final calculado
     preco_final = models.DecimalField(max_digits=10, decimal_places=2, editable=False, default=0)
 
-    # --- MÉTODO AUXILIAR PARA CONVERTER TEMPO PARA DECIMAL (Retornando Decimal) ---
+    # --- VALORES CALCULADOS GUARDADOS NO BANCO ---
+    # Atualizados quando a composição ou o preço de um material muda, assim as
+    # listagens leem colunas em vez de percorrer todos os itens do produto.
+    # O custo de materiais usa 5 casas (quantidade com 3 x preço com 2) para
+    # não arredondar antes de aplicar a margem.
+    custo_materiais = models.DecimalField(max_digits=15, decimal_places=5, editable=False, default=0, verbose_name="Custo dos Materiais (R$)")
+    custo_mao_de_obra = models.DecimalField(max_digits=10, decimal_places=2, editable=False, default=0, verbose_name="Mão de Obra (R$)")
+    preco_sugerido = models.DecimalField(max_digits=10, decimal_places=2, editable=False, default=0, verbose_name="Preço Sugerido (R$)")
+    lucro_liquido = models.DecimalField(max_digits=10, decimal_places=2, editable=False, default=0, verbose_name="Lucro Líquido (R$)")
+
+    CAMPOS_CALCULADOS = ['custo_materiais', 'custo_mao_de_obra', 'preco_final', 'preco_sugerido', 'lucro_liquido']
+    CAMPOS_IMAGEM = ('imagem_frente', 'imagem_lado', 'imagem_tras')
+
+    objects = ProdutoQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Fotos lidas do banco: o post_save só gera versões das que foram trocadas (ver atelier/imagens.py)
+        valores = dict(zip(field_names, values))
+        instance._imagens_conhecidas = {campo: valores[campo] for campo in cls.CAMPOS_IMAGEM if campo in valores}
+        return instance
+
+    @cached_property
+    def precificacao(self):
+        """Detalhamento do preço pelas colunas guardadas (calculado uma vez por instância)"""
+        return precificar(self)
+
+    # --- ATALHOS (o cálculo é o de atelier/precificacao.py) ---
+    # Calculados na hora pela composição atual, como sempre foram; nas
+    # listagens, prefira as colunas guardadas ou produto.precificacao.
     def get_tempo_em_decimal(self):
         """Converte o objeto TimeField (HH:MM) para Decimal de horas (ex: 4.5)"""
-        if not self.tempo_trabalho_horas:
-            return Decimal('0.0')
-        
-        horas = Decimal(str(self.tempo_trabalho_horas.hour))
-        minutos = Decimal(str(self.tempo_trabalho_horas.minute))
-        # Divide minutos por 60 para ter a fração decimal da hora
-        return horas + (minutos / Decimal('60.0'))
+        return precificar(self).horas
 
     def get_custo_total_materiais(self):
-        # Garante que o retorno seja sempre Decimal, mesmo que a lista esteja vazia
-        soma = sum(item.subtotal_material() for item in self.materiais.all())
-        return Decimal(str(soma)) if soma else Decimal('0.0')
-
-    def calcular_e_salvar_preco(self):
-        """Calcula e persiste o preço no banco de dados"""
-        custo_materiais = self.get_custo_total_materiais()
-        custo_mao_de_obra = self.get_tempo_em_decimal() * Decimal(str(self.valor_hora_trabalho))
-        
-        custo_total = custo_materiais + custo_mao_de_obra
-        margem = Decimal(str(self.margem_lucro_percentual))
-        
-        # Preço com margem aplicada
-        self.preco_final = custo_total * (Decimal('1') + (margem / Decimal('100')))
-        self.save()
+        return custo_dos_itens(self.materiais.select_related('material'))
 
     def get_preco_final_sugerido(self):
         """Retorna o valor final com margem e desconto aplicado"""
-        custo_materiais = self.get_custo_total_materiais()
-        custo_mao_de_obra = self.get_tempo_em_decimal() * Decimal(str(self.valor_hora_trabalho))
-        
-        total_base = custo_materiais + custo_mao_de_obra
-        margem = Decimal(str(self.margem_lucro_percentual))
-        desconto = Decimal(str(self.desconto_valor))
-        
-        valor_com_margem = total_base * (Decimal('1') + (margem / Decimal('100')))
-        return valor_com_margem - desconto
+        return precificar(self, self.materiais.select_related('material')).preco_sugerido
 
     def get_lucro_liquido(self):
         """Preço de venda menos custos reais (materiais + mão de obra)"""
-        preco_venda = self.get_preco_final_sugerido()
-        custo_materiais = self.get_custo_total_materiais()
-        custo_mao_de_obra = self.get_tempo_em_decimal() * Decimal(str(self.valor_hora_trabalho))
-        
-        custo_total = custo_materiais + custo_mao_de_obra
-        return preco_venda - custo_total
-    
+        return precificar(self, self.materiais.select_related('material')).lucro_liquido
+
+    def somar_custo_materiais(self):
+        """Soma (quantidade x preço unitário) dos itens em uma única agregação no banco"""
+        total = self.materiais.aggregate(
+            total=Sum(F('quantidade_utilizada') * F('material__preco_unitario'),
+                      output_field=DecimalField(max_digits=15, decimal_places=5))
+        )['total']
+        return total if total is not None else Decimal('0.0')
+
+    def calcular_valores_derivados(self):
+        """
+        Recalcula mão de obra, preço final, preço sugerido e lucro a partir do
+        custo de materiais já guardado (sem consultar o banco).
+        """
+        precos = precificar(self)
+        self.custo_mao_de_obra = precos.custo_mao_de_obra
+        self.preco_final = precos.valor_com_margem
+        self.preco_sugerido = precos.preco_sugerido
+        self.lucro_liquido = precos.lucro_liquido
+        # As entradas podem ter mudado: o detalhamento guardado passa a ser este
+        self.__dict__['precificacao'] = precos
+
+    def atualizar_custos(self):
+        """Recalcula o custo de materiais e grava apenas as colunas calculadas"""
+        self.custo_materiais = self.somar_custo_materiais()
+        self.calcular_valores_derivados()
+        Produto.objects.filter(pk=self.pk).update(
+            **{campo: getattr(self, campo) for campo in self.CAMPOS_CALCULADOS}
+        )
+
+    def calcular_e_salvar_preco(self):
+        """Calcula e persiste o preço no banco de dados"""
+        self.custo_materiais = self.somar_custo_materiais()
+        # O save() recalcula preço final, preço sugerido e lucro
+        self.save()
+
+    def save(self, *args, **kwargs):
+        # Margem, horas ou desconto podem ter mudado: mantém as colunas coerentes
+        self.calcular_valores_derivados()
+        super().save(*args, **kwargs)
+
     def esta_vendido(self):
         return self.vendas.exists()
 
@@ -169,6 +311,29 @@ class Venda(models.Model):
     metodo_pagamento = models.CharField(max_length=20, choices=METODO_PAGAMENTO)
     observacoes = models.TextField(blank=True, null=True)
     cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='vendas')
+    # Custo do produto (materiais + mão de obra) no momento da venda, para o lucro dos relatórios
+    custo_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False, verbose_name="Custo na Venda (R$)")
+
+    # Navegação por data do admin pelo índice de data_venda
+    objects = DatasPorFaixaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Últimas compras de um cliente sem ordenar todas as vendas dele
+            models.Index(fields=['cliente', 'data_venda'], name='venda_cliente_data_idx'),
+            # Vendas mais recentes primeiro e navegação por data no admin (date_hierarchy)
+            models.Index(fields=['data_venda', 'id'], name='venda_data_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores lidos do banco: na edição/exclusão os resumos desfazem a contribuição antiga
+        instance._resumo_original = instance.valores_do_resumo()
+        return instance
+
+    def valores_do_resumo(self):
+        return (self.data_venda, self.metodo_pagamento, self.valor_venda, self.custo_total, self.cliente_id)
 
     def gerar_mensagem_whatsapp(self):
         nome = self.cliente.nome if self.cliente else "Cliente"
@@ -179,11 +344,276 @@ class Venda(models.Model):
         )
         return texto
 
-    def save(self, *args, **kwargs):   
-        super().save(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        if self.custo_total is None and self.produto_id:
+            self.custo_total = (
+                Decimal(str(self.produto.custo_materiais)) + Decimal(str(self.produto.custo_mao_de_obra))
+            ).quantize(Decimal('0.01'))
+        # Venda e resumos de vendas (atualizados no post_save) gravam juntos
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Venda: {self.produto.nome} - {self.data_venda.strftime('%d/%m/%Y')}"
+
+
+class Recibo(models.Model):
+    """
+    Recibo de uma venda já montado (HTML e página PDF), gerado quando a venda
+    é salva (ver atelier/recibos.py). É o retrato da venda naquele momento.
+    """
+    venda = models.OneToOneField(Venda, on_delete=models.CASCADE, primary_key=True, related_name='recibo')
+    # Cópia da data da venda: a impressão em lote lê só esta tabela, pelo índice
+    data_venda = models.DateTimeField()
+    html = models.TextField()
+    # Conteúdo da página do PDF, já comprimido (ver atelier/pdf.py)
+    pagina_pdf = models.BinaryField()
+    gerado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_venda', 'venda'], name='recibo_data_venda_idx'),
+        ]
+
+    def __str__(self):
+        return f"Recibo nº {self.venda_id}"
+
+
+class MensagemWhatsapp(models.Model):
+    """
+    Caixa de saída das mensagens de WhatsApp (o recibo de cada venda). A
+    linha é gravada na mesma transação da venda e enviada depois pelo worker
+    (python manage.py enviar_mensagens), fora da requisição. Ver atelier/mensagens.py.
+    """
+    PENDENTE = 'PENDENTE'
+    ENVIADA = 'ENVIADA'
+    FALHOU = 'FALHOU'
+    SITUACOES = [
+        (PENDENTE, 'Pendente'),
+        (ENVIADA, 'Enviada'),
+        (FALHOU, 'Falhou'),
+    ]
+
+    # Chave de idempotência: vai em cada tentativa, a API descarta as repetidas
+    chave = models.CharField(max_length=64, unique=True)
+    venda = models.ForeignKey(Venda, on_delete=models.SET_NULL, null=True, blank=True, related_name='mensagens_whatsapp')
+    telefone = models.CharField(max_length=20)
+    texto = models.TextField()
+    situacao = models.CharField(max_length=10, choices=SITUACOES, default=PENDENTE)
+    tentativas = models.PositiveIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    # Lote do worker que reservou a mensagem (a reserva vence sozinha se o worker cair)
+    reserva = models.CharField(max_length=32, blank=True, default='', editable=False)
+    ultimo_erro = models.TextField(blank=True, default='')
+    criada_em = models.DateTimeField(auto_now_add=True)
+    enviada_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Mensagem de WhatsApp"
+        verbose_name_plural = "Mensagens de WhatsApp"
+        indexes = [
+            # Próximas pendentes da fila, sem ler as já enviadas
+            models.Index(fields=['situacao', 'proxima_tentativa'], name='mensagem_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.chave} ({self.get_situacao_display()})"
+
+
+class Trabalho(models.Model):
+    """
+    Trabalho em segundo plano (reprecificação, fotografias do estoque...),
+    executado pelos processos de "python manage.py executar_trabalhos" fora
+    das requisições (sem worker, logo depois do commit: TRABALHOS em
+    settings.py). Ver atelier/trabalhos.py.
+    """
+    PENDENTE = 'PENDENTE'
+    EXECUTANDO = 'EXECUTANDO'
+    CONCLUIDO = 'CONCLUIDO'
+    FALHOU = 'FALHOU'
+    SITUACOES = [
+        (PENDENTE, 'Pendente'),
+        (EXECUTANDO, 'Executando'),
+        (CONCLUIDO, 'Concluído'),
+        (FALHOU, 'Falhou'),
+    ]
+
+    # Nome da função registrada em atelier/trabalhos.py e os argumentos dela
+    nome = models.CharField(max_length=100)
+    argumentos = models.JSONField(default=dict, blank=True)
+    # Trabalhos iguais já na fila não são repetidos (ex: reprecificar o mesmo material)
+    chave = models.CharField(max_length=150, blank=True, default='')
+    situacao = models.CharField(max_length=10, choices=SITUACOES, default=PENDENTE)
+    executar_em = models.DateTimeField(default=timezone.now)
+    tentativas = models.PositiveIntegerField(default=0)
+    maximo_tentativas = models.PositiveIntegerField(default=3)
+    # Processo que está executando e até quando; se ele cair, outro retoma depois disso
+    reservado_por = models.CharField(max_length=100, blank=True, default='', editable=False)
+    reservado_ate = models.DateTimeField(null=True, blank=True, editable=False)
+    resultado = models.JSONField(null=True, blank=True)
+    ultimo_erro = models.TextField(blank=True, default='')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabalho em Segundo Plano"
+        verbose_name_plural = "Trabalhos em Segundo Plano"
+        indexes = [
+            # Próximo trabalho vencido, sem ler os já concluídos
+            models.Index(fields=['situacao', 'executar_em'], name='trabalho_fila_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['chave'], condition=models.Q(situacao='PENDENTE') & ~models.Q(chave=''),
+                name='trabalho_pendente_chave_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} #{self.pk} ({self.get_situacao_display()})"
+
+
+class ResumoVendasDia(models.Model):
+    """
+    Totais de vendas por dia (no fuso de São Paulo) e método de pagamento,
+    mantidos a cada venda salva ou excluída (ver atelier/resumos.py).
+    """
+    dia = models.DateField()
+    metodo_pagamento = models.CharField(max_length=20, choices=Venda.METODO_PAGAMENTO)
+    receita = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantidade = models.IntegerField(default=0)
+    lucro = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Resumo de Vendas (Dia)"
+        verbose_name_plural = "Resumos de Vendas (Dia)"
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'metodo_pagamento'], name='resumo_dia_metodo_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia:%d/%m/%Y} {self.metodo_pagamento}: {self.quantidade} venda(s)"
+
+
+class ResumoVendasMes(models.Model):
+    """Totais de vendas por mês (dia 1 do mês) e método de pagamento"""
+    mes = models.DateField()
+    metodo_pagamento = models.CharField(max_length=20, choices=Venda.METODO_PAGAMENTO)
+    receita = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantidade = models.IntegerField(default=0)
+    lucro = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Resumo de Vendas (Mês)"
+        verbose_name_plural = "Resumos de Vendas (Mês)"
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'metodo_pagamento'], name='resumo_mes_metodo_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} {self.metodo_pagamento}: {self.quantidade} venda(s)"
+
+
+class MovimentacaoEstoque(models.Model):
+    """
+    Histórico de tudo que entra e sai do estoque (somente inclusão).
+    A soma das movimentações de um material é igual ao seu saldo atual.
+    """
+    ENTRADA = 'ENTRADA'
+    CONSUMO = 'CONSUMO'
+    ESTORNO = 'ESTORNO'
+    AJUSTE = 'AJUSTE'
+
+    TIPO_CHOICES = [
+        (ENTRADA, 'Entrada (Compra)'),
+        (CONSUMO, 'Consumo em Produto'),
+        (ESTORNO, 'Estorno de Consumo'),
+        (AJUSTE, 'Ajuste Manual'),
+    ]
+
+    # Sem restrição de chave estrangeira: o histórico não muda nem some quando
+    # o material, a entrada ou o produto de origem é excluído.
+    material = models.ForeignKey(Material, on_delete=models.DO_NOTHING, db_constraint=False, related_name='movimentacoes')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    # Positiva quando entra no estoque, negativa quando sai
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3)
+    data = models.DateTimeField(default=timezone.now)
+    entrada = models.ForeignKey(EntradaMaterial, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    produto = models.ForeignKey(Produto, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+
+    class Meta:
+        verbose_name = "Movimentação de Estoque"
+        verbose_name_plural = "Movimentações de Estoque"
+        indexes = [
+            # Saldo numa data e consumo por mês: busca pelo material e faixa de datas
+            models.Index(fields=['material', 'data'], name='movimentacao_material_data_idx'),
+            models.Index(fields=['tipo', 'data'], name='movimentacao_tipo_data_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Movimentações de estoque não podem ser alteradas.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Movimentações de estoque não podem ser excluídas.")
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.material_id} ({self.quantidade:+})"
+
+
+class AlertaEstoque(models.Model):
+    """
+    Passagens do material pelo estoque mínimo: quando entrou no estoque baixo
+    e quando saiu dele (ver registrar_passagens em atelier/estoque.py).
+    """
+    ENTROU = 'ENTROU'
+    SAIU = 'SAIU'
+
+    TIPO_CHOICES = [
+        (ENTROU, 'Entrou no estoque baixo'),
+        (SAIU, 'Saiu do estoque baixo'),
+    ]
+
+    # Como o histórico de movimentações: não some quando o material é excluído
+    material = models.ForeignKey(Material, on_delete=models.DO_NOTHING, db_constraint=False, related_name='alertas')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    # Saldo e mínimo logo depois da passagem
+    quantidade_estoque = models.DecimalField(max_digits=10, decimal_places=2)
+    estoque_minimo = models.DecimalField(max_digits=10, decimal_places=2)
+    data = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Alerta de Estoque"
+        verbose_name_plural = "Alertas de Estoque"
+        indexes = [
+            # Passagens mais recentes (página de reposição e admin)
+            models.Index(fields=['data', 'id'], name='alerta_data_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.material_id} ({self.quantidade_estoque} / mín. {self.estoque_minimo})"
+
+
+class SaldoEstoque(models.Model):
+    """
+    Fotografia periódica do saldo de cada material. O saldo numa data é a
+    última fotografia anterior mais as movimentações feitas depois dela.
+    """
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='saldos')
+    # Inclui todas as movimentações com data menor ou igual a esta
+    data = models.DateTimeField()
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3)
+
+    class Meta:
+        verbose_name = "Saldo de Estoque"
+        verbose_name_plural = "Saldos de Estoque"
+        constraints = [
+            models.UniqueConstraint(fields=['material', 'data'], name='saldo_material_data_unico'),
+        ]
+
+    def __str__(self):
+        return f"Saldo: {self.material_id} em {self.data:%d/%m/%Y %H:%M} = {self.quantidade}"
     
     
 @receiver(post_save, sender=ItemComposicao)
@@ -192,11 +622,14 @@ def ajustar_estoque_no_salvamento(sender, instance, created, **kwargs):
     Quando um material é adicionado a um produto, baixamos o estoque.
     Se for uma edição, compensamos a diferença.
     """
+    from atelier.estoque import movimentar_estoque
+
     if created:
         # Se o item acabou de ser criado, subtrai a quantidade total
-        material = instance.material
-        material.quantidade_estoque -= instance.quantidade_utilizada
-        material.save()
+        movimentar_estoque(
+            instance.material, MovimentacaoEstoque.CONSUMO, -instance.quantidade_utilizada,
+            produto_id=instance.produto_id,
+        )
     # Nota: Lógica de edição complexa pode ser adicionada aqui se necessário.
 
 @receiver(post_delete, sender=ItemComposicao)
@@ -205,20 +638,59 @@ def devolver_estoque_na_delecao(sender, instance, **kwargs):
     Se você deletar um item do produto (ou o produto inteiro), 
     o material volta para o estoque automaticamente.
     """
-    material = instance.material
-    material.quantidade_estoque += instance.quantidade_utilizada
-    material.save()
-    
-def calcular_custo_mao_de_obra(self):
-    if not self.tempo_trabalho_horas:
-        return 0
-    
-    # Se tempo_trabalho_horas for um objeto time (HH:MM:SS)
-    if isinstance(self.tempo_trabalho_horas, time):
-        horas = self.tempo_trabalho_horas.hour
-        minutos = self.tempo_trabalho_horas.minute
-        tempo_decimal = horas + (minutos / 60)
-        return tempo_decimal * self.valor_hora_trabalho
-    
-    # Se ainda for um decimal (caso não tenha migrado o banco)
-    return float(self.tempo_trabalho_horas) * float(self.valor_hora_trabalho)
\ No newline at end of file
+    from atelier.estoque import movimentar_estoque
+
+    movimentar_estoque(
+        instance.material, MovimentacaoEstoque.ESTORNO, instance.quantidade_utilizada,
+        produto_id=instance.produto_id,
+    )
+
+@receiver(post_save, sender=Material)
+def registrar_ajuste_de_estoque(sender, instance, created, **kwargs):
+    """
+    Saldo alterado direto no cadastro do material (formulário ou admin):
+    registra a diferença como ajuste manual no histórico e, se o saldo ou o
+    mínimo fez o material entrar ou sair do estoque baixo, a passagem.
+    """
+    from atelier.estoque import registrar_passagens
+
+    anterior = Decimal('0') if created else getattr(instance, '_quantidade_estoque_original', None)
+    if anterior is None:
+        return
+    quantidade = Decimal(str(instance.quantidade_estoque))
+    minimo = Decimal(str(instance.estoque_minimo))
+    diferenca = quantidade - Decimal(str(anterior))
+    if diferenca:
+        MovimentacaoEstoque.objects.create(material=instance, tipo=MovimentacaoEstoque.AJUSTE, quantidade=diferenca)
+
+    # Material novo começa fora do alerta; sem o mínimo lido do banco, vale o de agora
+    minimo_anterior = getattr(instance, '_estoque_minimo_original', None)
+    estava_baixo = False if created else Decimal(str(anterior)) <= Decimal(str(minimo if minimo_anterior is None else minimo_anterior))
+    registrar_passagens([(instance.pk, estava_baixo, quantidade <= minimo, quantidade, minimo)])
+    instance._quantidade_estoque_original = instance.quantidade_estoque
+    instance._estoque_minimo_original = instance.estoque_minimo
+
+
+@receiver(post_save, sender=ItemComposicao)
+@receiver(post_delete, sender=ItemComposicao)
+def atualizar_custos_do_produto(sender, instance, **kwargs):
+    """
+    Item adicionado, editado ou removido: recalcula as colunas de custo
+    apenas do produto afetado.
+    """
+    instance.produto.atualizar_custos()
+
+@receiver(post_save, sender=Material)
+def atualizar_custos_pelo_material(sender, instance, created, **kwargs):
+    """
+    Se o preço unitário mudou na edição do material (formulário ou admin),
+    atualiza o custo dos produtos que usam esse material. As entradas de
+    estoque reprecificam por conta própria em movimentar_estoque.
+    """
+    from atelier.trabalhos import reprecificar_em_segundo_plano
+
+    preco_original = getattr(instance, '_preco_unitario_original', None)
+    if not created and preco_original is not None and Decimal(str(preco_original)) != Decimal(str(instance.preco_unitario)):
+        # Todos os produtos do material em lotes, pela fila de trabalhos (depois do commit)
+        reprecificar_em_segundo_plano([instance.pk])
+    instance._preco_unitario_original = instance.preco_unitario
@@ -0,0 +1,116 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+# Quantidade de linhas por página nas listagens
+TAMANHO_PAGINA = 50
+
+
+class PaginaKeyset:
+    """Uma página da listagem e o cursor para buscar a próxima"""
+
+    def __init__(self, itens, proximo_cursor, cursor_atual=None):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.cursor_atual = cursor_atual
+
+    @property
+    def tem_proxima(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def e_primeira(self):
+        return not self.cursor_atual
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def _codificar_cursor(valores):
+    texto = json.dumps(valores, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def _decodificar_cursor(cursor):
+    """Cursor inválido ou adulterado volta para a primeira página"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+def _converter_valores(modelo, ordenacao, valores):
+    """
+    Valores do cursor no tipo de cada campo da ordenação (to_python do campo).
+    Cursor adulterado (tipo errado, nulo, lista, objeto...) devolve None.
+    """
+    if len(valores) != len(ordenacao):
+        return None
+    convertidos = []
+    for campo, valor in zip(ordenacao, valores):
+        if valor is None or isinstance(valor, (dict, list)):
+            return None
+        try:
+            convertido = modelo._meta.get_field(campo.lstrip('-')).to_python(valor)
+        except (ValueError, TypeError, ValidationError):
+            return None
+        if convertido is None or (isinstance(convertido, Decimal) and not convertido.is_finite()):
+            return None
+        convertidos.append(convertido)
+    return convertidos
+
+
+def _filtro_apos(ordenacao, valores):
+    """
+    Monta "linhas depois do cursor" para a ordenação dada, ex: para
+    ('nome', 'id'): nome > X OU (nome = X E id > Y).
+    O primeiro campo também entra como faixa (nome >= X) para o banco
+    conseguir começar a leitura direto no índice.
+    """
+    primeiro = ordenacao[0]
+    faixa = 'lte' if primeiro.startswith('-') else 'gte'
+    filtro = Q()
+
+    for posicao, campo in enumerate(ordenacao):
+        lookup = 'lt' if campo.startswith('-') else 'gt'
+        condicao = Q(**{f'{campo.lstrip("-")}__{lookup}': valores[posicao]})
+        for anterior, valor in zip(ordenacao[:posicao], valores[:posicao]):
+            condicao &= Q(**{anterior.lstrip('-'): valor})
+        filtro |= condicao
+
+    return Q(**{f'{primeiro.lstrip("-")}__{faixa}': valores[0]}) & filtro
+
+
+def paginar_por_chave(queryset, ordenacao, cursor=None, tamanho=TAMANHO_PAGINA):
+    """
+    Paginação por cursor (keyset): em vez de OFFSET, filtra as linhas depois
+    da última linha vista, então o custo de qualquer página é o mesmo.
+    A ordenação precisa terminar em um campo único (ex: 'id') e não pode ter nulos.
+    """
+    queryset = queryset.order_by(*ordenacao)
+
+    valores = _decodificar_cursor(cursor) if cursor else None
+    if valores:
+        valores = _converter_valores(queryset.model, ordenacao, valores)
+    if valores:
+        queryset = queryset.filter(_filtro_apos(ordenacao, valores))
+    else:
+        cursor = None
+
+    # Busca uma linha a mais só para saber se existe próxima página
+    itens = list(queryset[:tamanho + 1])
+    proximo_cursor = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        ultimo = itens[-1]
+        proximo_cursor = _codificar_cursor([getattr(ultimo, campo.lstrip('-')) for campo in ordenacao])
+
+    return PaginaKeyset(itens, proximo_cursor, cursor)
@@ -0,0 +1,150 @@
+"""
+Gerador de PDF mínimo (só texto e linhas, fontes Helvetica padrão do PDF),
+sem dependências. Cada página é montada uma vez e guardada comprimida; um
+documento é só o "envelope" em volta das páginas já prontas, gerado em
+pedaços para o streaming.
+"""
+import unicodedata
+import zlib
+
+# A5 em pontos (1/72 polegada): um recibo por folha
+LARGURA_PAGINA = 420
+ALTURA_PAGINA = 595
+
+# Larguras (em milésimos do tamanho da fonte) dos caracteres ASCII 32-126, das
+# métricas padrão (AFM) da Helvetica e da Helvetica-Bold. Letras acentuadas
+# têm a largura da letra sem acento.
+_LARGURAS = {
+    False: [
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ],
+    True: [
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ],
+}
+_LARGURA_PADRAO = 556
+
+# Fontes usadas nas páginas: /F1 normal e /F2 negrito (objetos 3 e 4 do documento)
+_FONTES = {False: b'F1', True: b'F2'}
+
+
+def largura_texto(texto, tamanho, negrito=False):
+    larguras = _LARGURAS[negrito]
+    total = 0
+    for caractere in texto:
+        base = unicodedata.normalize('NFD', caractere)[0]
+        codigo = ord(base)
+        total += larguras[codigo - 32] if 32 <= codigo <= 126 else _LARGURA_PADRAO
+    return total * tamanho / 1000
+
+
+def _literal(texto):
+    """Texto como string do PDF (WinAnsi, a codificação das fontes padrão), com ( ) e \\ escapados"""
+    dados = str(texto).encode('cp1252', errors='replace')
+    return b'(' + dados.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _numero(valor):
+    return f'{valor:.2f}'.rstrip('0').rstrip('.').encode()
+
+
+class Pagina:
+    """Comandos de desenho de uma página; y conta de cima para baixo, como na tela"""
+
+    def __init__(self, largura=LARGURA_PAGINA, altura=ALTURA_PAGINA):
+        self.largura = largura
+        self.altura = altura
+        self.comandos = []
+
+    def texto(self, x, y, texto, tamanho=10, negrito=False, alinhamento='esquerda', cinza=0):
+        if alinhamento != 'esquerda':
+            largura = largura_texto(texto, tamanho, negrito)
+            x -= largura if alinhamento == 'direita' else largura / 2
+        self.comandos.append(
+            b'BT %s g /%s %s Tf %s %s Td %s Tj ET' % (
+                _numero(cinza), _FONTES[negrito], _numero(tamanho),
+                _numero(x), _numero(self.altura - y), _literal(texto),
+            )
+        )
+
+    def linha(self, x1, y, x2, espessura=0.5, cinza=0.8):
+        self.comandos.append(
+            b'%s G %s w %s %s m %s %s l S' % (
+                _numero(cinza), _numero(espessura),
+                _numero(x1), _numero(self.altura - y), _numero(x2), _numero(self.altura - y),
+            )
+        )
+
+    def comprimida(self):
+        """O conteúdo da página pronto para guardar (FlateDecode)"""
+        return zlib.compress(b'\n'.join(self.comandos), 6)
+
+
+def gerar_documento(paginas, largura=LARGURA_PAGINA, altura=ALTURA_PAGINA):
+    """
+    Gera o PDF em pedaços de bytes a partir de blocos de páginas já
+    comprimidas (cada bloco é uma lista). Páginas e conteúdos saem à medida
+    que chegam; o índice de páginas, as fontes e a tabela xref vão no fim.
+    """
+    # Objetos fixos: 1 catálogo, 2 árvore de páginas, 3 e 4 fontes; as páginas começam no 5
+    posicoes = {}
+    paginas_ids = []
+    proximo = 5
+    cabecalho = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    posicao = len(cabecalho)
+    yield cabecalho
+
+    def objeto(numero, corpo):
+        nonlocal posicao
+        posicoes[numero] = posicao
+        dados = b'%d 0 obj\n%s\nendobj\n' % (numero, corpo)
+        posicao += len(dados)
+        return dados
+
+    caixa = b'[0 0 %d %d]' % (largura, altura)
+    for bloco in paginas:
+        pedacos = []
+        for conteudo in bloco:
+            conteudo = bytes(conteudo)
+            pedacos.append(objeto(
+                proximo,
+                b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(conteudo), conteudo),
+            ))
+            pedacos.append(objeto(
+                proximo + 1,
+                b'<< /Type /Page /Parent 2 0 R /MediaBox %s /Contents %d 0 R '
+                b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>' % (caixa, proximo),
+            ))
+            paginas_ids.append(proximo + 1)
+            proximo += 2
+        if pedacos:
+            yield b''.join(pedacos)
+
+    filhos = b' '.join(b'%d 0 R' % numero for numero in paginas_ids)
+    final = [
+        objeto(1, b'<< /Type /Catalog /Pages 2 0 R >>'),
+        objeto(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (filhos, len(paginas_ids))),
+        objeto(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'),
+        objeto(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>'),
+    ]
+    inicio_xref = posicao
+    xref = [b'xref\n0 %d\n' % proximo, b'0000000000 65535 f \n']
+    xref.extend(b'%010d 00000 n \n' % posicoes[numero] for numero in range(1, proximo))
+    final.append(b''.join(xref))
+    final.append(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (proximo, inicio_xref))
+    yield b''.join(final)
+
+
+def documento_unico(conteudo):
+    """PDF de uma página só (o recibo individual)"""
+    return b''.join(gerar_documento([[conteudo]]))
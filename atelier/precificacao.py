@@ -0,0 +1,72 @@
+"""
+Preço dos produtos: o detalhamento inteiro (materiais, mão de obra, custo
+base, margem, desconto, preço sugerido e lucro) numa passada só, sem consultar
+o banco. É a única implementação do cálculo: as colunas guardadas no Produto,
+a página do produto e o admin saem daqui.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+ZERO = Decimal('0')
+CEM = Decimal('100')
+SESSENTA = Decimal('60')
+CENTAVOS = Decimal('0.01')
+
+
+@dataclass(frozen=True, slots=True)
+class Precificacao:
+    # Sem arredondar (quantidade com 3 casas x preço com 2), como a coluna do produto
+    custo_materiais: Decimal
+    horas: Decimal
+    # Os demais em centavos, arredondados só no fim (a conta usa os valores exatos)
+    custo_mao_de_obra: Decimal
+    custo_base: Decimal
+    margem: Decimal
+    valor_com_margem: Decimal
+    desconto: Decimal
+    preco_sugerido: Decimal
+    lucro_liquido: Decimal
+
+
+def _decimal(valor):
+    # Colunas lidas do banco já são Decimal; só valores de fora (defaults float, int) são convertidos
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def calcular(custo_materiais, tempo, valor_hora, margem_percentual, desconto):
+    """tempo: o TimeField do produto (HH:MM de trabalho)"""
+    custo_materiais = _decimal(custo_materiais)
+    horas = Decimal(tempo.hour) + Decimal(tempo.minute) / SESSENTA if tempo else ZERO
+    mao_de_obra = horas * _decimal(valor_hora)
+    base = custo_materiais + mao_de_obra
+    com_margem = base * (1 + _decimal(margem_percentual) / CEM)
+    desconto = _decimal(desconto)
+    sugerido = com_margem - desconto
+    return Precificacao(
+        custo_materiais=custo_materiais,
+        horas=horas,
+        custo_mao_de_obra=mao_de_obra.quantize(CENTAVOS),
+        custo_base=base.quantize(CENTAVOS),
+        margem=(com_margem - base).quantize(CENTAVOS),
+        valor_com_margem=com_margem.quantize(CENTAVOS),
+        desconto=desconto.quantize(CENTAVOS),
+        preco_sugerido=sugerido.quantize(CENTAVOS),
+        lucro_liquido=(sugerido - base).quantize(CENTAVOS),
+    )
+
+
+def custo_dos_itens(itens):
+    """Soma (quantidade x preço unitário) dos itens da composição, com os materiais já carregados"""
+    return sum((item.quantidade_utilizada * item.material.preco_unitario for item in itens), ZERO)
+
+
+def precificar(produto, itens=None):
+    """
+    Detalhamento do preço do produto. Com itens (a composição já carregada),
+    o custo de materiais é somado deles; sem, vem da coluna guardada.
+    """
+    custo = produto.custo_materiais if itens is None else custo_dos_itens(itens)
+    return calcular(
+        custo, produto.tempo_trabalho_horas, produto.valor_hora_trabalho,
+        produto.margem_lucro_percentual, produto.desconto_valor,
+    )
@@ -0,0 +1,152 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from atelier import pdf
+from atelier.exportacao import filtrar_periodo, filtrar_vendas
+from atelier.metricas import incrementar
+from atelier.models import Venda, Recibo
+
+# Contatos do ateliê impressos no rodapé do recibo (HTML e PDF)
+WHATSAPP = '(53) 99157-8434'
+INSTAGRAM = '@faby_panos_arte'
+
+# Recibos lidos (ou montados) por consulta na impressão em lote
+TAMANHO_BLOCO = 500
+
+MARGEM = 40
+
+
+# --- MONTAGEM ---
+def _html(venda):
+    return render_to_string('atelier/_recibo.html', {'venda': venda, 'whatsapp': WHATSAPP, 'instagram': INSTAGRAM})
+
+
+def _caber(texto, largura, tamanho, negrito=False):
+    """Corta o texto com reticências para caber na largura"""
+    if pdf.largura_texto(texto, tamanho, negrito) <= largura:
+        return texto
+    while texto and pdf.largura_texto(texto + '...', tamanho, negrito) > largura:
+        texto = texto[:-1]
+    return texto.rstrip() + '...'
+
+
+def _pagina_pdf(venda):
+    """Mesmo conteúdo do recibo em HTML, numa página A5"""
+    pagina = pdf.Pagina()
+    centro = pagina.largura / 2
+    direita = pagina.largura - MARGEM
+    valor = f"R$ {venda.valor_venda:.2f}"
+
+    pagina.texto(centro, 60, f"RECIBO nº {venda.pk}", 18, negrito=True, alinhamento='centro')
+    pagina.texto(centro, 80, timezone.localtime(venda.data_venda).strftime('%d/%m/%Y %H:%M'), 10, alinhamento='centro', cinza=0.45)
+    pagina.linha(MARGEM, 100, direita)
+
+    pagina.texto(MARGEM, 130, "NOME DO CLIENTE", 8, negrito=True, cinza=0.45)
+    nome_cliente = venda.cliente.nome if venda.cliente else "Consumidor Final"
+    pagina.texto(MARGEM, 150, _caber(nome_cliente, direita - MARGEM, 13), 13)
+
+    pagina.texto(MARGEM, 190, "Descrição do Produto", 10, negrito=True)
+    pagina.texto(direita, 190, "Total", 10, negrito=True, alinhamento='direita')
+    pagina.linha(MARGEM, 198, direita)
+    pagina.texto(MARGEM, 222, _caber(venda.produto.nome, direita - MARGEM - 110, 11), 11)
+    pagina.texto(direita, 222, valor, 11, alinhamento='direita')
+    pagina.linha(MARGEM, 240, direita)
+    pagina.texto(direita - 120, 266, "VALOR TOTAL:", 13, negrito=True, alinhamento='direita')
+    pagina.texto(direita, 266, valor, 13, negrito=True, alinhamento='direita', cinza=0.1)
+
+    pagina.linha(MARGEM, 320, direita)
+    pagina.texto(centro, 344, f"Pagamento: {venda.get_metodo_pagamento_display()}", 10, alinhamento='centro', cinza=0.45)
+    pagina.texto(centro, 362, f"WhatsApp {WHATSAPP}   ·   Instagram {INSTAGRAM}", 9, alinhamento='centro', cinza=0.45)
+    pagina.texto(centro, 382, "Obrigado pela preferência!", 9, alinhamento='centro', cinza=0.45)
+    return pagina.comprimida()
+
+
+def gerar_recibos(vendas):
+    """Monta e grava (cria ou substitui) os recibos dessas vendas, com cliente e produto já carregados"""
+    recibos = [
+        Recibo(venda=venda, data_venda=venda.data_venda, html=_html(venda), pagina_pdf=_pagina_pdf(venda))
+        for venda in vendas
+    ]
+    Recibo.objects.bulk_create(
+        recibos,
+        update_conflicts=True,
+        unique_fields=['venda'],
+        update_fields=['data_venda', 'html', 'pagina_pdf', 'gerado_em'],
+    )
+    incrementar('atelier_recibos_gerados_total', len(recibos))
+    return recibos
+
+
+def gerar_recibos_por_ids(ids):
+    """Recibos das vendas com esses ids, em blocos (carga inicial ou vendas importadas)"""
+    ids = list(ids)
+    total = 0
+    for inicio in range(0, len(ids), TAMANHO_BLOCO):
+        vendas = Venda.objects.filter(pk__in=ids[inicio:inicio + TAMANHO_BLOCO]).select_related('cliente', 'produto')
+        total += len(gerar_recibos(vendas))
+    return total
+
+
+def vendas_sem_recibo(vendas=None):
+    vendas = Venda.objects.all() if vendas is None else vendas
+    return vendas.filter(~Exists(Recibo.objects.filter(venda=OuterRef('pk'))))
+
+
+@receiver(post_save, sender=Venda)
+def gerar_ao_salvar(sender, instance, **kwargs):
+    # Depois do commit, com os dados finais; uma falha aqui não desfaz a venda
+    # (o recibo é montado na primeira vez que for aberto)
+    transaction.on_commit(lambda: gerar_recibos([instance]), robust=True)
+
+
+# --- LEITURA ---
+def obter_recibo(venda_id):
+    """O recibo guardado; vendas antigas (sem recibo ainda) têm o recibo montado agora"""
+    recibo = Recibo.objects.filter(pk=venda_id).first()
+    if recibo is None:
+        venda = get_object_or_404(Venda.objects.select_related('cliente', 'produto'), pk=venda_id)
+        recibo = gerar_recibos([venda])[0]
+    return recibo
+
+
+def _paginas_em_blocos(recibos):
+    """Páginas guardadas, em ordem de data, em blocos pelo keyset (data, venda)"""
+    ultimo = None
+    while True:
+        consulta = recibos
+        if ultimo:
+            data, venda_id = ultimo
+            consulta = consulta.filter(Q(data_venda__gt=data) | Q(data_venda=data, venda_id__gt=venda_id))
+        bloco = list(consulta.order_by('data_venda', 'venda_id').values_list('data_venda', 'venda_id', 'pagina_pdf')[:TAMANHO_BLOCO])
+        if not bloco:
+            return
+        yield [pagina for _data, _venda_id, pagina in bloco]
+        ultimo = bloco[-1][:2]
+
+
+def gerar_lote_pdf(inicio=None, fim=None):
+    """
+    Um PDF só com os recibos das vendas do período, uma página cada, gerado
+    em pedaços a partir das páginas já guardadas (nada é renderizado de
+    novo). O início do arquivo sai na hora; vendas do período ainda sem
+    recibo são montadas e guardadas antes das páginas.
+    """
+    def blocos():
+        gerar_recibos_por_ids(vendas_sem_recibo(filtrar_vendas(inicio, fim)).values_list('pk', flat=True))
+        yield from _paginas_em_blocos(filtrar_periodo(Recibo.objects.all(), 'data_venda', inicio, fim))
+
+    return pdf.gerar_documento(blocos())
+
+
+def nome_do_lote(inicio=None, fim=None):
+    partes = ['recibos']
+    if inicio:
+        partes.append(f'de-{inicio:%Y-%m-%d}')
+    if fim:
+        partes.append(f'ate-{fim:%Y-%m-%d}')
+    return '_'.join(partes) + '.pdf'
@@ -0,0 +1,69 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, F, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from atelier.banco import atualizar_em_massa
+from atelier.models import Produto, ItemComposicao
+
+# Quantos produtos são lidos e gravados por vez (limita memória e o tamanho do UPDATE)
+TAMANHO_LOTE = 500
+
+# Apenas os campos necessários para recalcular os valores do produto
+CAMPOS_PRECO = ['tempo_trabalho_horas', 'valor_hora_trabalho', 'margem_lucro_percentual', 'desconto_valor']
+
+
+def _anotar_custo_materiais(produtos):
+    """Soma (quantidade x preço unitário) de cada produto em uma subconsulta"""
+    dinheiro = DecimalField(max_digits=15, decimal_places=5)
+    custo_itens = (
+        ItemComposicao.objects.filter(produto=OuterRef('pk'))
+        .values('produto')
+        .annotate(total=Sum(F('quantidade_utilizada') * F('material__preco_unitario'), output_field=dinheiro))
+        .values('total')
+    )
+    return produtos.annotate(
+        custo_calculado=Coalesce(Subquery(custo_itens, output_field=dinheiro), Value(Decimal('0')), output_field=dinheiro)
+    )
+
+
+def reprecificar_produtos(produtos=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Recalcula custo, preço final, preço sugerido e lucro dos produtos em lotes:
+    uma consulta agregada por lote para ler os custos e uma atualização em
+    massa para gravar, tudo na mesma transação. Retorna quantos produtos foram atualizados.
+    """
+    if produtos is None:
+        produtos = Produto.objects.all()
+    produtos = _anotar_custo_materiais(produtos.only(*CAMPOS_PRECO)).order_by('pk')
+
+    total = 0
+    ultimo_id = 0
+    with transaction.atomic():
+        while True:
+            # Paginação pela chave primária: cada lote começa onde o anterior parou
+            lote = list(produtos.filter(pk__gt=ultimo_id)[:tamanho_lote])
+            if not lote:
+                break
+
+            for produto in lote:
+                produto.custo_materiais = produto.custo_calculado
+                produto.calcular_valores_derivados()
+
+            atualizar_em_massa(lote, Produto.CAMPOS_CALCULADOS)
+            total += len(lote)
+            ultimo_id = lote[-1].pk
+    return total
+
+
+def reprecificar_por_material(material_id, tamanho_lote=TAMANHO_LOTE):
+    """Reprecifica todos os produtos que usam o material na sua composição"""
+    return reprecificar_por_materiais([material_id], tamanho_lote)
+
+
+def reprecificar_por_materiais(material_ids, tamanho_lote=TAMANHO_LOTE):
+    """Reprecifica, numa só passada, os produtos que usam qualquer um dos materiais"""
+    produtos = Produto.objects.filter(
+        pk__in=ItemComposicao.objects.filter(material_id__in=material_ids).values('produto_id')
+    )
+    return reprecificar_produtos(produtos, tamanho_lote)
@@ -0,0 +1,181 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Count, Min, Max, F, Value, OuterRef, Subquery, DecimalField, DateTimeField
+from django.db.models.functions import Coalesce, Greatest, Least, Round, TruncDate
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from atelier.models import Venda, Cliente, ResumoVendasDia, ResumoVendasMes
+
+# Os dias e meses dos resumos são sempre os de São Paulo, mesmo que o
+# servidor (ou o TIME_ZONE do projeto) mude: uma venda às 23h de 31/01 é de janeiro
+FUSO_RESUMOS = ZoneInfo('America/Sao_Paulo')
+
+CAMPOS_TOTAIS = ('receita', 'quantidade', 'lucro')
+
+
+def dia_local(data_venda):
+    return timezone.localtime(data_venda, FUSO_RESUMOS).date()
+
+
+def _somar(modelo, chave, totais):
+    """
+    Soma os totais na linha do resumo direto no banco (receita = receita + X).
+    Se a linha ainda não existe é criada; se outra transação criou a mesma
+    linha ao mesmo tempo, a restrição única avisa e a soma é refeita.
+    """
+    incremento = {campo: F(campo) + valor for campo, valor in totais.items()}
+    if modelo.objects.filter(**chave).update(**incremento):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**chave, **totais)
+            return
+    except IntegrityError:
+        pass
+    modelo.objects.filter(**chave).update(**incremento)
+
+
+def _somar_no_cliente(cliente_id, data_venda, valor_venda, sinal):
+    """
+    Atualiza as estatísticas do cliente com um único UPDATE. O total é
+    arredondado no banco para ficar igual ao valor exibido (a paginação por
+    "melhores clientes" compara por igualdade). Numa compra nova a primeira e
+    a última compra só podem se mover até a data dela; ao desfazer, são
+    relidas das vendas restantes do cliente (índice cliente + data).
+    """
+    atualizacao = {
+        'total_gasto': Round(F('total_gasto') + sinal * valor_venda, 2),
+        'quantidade_compras': F('quantidade_compras') + sinal,
+    }
+    if sinal > 0:
+        data = Value(data_venda, output_field=DateTimeField())
+        atualizacao['primeira_compra'] = Coalesce(Least('primeira_compra', data), data)
+        atualizacao['ultima_compra'] = Coalesce(Greatest('ultima_compra', data), data)
+    else:
+        vendas = Venda.objects.filter(cliente=OuterRef('pk')).values('data_venda')
+        atualizacao['primeira_compra'] = Subquery(vendas.order_by('data_venda')[:1])
+        atualizacao['ultima_compra'] = Subquery(vendas.order_by('-data_venda')[:1])
+    Cliente.objects.filter(pk=cliente_id).update(**atualizacao)
+
+
+def aplicar_venda(valores, sinal):
+    """
+    Soma (sinal=1) ou desfaz (sinal=-1) a contribuição de uma venda nos
+    resumos do dia e do mês e nas estatísticas do cliente.
+    valores = Venda.valores_do_resumo().
+    """
+    data_venda, metodo_pagamento, valor_venda, custo_total, cliente_id = valores
+    valor_venda = Decimal(str(valor_venda))
+    custo_total = Decimal(str(custo_total or 0))
+    totais = {
+        'receita': sinal * valor_venda,
+        'quantidade': sinal,
+        'lucro': sinal * (valor_venda - custo_total),
+    }
+    dia = dia_local(data_venda)
+    _somar(ResumoVendasDia, {'dia': dia, 'metodo_pagamento': metodo_pagamento}, totais)
+    _somar(ResumoVendasMes, {'mes': dia.replace(day=1), 'metodo_pagamento': metodo_pagamento}, totais)
+    if cliente_id:
+        _somar_no_cliente(cliente_id, data_venda, valor_venda, sinal)
+
+
+@receiver(post_save, sender=Venda)
+def atualizar_resumos_no_salvamento(sender, instance, created, **kwargs):
+    """Nova venda soma nos resumos; na edição, troca a contribuição antiga pela nova"""
+    valores = instance.valores_do_resumo()
+    anteriores = None if created else getattr(instance, '_resumo_original', None)
+    if anteriores == valores:
+        return
+    if anteriores is not None:
+        aplicar_venda(anteriores, -1)
+    aplicar_venda(valores, 1)
+    instance._resumo_original = valores
+
+
+@receiver(post_delete, sender=Venda)
+def atualizar_resumos_na_delecao(sender, instance, **kwargs):
+    aplicar_venda(getattr(instance, '_resumo_original', None) or instance.valores_do_resumo(), -1)
+
+
+def recalcular_resumos():
+    """
+    Refaz os resumos do zero a partir das vendas (carga inicial ou correção
+    depois de importações que não passam pelo save()). Uma única agregação
+    agrupada por dia e método; os meses saem da soma dos dias.
+    """
+    dinheiro = DecimalField(max_digits=14, decimal_places=2)
+    por_dia = (
+        Venda.objects
+        .annotate(dia=TruncDate('data_venda', tzinfo=FUSO_RESUMOS))
+        .values('dia', 'metodo_pagamento')
+        .annotate(
+            receita=Sum('valor_venda'),
+            quantidade=Count('id'),
+            lucro=Sum(F('valor_venda') - Coalesce('custo_total', Value(0), output_field=dinheiro), output_field=dinheiro),
+        )
+        .order_by()
+    )
+
+    dias = []
+    meses = defaultdict(lambda: dict.fromkeys(CAMPOS_TOTAIS, 0))
+    for linha in por_dia:
+        dias.append(ResumoVendasDia(**linha))
+        mes = meses[(linha['dia'].replace(day=1), linha['metodo_pagamento'])]
+        for campo in CAMPOS_TOTAIS:
+            mes[campo] += linha[campo]
+
+    with transaction.atomic():
+        ResumoVendasDia.objects.all().delete()
+        ResumoVendasMes.objects.all().delete()
+        ResumoVendasDia.objects.bulk_create(dias, batch_size=1000)
+        ResumoVendasMes.objects.bulk_create(
+            [ResumoVendasMes(mes=mes, metodo_pagamento=metodo, **totais) for (mes, metodo), totais in meses.items()],
+            batch_size=1000,
+        )
+    return len(dias), len(meses)
+
+
+def recalcular_estatisticas_clientes():
+    """Refaz as estatísticas de compras de todos os clientes a partir das vendas (um UPDATE)"""
+    vendas = Venda.objects.filter(cliente=OuterRef('pk')).order_by().values('cliente')
+    dinheiro = DecimalField(max_digits=12, decimal_places=2)
+    return Cliente.objects.update(
+        total_gasto=Coalesce(Round(Subquery(vendas.annotate(total=Sum('valor_venda')).values('total')), 2), Value(0), output_field=dinheiro),
+        quantidade_compras=Coalesce(Subquery(vendas.annotate(quantidade=Count('id')).values('quantidade')), Value(0)),
+        primeira_compra=Subquery(vendas.annotate(primeira=Min('data_venda')).values('primeira')),
+        ultima_compra=Subquery(vendas.annotate(ultima=Max('data_venda')).values('ultima')),
+    )
+
+
+def totais_por_mes(ano):
+    """
+    {mês (1-12): {'receita', 'quantidade', 'lucro', 'metodos': {método: receita}}}
+    do ano, lidos só da tabela de resumos mensais.
+    """
+    meses = {numero: {**dict.fromkeys(CAMPOS_TOTAIS, 0), 'metodos': {}} for numero in range(1, 13)}
+    linhas = ResumoVendasMes.objects.filter(mes__year=ano).values_list('mes', 'metodo_pagamento', *CAMPOS_TOTAIS)
+    for mes, metodo, receita, quantidade, lucro in linhas:
+        total = meses[mes.month]
+        total['receita'] += receita
+        total['quantidade'] += quantidade
+        total['lucro'] += lucro
+        total['metodos'][metodo] = total['metodos'].get(metodo, 0) + receita
+    return meses
+
+
+def totais_por_dia(ano, mes):
+    """Linhas diárias do mês (somando os métodos de pagamento), lidas da tabela de resumos diários"""
+    primeiro_dia = datetime.date(ano, mes, 1)
+    proximo_mes = (primeiro_dia + datetime.timedelta(days=32)).replace(day=1)
+    return (
+        ResumoVendasDia.objects
+        .filter(dia__gte=primeiro_dia, dia__lt=proximo_mes)
+        .values('dia')
+        .annotate(receita=Sum('receita'), quantidade=Sum('quantidade'), lucro=Sum('lucro'))
+        .order_by('dia')
+    )
@@ -0,0 +1,68 @@
+import re
+
+# Telefones brasileiros: DDD (2 dígitos) + número (8 no fixo, 9 no celular)
+TAMANHOS_COM_DDD = (10, 11)
+
+# DDDs em uso no Brasil (55 também é um deles: Santa Maria/RS)
+DDDS = frozenset((
+    *range(11, 20), 21, 22, 24, 27, 28, 31, 32, 33, 34, 35, 37, 38, *range(41, 50), 51, 53, 54, 55,
+    *range(61, 70), 71, 73, 74, 75, 77, 79, *range(81, 90), *range(91, 100),
+))
+
+
+def normalizar_telefone(valor):
+    """
+    Só os dígitos do telefone, com DDD e sem prefixos de discagem:
+    '+55 (11) 98765-4321' -> '11987654321', '0 15 11 3333-4444' -> '1133334444'.
+    Números sem DDD ficam como vieram ('98765-4321' -> '987654321').
+    """
+    digitos = re.sub(r'\D', '', valor or '')
+    if len(digitos) in (12, 13) and digitos.startswith('55'):
+        # Código do país
+        digitos = digitos[2:]
+    elif digitos.startswith('0'):
+        # Zero de longa distância, com ou sem o código da operadora (0 + XX)
+        sem_zero = digitos[1:]
+        if len(sem_zero) - 2 in TAMANHOS_COM_DDD:
+            sem_zero = sem_zero[2:]
+        digitos = sem_zero
+    return digitos
+
+
+def prefixos_da_consulta(valor):
+    """
+    Telefone digitado em parte (autocompletar), normalizado. Um 55 na frente
+    seguido de um DDD ('+55 11 9') é o código do país: com o '+', sai da
+    consulta; sem ele, pode ser o DDD 55 e a consulta vale das duas formas.
+    """
+    digitos = normalizar_telefone(valor)
+    if len(digitos) >= 4 and digitos.startswith('55') and int(digitos[2:4]) in DDDS:
+        if valor.lstrip().startswith('+'):
+            return [digitos[2:]]
+        return [digitos, digitos[2:]]
+    return [digitos]
+
+
+def numero_local(normalizado):
+    """O número sem o DDD (para achar o cliente quando se digita só o número)"""
+    if len(normalizado) in TAMANHOS_COM_DDD:
+        return normalizado[2:]
+    return normalizado
+
+
+def numero_whatsapp(valor):
+    """Número no formato do WhatsApp (55 + DDD + número) ou '' se não tem DDD"""
+    telefone = normalizar_telefone(str(valor or ''))
+    if len(telefone) in TAMANHOS_COM_DDD:
+        return f'55{telefone}'
+    return ''
+
+
+def formatar_telefone(valor):
+    """(XX) XXXXX-XXXX ou (XX) XXXX-XXXX; fora desses tamanhos devolve o valor original"""
+    telefone = normalizar_telefone(str(valor or ''))
+    if len(telefone) == 11:
+        return f"({telefone[:2]}) {telefone[2:7]}-{telefone[7:]}"
+    if len(telefone) == 10:
+        return f"({telefone[:2]}) {telefone[2:6]}-{telefone[6:]}"
+    return valor
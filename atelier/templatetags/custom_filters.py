@@ -1,5 +1,9 @@
 # atelier/templatetags/custom_filters.py
+from decimal import Decimal, InvalidOperation
 from django import template
+from django.utils.html import format_html
+
+from atelier import imagens, telefones
 
 register = template.Library()
 
@@ -8,15 +12,8 @@ def formatar_telefone(value):
     """
     Formata um número de telefone para o formato (XX) XXXXX-XXXX
     """
-    # Remove qualquer caractere que não seja número
-    telefone = ''.join(filter(str.isdigit, str(value)))
-    
-    if len(telefone) == 11:
-        return f"({telefone[:2]}) {telefone[2:7]}-{telefone[7:]}"
-    elif len(telefone) == 10:
-        return f"({telefone[:2]}) {telefone[2:6]}-{telefone[6:]}"
-    
-    return value # Retorna o valor original se não tiver 10 ou 11 dígitos
+    # Mesma normalização usada na busca de clientes por telefone (atelier/telefones.py)
+    return telefones.formatar_telefone(value)
 
 @register.filter(name='formatar_moeda')
 def formatar_moeda(value):
@@ -28,4 +25,33 @@ def formatar_moeda(value):
         valor = Decimal(str(value))
         return f"R$ {valor:,.2f}".replace(",", "v").replace(".", ",").replace("v", ".")
     except (ValueError, TypeError, InvalidOperation):
-        return value # Retorna o valor original se não conseguir formatar
\ No newline at end of file
+        return value # Retorna o valor original se não conseguir formatar
+
+@register.simple_tag
+def imagem_responsiva(produto, campo, tamanhos, classe='', alt='', carregamento='lazy', estilo=''):
+    """
+    <picture> com as versões WebP e JPEG da foto (srcset por largura), para o
+    navegador baixar só o tamanho que vai exibir. Sem versões geradas ainda,
+    usa a foto original.
+    """
+    arquivo = getattr(produto, campo)
+    if not arquivo:
+        return ''
+    atributos = format_html(
+        'class="{}" alt="{}" style="{}" loading="{}" decoding="async"', classe, alt, estilo, carregamento
+    )
+    versoes = imagens.versoes(produto, campo)
+    if versoes is None:
+        return format_html('<img src="{}" {}>', arquivo.url, atributos)
+
+    def srcset(lista):
+        return ', '.join(f'{url} {largura}w' for url, largura in lista)
+
+    return format_html(
+        '<picture style="display: contents;">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}>'
+        '</picture>',
+        srcset(versoes['webp']), tamanhos,
+        versoes['jpg'][-1][0], srcset(versoes['jpg']), tamanhos, atributos,
+    )
@@ -0,0 +1,35 @@
+"""Registros mínimos para os testes (só os campos obrigatórios têm valor fixo)"""
+import datetime
+from decimal import Decimal
+
+from atelier.models import Cliente, ItemComposicao, Material, Produto, Venda
+
+
+def material(**campos):
+    valores = {
+        'nome': 'Linho cru', 'unidade_medida': 'metro', 'preco_unitario': Decimal('10.00'),
+        'quantidade_estoque': Decimal('10.00'), 'estoque_minimo': Decimal('1.00'),
+    }
+    return Material.objects.create(**{**valores, **campos})
+
+
+def produto(itens=(), **campos):
+    """itens: [(material, quantidade utilizada)]"""
+    valores = {
+        'nome': 'Bolsa de linho', 'tempo_trabalho_horas': datetime.time(2, 30),
+        'valor_hora_trabalho': Decimal('20.00'), 'margem_lucro_percentual': Decimal('50.00'),
+        'desconto_valor': Decimal('0'),
+    }
+    novo = Produto.objects.create(**{**valores, **campos})
+    for usado, quantidade in itens:
+        ItemComposicao.objects.create(produto=novo, material=usado, quantidade_utilizada=Decimal(quantidade))
+    return novo
+
+
+def cliente(**campos):
+    return Cliente.objects.create(**{'nome': 'Maria Souza', 'telefone': '(11) 98765-4321', **campos})
+
+
+def venda(produto_vendido=None, **campos):
+    valores = {'valor_venda': Decimal('100.00'), 'metodo_pagamento': 'PIX'}
+    return Venda.objects.create(produto=produto_vendido or produto(), **{**valores, **campos})
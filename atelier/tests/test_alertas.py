@@ -0,0 +1,31 @@
+from decimal import Decimal
+from django.test import TestCase
+
+from atelier.models import AlertaEstoque, EntradaMaterial, Material
+from atelier.tests import fabrica
+
+
+class AlertaEstoqueTest(TestCase):
+    def passagens(self, material):
+        return list(AlertaEstoque.objects.filter(material=material).order_by('pk').values_list('tipo', flat=True))
+
+    def test_passagens_pelo_estoque_minimo(self):
+        linho = fabrica.material(quantidade_estoque=Decimal('5'), estoque_minimo=Decimal('1'))
+        self.assertEqual(self.passagens(linho), [])
+
+        fabrica.produto(itens=[(linho, '4.5')])
+        EntradaMaterial.objects.create(material=linho, quantidade_adicionada=Decimal('3'), preco_unitario_na_compra=Decimal('10'))
+        self.assertEqual(self.passagens(linho), [AlertaEstoque.ENTROU, AlertaEstoque.SAIU])
+
+        linho = Material.objects.get(pk=linho.pk)
+        linho.estoque_minimo = Decimal('10')
+        linho.save()
+        # Gravar de novo sem mudar nada não repete a passagem
+        linho.save()
+        self.assertEqual(self.passagens(linho), [AlertaEstoque.ENTROU, AlertaEstoque.SAIU, AlertaEstoque.ENTROU])
+        self.assertTrue(Material.objects.get(pk=linho.pk).estoque_baixo)
+
+    def test_material_novo_sem_saldo_entra_no_alerta(self):
+        botao = fabrica.material(nome='Botão', quantidade_estoque=Decimal('0'))
+        self.assertEqual(self.passagens(botao), [AlertaEstoque.ENTROU])
+        self.assertTrue(Material.objects.filter(pk=botao.pk, estoque_baixo=True).exists())
@@ -0,0 +1,155 @@
+import hashlib
+import io
+import os
+import tempfile
+import time
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+
+from atelier.views import servir_midia
+from atelier.tests import fabrica
+
+FOTO = b'\xff\xd8\xff\xe0 foto de teste'
+HASH_FOTO = hashlib.sha256(FOTO).hexdigest()
+NOME_FOTO = f'produtos/{HASH_FOTO[:2]}/{HASH_FOTO}.jpg'
+
+
+class MediaTemporariaTest(TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.media = pasta.name
+        media = override_settings(MEDIA_ROOT=self.media)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def gravar(self, nome, conteudo=b'x', idade=0):
+        """Arquivo na media, com a data de modificação `idade` segundos atrás"""
+        caminho = os.path.join(self.media, nome)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        if idade:
+            antes = time.time() - idade
+            os.utime(caminho, (antes, antes))
+        return caminho
+
+    def existentes(self):
+        return sorted(
+            os.path.relpath(os.path.join(diretorio, arquivo), self.media)
+            for diretorio, _subpastas, arquivos in os.walk(self.media) for arquivo in arquivos
+        )
+
+
+class ArmazenamentoPorConteudoTest(MediaTemporariaTest):
+    def test_mesmo_conteudo_ocupa_um_arquivo_so(self):
+        frente = default_storage.save('produtos/frente.JPG', ContentFile(FOTO))
+        verso = default_storage.save('produtos/verso.jpg', ContentFile(FOTO))
+
+        self.assertEqual((frente, verso), (NOME_FOTO, NOME_FOTO))
+        self.assertEqual(self.existentes(), [NOME_FOTO])
+
+    def test_upload_grande_em_arquivo_temporario_e_movido(self):
+        upload = TemporaryUploadedFile('grande.jpg', 'image/jpeg', len(FOTO), None)
+        # Como no fim de um upload: o arquivo já foi movido e o close() não reclama
+        self.addCleanup(upload.close)
+        upload.write(FOTO)
+        upload.flush()
+
+        self.assertEqual(default_storage.save('produtos/grande.jpg', upload), NOME_FOTO)
+        self.assertEqual(self.existentes(), [NOME_FOTO])
+        with default_storage.open(NOME_FOTO) as arquivo:
+            self.assertEqual(arquivo.read(), FOTO)
+
+
+class ServirMidiaTest(MediaTemporariaTest):
+    def test_nome_por_conteudo_tem_cache_imutavel(self):
+        self.gravar(NOME_FOTO, FOTO)
+        resposta = self.client.get(f'/media/{NOME_FOTO}')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(b''.join(resposta.streaming_content), FOTO)
+        self.assertEqual(resposta['ETag'], f'"{HASH_FOTO}"')
+        self.assertEqual(resposta['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_if_none_match_devolve_304_sem_corpo(self):
+        self.gravar(NOME_FOTO, FOTO)
+        for enviado in (f'"{HASH_FOTO}"', f'W/"{HASH_FOTO}"', f'"outro", "{HASH_FOTO}"'):
+            with self.subTest(enviado=enviado):
+                resposta = self.client.get(f'/media/{NOME_FOTO}', headers={'If-None-Match': enviado})
+                self.assertEqual(resposta.status_code, 304)
+                self.assertEqual(resposta.content, b'')
+                self.assertEqual(resposta['ETag'], f'"{HASH_FOTO}"')
+
+    def test_nome_antigo_e_revalidado(self):
+        self.gravar('produtos/bolsa.jpg', FOTO)
+        resposta = self.client.get('/media/produtos/bolsa.jpg')
+        resposta.close()
+
+        self.assertEqual(resposta['Cache-Control'], 'no-cache')
+        revalidada = self.client.get('/media/produtos/bolsa.jpg', headers={'If-None-Match': resposta['ETag']})
+        self.assertEqual(revalidada.status_code, 304)
+
+    def test_caminho_fora_da_media_e_recusado(self):
+        self.gravar('produtos/bolsa.jpg')
+        requisicao = RequestFactory().get('/')
+        for caminho in ('../manage.py', 'produtos/../../manage.py', '/etc/passwd', 'produtos'):
+            with self.subTest(caminho=caminho), self.assertRaises(Http404):
+                servir_midia(requisicao, caminho)
+
+
+class ColetaMidiaOrfaTest(MediaTemporariaTest):
+    HORA = 60 * 60 * 2
+
+    def setUp(self):
+        super().setUp()
+        trocada = 'produtos/ab/' + 'ab' * 32 + '.jpg'
+        self.usados = [
+            self.gravar(NOME_FOTO, FOTO, self.HORA),
+            self.gravar(f'derivados/produtos/{HASH_FOTO[:2]}/{HASH_FOTO}-100.webp', idade=self.HORA),
+            self.gravar(f'derivados/produtos/{HASH_FOTO[:2]}/{HASH_FOTO}-100.jpg', idade=self.HORA),
+            self.gravar('produtos/antiga.png', idade=self.HORA),
+            # Recém-enviada, o produto ainda não foi salvo: fica pela carência
+            self.gravar('produtos/cd/' + 'cd' * 32 + '.jpg'),
+        ]
+        self.orfaos = [
+            self.gravar(trocada, idade=self.HORA),
+            self.gravar('derivados/produtos/ab/' + 'ab' * 32 + '-100.webp', idade=self.HORA),
+            self.gravar('produtos/excluida.jpg', idade=self.HORA),
+            self.gravar('produtos/tmpab12.tmp', idade=self.HORA),
+        ]
+        fabrica.produto(
+            imagem_frente=NOME_FOTO, imagem_tras='produtos/antiga.png',
+            # A foto anterior ainda aparece nas versões registradas, mas saiu do produto
+            derivados_imagens={
+                'imagem_frente': {'origem': NOME_FOTO, 'larguras': [100]},
+                'imagem_lado': {'origem': trocada, 'larguras': [100]},
+            },
+        )
+
+    def coletar(self, *argumentos):
+        saida = io.StringIO()
+        call_command('coletar_midia_orfa', *argumentos, verbosity=2, stdout=saida)
+        return saida.getvalue()
+
+    def test_sem_apagar_so_lista(self):
+        antes = self.existentes()
+        saida = self.coletar()
+
+        self.assertEqual(self.existentes(), antes)
+        self.assertEqual(sorted(saida.splitlines()[:-1]), sorted(self.orfaos))
+        self.assertIn("4 arquivo(s) órfão(s) encontrado(s)", saida)
+
+    def test_apaga_so_o_que_nenhum_produto_usa(self):
+        saida = self.coletar('--apagar')
+
+        self.assertIn("4 arquivo(s) apagado(s)", saida)
+        self.assertEqual([os.path.exists(caminho) for caminho in self.usados], [True] * len(self.usados))
+        self.assertEqual([os.path.exists(caminho) for caminho in self.orfaos], [False] * len(self.orfaos))
+        # A pasta do hash que ficou vazia também sai
+        self.assertFalse(os.path.exists(os.path.join(self.media, 'produtos', 'ab')))
@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from atelier.busca import buscar, montar_consulta_fts, reconstruir_indice
+from atelier.models import CategoriaMaterial
+from atelier.tests import fabrica
+
+
+def encontrados(texto, tipo=None):
+    return [(resultado['tipo'], resultado['titulo']) for resultado in buscar(texto, tipo)]
+
+
+class BuscaTest(TestCase):
+    def test_consulta_fts_segura(self):
+        self.assertEqual(montar_consulta_fts('botao mad'), '"botao"* "mad"*')
+        self.assertEqual(montar_consulta_fts('"; DROP TABLE -- *'), '"DROP"* "TABLE"*')
+        self.assertEqual(buscar('*** ---'), [])
+
+    def test_sem_acentos_por_prefixo_e_titulo_primeiro(self):
+        fabrica.material(nome='Botão de madeira')
+        fabrica.produto(nome='Bolsa', descricao='Fecho com botão de madeira')
+
+        self.assertEqual(encontrados('botao mad'), [('material', 'Botão de madeira'), ('produto', 'Bolsa')])
+        self.assertEqual(encontrados('botao', 'produto'), [('produto', 'Bolsa')])
+
+    def test_indice_acompanha_alteracoes_e_exclusoes(self):
+        tecidos = CategoriaMaterial.objects.create(nome='Tecidos')
+        linho = fabrica.material(nome='Linho cru', categoria=tecidos)
+        self.assertEqual(encontrados('tecidos', 'material'), [('material', 'Linho cru')])
+
+        # O nome da categoria faz parte do conteúdo dos materiais dela
+        tecidos.nome = 'Panos'
+        tecidos.save()
+        self.assertEqual(encontrados('tecidos'), [])
+        self.assertEqual(encontrados('panos', 'material'), [('material', 'Linho cru')])
+
+        linho.delete()
+        self.assertEqual(encontrados('linho'), [])
+
+    def test_reconstruir_indice(self):
+        fabrica.material(nome='Linho cru')
+        fabrica.cliente(nome='Maria Souza')
+        self.assertEqual(reconstruir_indice(), 2)
+        self.assertEqual(encontrados('souza'), [('cliente', 'Maria Souza')])
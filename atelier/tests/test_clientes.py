@@ -0,0 +1,45 @@
+import datetime
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+
+from atelier.forms import ClienteForm
+from atelier.models import Cliente
+from atelier.resumos import recalcular_estatisticas_clientes
+from atelier.tests import fabrica
+
+
+class EstatisticasClienteTest(TestCase):
+    def test_estatisticas_acompanham_as_vendas(self):
+        maria = fabrica.cliente()
+        produto = fabrica.produto()
+        primeira = timezone.now() - datetime.timedelta(days=10)
+        fabrica.venda(produto, cliente=maria, data_venda=primeira)
+        ultima = fabrica.venda(produto, cliente=maria, valor_venda=Decimal('50.50'))
+
+        maria.refresh_from_db()
+        self.assertEqual((maria.quantidade_compras, maria.total_gasto), (2, Decimal('150.50')))
+        self.assertEqual((maria.primeira_compra, maria.ultima_compra), (primeira, ultima.data_venda))
+        self.assertEqual(maria.ticket_medio, Decimal('75.25'))
+
+        ultima.delete()
+        maria.refresh_from_db()
+        self.assertEqual((maria.quantidade_compras, maria.total_gasto), (1, Decimal('100.00')))
+        self.assertEqual(maria.ultima_compra, primeira)
+
+        Cliente.objects.update(total_gasto=0, quantidade_compras=0, primeira_compra=None, ultima_compra=None)
+        recalcular_estatisticas_clientes()
+        maria.refresh_from_db()
+        self.assertEqual((maria.quantidade_compras, maria.total_gasto, maria.ultima_compra), (1, Decimal('100.00'), primeira))
+
+    def test_instancia_antiga_nao_volta_as_estatisticas(self):
+        maria = fabrica.cliente()
+        # Formulário de edição aberto antes da venda e enviado depois dela
+        form = ClienteForm({'nome': 'Maria S. Souza', 'telefone': '(11) 98765-4321'}, instance=Cliente.objects.get(pk=maria.pk))
+        fabrica.venda(cliente=maria)
+        self.assertTrue(form.is_valid())
+        form.save()
+
+        maria.refresh_from_db()
+        self.assertEqual((maria.nome, maria.quantidade_compras, maria.total_gasto), ('Maria S. Souza', 1, Decimal('100.00')))
+        self.assertIsNotNone(maria.ultima_compra)
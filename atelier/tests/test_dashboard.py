@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+from atelier import dashboard
+from atelier.dashboard import obter_totais_dashboard
+from atelier.models import Material
+from atelier.tests import fabrica
+
+
+def em_outro_processo(codigo):
+    """Roda o código num processo novo com o mesmo cache (como um worker do gunicorn) e devolve a saída"""
+    return subprocess.run(
+        [sys.executable, '-c', f'import django; django.setup(); {codigo}'],
+        cwd=settings.BASE_DIR, check=True, capture_output=True, text=True,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'core.settings', 'CACHE_PASTA': settings.CACHES['default']['LOCATION']},
+    ).stdout.strip()
+
+
+class TotaisDashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(dashboard._destravar, 1)
+
+    def test_invalidacao_feita_por_outro_processo(self):
+        fabrica.material(quantidade_estoque=Decimal('2'), preco_unitario=Decimal('10.00'))
+        self.assertEqual(obter_totais_dashboard()['total_estoque_valor'], Decimal('20'))
+
+        # Mudança sem os signals: os totais continuam os do cache, sem consultar o banco
+        Material.objects.update(preco_unitario=Decimal('15.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(obter_totais_dashboard()['total_estoque_valor'], Decimal('20'))
+
+        # O worker de trabalhos (outro processo) invalida os totais
+        em_outro_processo('from atelier.dashboard import invalidar_totais_dashboard; invalidar_totais_dashboard()')
+        self.assertEqual(obter_totais_dashboard()['total_estoque_valor'], Decimal('30'))
+
+    def test_trava_do_recalculo_vale_entre_processos(self):
+        self.assertTrue(dashboard._travar(1))
+        self.assertFalse(dashboard._travar(1))
+        tentar = 'from atelier.dashboard import _travar; print(_travar(1))'
+        self.assertEqual(em_outro_processo(tentar), 'False')
+
+        dashboard._destravar(1)
+        self.assertEqual(em_outro_processo(tentar), 'True')
+        self.assertFalse(dashboard._travar(1))
+
+    def test_trava_vencida_e_assumida(self):
+        self.assertTrue(dashboard._travar(1))
+        # Quem travou caiu sem soltar
+        antes = time.time() - dashboard.TEMPO_TRAVA - 1
+        os.utime(dashboard._arquivo_trava(1), (antes, antes))
+        self.assertTrue(dashboard._travar(1))
+        self.assertFalse(dashboard._travar(1))
+
+    def test_espera_estourada_calcula_sem_a_trava(self):
+        fabrica.material(quantidade_estoque=Decimal('2'), preco_unitario=Decimal('10.00'))
+        self.assertTrue(dashboard._travar(dashboard._geracao_atual()))
+        with mock.patch.object(dashboard, 'ESPERA_MAXIMA', 0.1):
+            self.assertEqual(obter_totais_dashboard()['total_estoque_valor'], Decimal('20'))
+        # Sem a trava, o resultado não vai para o cache: quem travou é que grava
+        self.assertIsNone(cache.get(dashboard.CHAVE_TOTAIS.format(dashboard._geracao_atual())))
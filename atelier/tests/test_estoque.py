@@ -0,0 +1,100 @@
+from decimal import Decimal
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from atelier.estoque import consumo_por_mes, gerar_fotografias, movimentar_estoque, saldo_em
+from atelier.models import EntradaMaterial, ItemComposicao, Material, MovimentacaoEstoque, SaldoEstoque
+from atelier.tests import fabrica
+
+
+def soma_do_historico(material):
+    return MovimentacaoEstoque.objects.filter(material=material).aggregate(total=Sum('quantidade'))['total']
+
+
+class HistoricoEstoqueTest(TestCase):
+    def test_saldo_igual_a_soma_do_historico(self):
+        linho = fabrica.material(quantidade_estoque=Decimal('10'))
+        produto = fabrica.produto(itens=[(linho, '2.5')])
+        EntradaMaterial.objects.create(material=linho, quantidade_adicionada=Decimal('4'), preco_unitario_na_compra=Decimal('10'))
+        ItemComposicao.objects.get(produto=produto).delete()
+
+        linho.refresh_from_db()
+        self.assertEqual(linho.quantidade_estoque, Decimal('14'))
+        self.assertEqual(soma_do_historico(linho), linho.quantidade_estoque)
+        self.assertEqual(
+            list(MovimentacaoEstoque.objects.filter(material=linho).order_by('pk').values_list('tipo', 'quantidade')),
+            [
+                (MovimentacaoEstoque.AJUSTE, Decimal('10')),
+                (MovimentacaoEstoque.CONSUMO, Decimal('-2.5')),
+                (MovimentacaoEstoque.ENTRADA, Decimal('4')),
+                (MovimentacaoEstoque.ESTORNO, Decimal('2.5')),
+            ],
+        )
+
+    def test_edicao_do_saldo_no_cadastro_vira_ajuste(self):
+        linho = Material.objects.get(pk=fabrica.material(quantidade_estoque=Decimal('10')).pk)
+        linho.quantidade_estoque = Decimal('7.5')
+        linho.save()
+        self.assertEqual(
+            MovimentacaoEstoque.objects.filter(material=linho).latest('pk').quantidade, Decimal('-2.5'),
+        )
+        self.assertEqual(soma_do_historico(linho), Decimal('7.5'))
+
+    def test_movimentar_estoque_atualiza_o_objeto_em_memoria(self):
+        linho = fabrica.material(quantidade_estoque=Decimal('10'))
+        movimentar_estoque(linho, MovimentacaoEstoque.ENTRADA, Decimal('5'), preco_unitario=Decimal('12.00'))
+        self.assertEqual(linho.quantidade_estoque, Decimal('15'))
+        self.assertEqual(linho.preco_unitario, Decimal('12.00'))
+
+    def test_historico_somente_inclusao(self):
+        movimentacao = MovimentacaoEstoque.objects.filter(material=fabrica.material()).get()
+        with self.assertRaises(ValueError):
+            movimentacao.save()
+        with self.assertRaises(ValueError):
+            movimentacao.delete()
+
+
+class FotografiaEstoqueTest(TestCase):
+    def test_saldo_em_parte_da_fotografia(self):
+        linho = fabrica.material(quantidade_estoque=Decimal('10'))
+        momento = timezone.now()
+        self.assertEqual(gerar_fotografias(momento), 1)
+        # A mesma data não gera outra fotografia
+        self.assertEqual(gerar_fotografias(momento), 0)
+        movimentar_estoque(linho, MovimentacaoEstoque.CONSUMO, Decimal('-3'))
+
+        self.assertEqual(SaldoEstoque.objects.get(material=linho).quantidade, Decimal('10'))
+        self.assertEqual(saldo_em(linho, momento), Decimal('10'))
+        self.assertEqual(saldo_em(linho, timezone.now()), Decimal('7'))
+
+    def test_fotografias_de_todos_os_materiais_numa_consulta(self):
+        linho = fabrica.material(quantidade_estoque=Decimal('10'))
+        botao = fabrica.material(nome='Botão', quantidade_estoque=Decimal('0'))
+        primeira = timezone.now()
+        gerar_fotografias(primeira)
+
+        movimentar_estoque(linho, MovimentacaoEstoque.CONSUMO, Decimal('-2.5'))
+        movimentar_estoque(botao, MovimentacaoEstoque.ENTRADA, Decimal('40'))
+        fita = fabrica.material(nome='Fita', quantidade_estoque=Decimal('3.125'))
+        segunda = timezone.now()
+        # Movimentação depois da data da fotografia não entra nela
+        movimentar_estoque(linho, MovimentacaoEstoque.CONSUMO, Decimal('-1'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(gerar_fotografias(segunda), 3)
+        self.assertEqual(
+            dict(SaldoEstoque.objects.filter(data=segunda).values_list('material', 'quantidade')),
+            {linho.pk: Decimal('7.5'), botao.pk: Decimal('40'), fita.pk: Decimal('3.125')},
+        )
+        for material in (linho, botao, fita):
+            self.assertEqual(saldo_em(material, segunda), SaldoEstoque.objects.get(material=material, data=segunda).quantidade)
+
+    def test_consumo_por_mes_desconta_estornos(self):
+        linho = fabrica.material(quantidade_estoque=Decimal('10'))
+        fabrica.produto(itens=[(linho, '2')])
+        descartado = fabrica.produto(itens=[(linho, '1.5')])
+        descartado.delete()
+
+        mes = timezone.localdate().replace(day=1)
+        self.assertEqual(consumo_por_mes(linho), [{'material': linho.pk, 'mes': mes, 'consumo': Decimal('2')}])
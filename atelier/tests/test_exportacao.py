@@ -0,0 +1,36 @@
+import datetime
+import json
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+
+from atelier.exportacao import gerar_exportacao
+from atelier.tests import fabrica
+
+
+class ExportacaoTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.produto = fabrica.produto()
+        cls.ontem = timezone.localdate() - datetime.timedelta(days=1)
+        cls.antiga = fabrica.venda(cls.produto, data_venda=timezone.now() - datetime.timedelta(days=30))
+        cls.vendas = [fabrica.venda(cls.produto, valor_venda=Decimal(valor)) for valor in ('10.00', '20.00', '30.00')]
+
+    def test_csv_em_blocos_com_cabecalho_unico(self):
+        pedacos = list(gerar_exportacao('vendas', 'csv', inicio=self.ontem, tamanho_bloco=2))
+        # Cabeçalho e dois blocos (2 + 1 linhas)
+        self.assertEqual(len(pedacos), 3)
+        linhas = ''.join(pedacos).splitlines()
+        self.assertTrue(linhas[0].startswith('﻿id,data_venda,produto_id'))
+        self.assertEqual([linha.split(',')[0] for linha in linhas[1:]], [str(venda.pk) for venda in self.vendas])
+
+    def test_jsonl(self):
+        linhas = ''.join(gerar_exportacao('vendas', 'jsonl', fim=self.ontem)).splitlines()
+        self.assertEqual(len(linhas), 1)
+        venda = json.loads(linhas[0])
+        self.assertEqual((venda['id'], venda['produto'], venda['valor_venda']), (self.antiga.pk, self.produto.nome, '100.00'))
+
+    def test_produtos_filtrados_pelas_vendas(self):
+        fabrica.produto(nome='Nunca vendido')
+        linhas = ''.join(gerar_exportacao('produtos', 'jsonl', metodo='PIX')).splitlines()
+        self.assertEqual([json.loads(linha)['nome'] for linha in linhas], [self.produto.nome])
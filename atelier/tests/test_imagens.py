@@ -0,0 +1,123 @@
+import os
+import tempfile
+from unittest import mock
+from PIL import Image
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+
+from atelier import imagens
+from atelier.derivados import processar
+from atelier.imagens import registrar_derivados
+from atelier.models import Produto
+from atelier.tests import fabrica
+
+# Tag EXIF de orientação: 6 = a câmera estava deitada, girar 90° para exibir em pé
+ORIENTACAO = 0x0112
+
+
+class ProcessarTest(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+
+    def foto(self, nome, tamanho, orientacao=None):
+        caminho = os.path.join(self.pasta, nome)
+        exif = Image.Exif()
+        if orientacao:
+            exif[ORIENTACAO] = orientacao
+        Image.new('RGB', tamanho, (200, 30, 30)).save(caminho, 'JPEG', exif=exif)
+        return caminho
+
+    def test_versoes_em_pe_em_cada_largura_e_formato(self):
+        # 300x200 deitada: em pé fica 200x300, e 400 não amplia (sai 200)
+        origem = self.foto('deitada.jpg', (300, 200), orientacao=6)
+        base = os.path.join(self.pasta, 'derivados', 'deitada')
+
+        resultado = processar([('imagem_frente', 'produtos/deitada.jpg', origem, base)], (100, 400))
+
+        self.assertEqual(resultado, {'imagem_frente': ('produtos/deitada.jpg', [100, 200])})
+        for largura, altura in ((100, 150), (200, 300)):
+            for extensao, formato in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with Image.open(f'{base}-{largura}.{extensao}') as versao:
+                    self.assertEqual((versao.format, versao.size), (formato, (largura, altura)))
+                    # Metadados descartados: a versão já está em pé
+                    self.assertNotIn(ORIENTACAO, versao.getexif())
+        self.assertEqual(sorted(os.listdir(os.path.dirname(base))), [
+            'deitada-100.jpg', 'deitada-100.webp', 'deitada-200.jpg', 'deitada-200.webp',
+        ])
+
+    def test_foto_corrompida_fica_sem_versoes(self):
+        origem = os.path.join(self.pasta, 'quebrada.jpg')
+        with open(origem, 'wb') as arquivo:
+            arquivo.write(b'nao e uma imagem')
+        resultado = processar([('imagem_lado', 'produtos/quebrada.jpg', origem, origem)], (100,))
+        self.assertEqual(resultado['imagem_lado'][:2], ('produtos/quebrada.jpg', None))
+
+
+class RegistroDerivadosTest(TestCase):
+    def test_foto_trocada_no_meio_tempo_e_ignorada(self):
+        produto = fabrica.produto()
+        Produto.objects.filter(pk=produto.pk).update(imagem_frente='produtos/nova.jpg', imagem_lado='produtos/lado.jpg')
+
+        with self.assertLogs('atelier.imagens', 'WARNING'):
+            registrar_derivados(produto.pk, {
+                'imagem_frente': ('produtos/antiga.jpg', [100, 400]),
+                'imagem_lado': ('produtos/lado.jpg', [100, 400]),
+                'imagem_tras': ('', None, 'sem foto'),
+            })
+
+        self.assertEqual(Produto.objects.get(pk=produto.pk).derivados_imagens, {
+            'imagem_lado': {'origem': 'produtos/lado.jpg', 'larguras': [100, 400]},
+        })
+
+    def test_cada_foto_nova_e_agendada_uma_vez(self):
+        with mock.patch.object(imagens, 'agendar_derivados') as agendar:
+            with self.captureOnCommitCallbacks(execute=True):
+                # Como criar_produto: o formulário grava e depois o preço grava de novo
+                produto = fabrica.produto(imagem_frente='produtos/frente.jpg')
+                produto.calcular_e_salvar_preco()
+            self.assertEqual(agendar.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                # Lido do banco e gravado sem trocar a foto (as versões ainda não chegaram)
+                Produto.objects.get(pk=produto.pk).save()
+            self.assertEqual(agendar.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                editado = Produto.objects.get(pk=produto.pk)
+                editado.imagem_frente = 'produtos/outra.jpg'
+                editado.save()
+                editado.calcular_e_salvar_preco()
+            self.assertEqual(agendar.call_count, 2)
+
+
+class ImagemResponsivaTest(TestCase):
+    def renderizar(self, produto):
+        modelo = Template('{% load custom_filters %}{% imagem_responsiva produto "imagem_frente" "50px" alt="Bolsa" %}')
+        return modelo.render(Context({'produto': produto}))
+
+    def test_srcset_das_versoes_webp_e_jpeg(self):
+        produto = Produto(
+            imagem_frente='produtos/bolsa.jpg',
+            derivados_imagens={'imagem_frente': {'origem': 'produtos/bolsa.jpg', 'larguras': [100, 400]}},
+        )
+        self.assertHTMLEqual(self.renderizar(produto), """
+            <picture style="display: contents;">
+              <source type="image/webp" sizes="50px"
+                srcset="/media/derivados/produtos/bolsa-100.webp 100w, /media/derivados/produtos/bolsa-400.webp 400w">
+              <img src="/media/derivados/produtos/bolsa-400.jpg" sizes="50px"
+                srcset="/media/derivados/produtos/bolsa-100.jpg 100w, /media/derivados/produtos/bolsa-400.jpg 400w"
+                class="" alt="Bolsa" style="" loading="lazy" decoding="async">
+            </picture>
+        """)
+
+    def test_sem_versoes_da_foto_atual_usa_a_original(self):
+        produto = Produto(
+            imagem_frente='produtos/nova.jpg',
+            derivados_imagens={'imagem_frente': {'origem': 'produtos/antiga.jpg', 'larguras': [100]}},
+        )
+        self.assertHTMLEqual(
+            self.renderizar(produto),
+            '<img src="/media/produtos/nova.jpg" class="" alt="Bolsa" style="" loading="lazy" decoding="async">',
+        )
@@ -0,0 +1,78 @@
+import io
+from decimal import Decimal
+from django.test import TestCase
+
+from atelier.importacao import importar_estoque
+from atelier.models import AlertaEstoque, CategoriaMaterial, EntradaMaterial, Material, MovimentacaoEstoque
+from atelier.tests import fabrica
+from atelier.tests.test_estoque import soma_do_historico
+
+
+def csv(*linhas):
+    cabecalho = 'tipo;nome;categoria;unidade_medida;preco_unitario;quantidade_estoque;estoque_minimo;material;quantidade_adicionada;preco_unitario_na_compra'
+    return io.StringIO('\n'.join((cabecalho, *linhas)) + '\n')
+
+
+class ImportacaoEstoqueTest(TestCase):
+    def test_categorias_materiais_e_entradas(self):
+        resultado = importar_estoque(csv(
+            'categoria;Tecidos;;;;;;;;',
+            'material;Linho cru;Tecidos;metro;10.00;5;1;;;',
+            'entrada;;;;;;;Linho cru;3;12.50',
+        ), tamanho_lote=2)
+
+        self.assertEqual(
+            (resultado.categorias_criadas, resultado.materiais_criados, resultado.entradas_criadas, resultado.total_erros),
+            (1, 1, 1, 0),
+        )
+        linho = Material.objects.get()
+        self.assertEqual(linho.categoria, CategoriaMaterial.objects.get(nome='Tecidos'))
+        self.assertEqual((linho.quantidade_estoque, linho.preco_unitario), (Decimal('8'), Decimal('12.50')))
+        self.assertEqual(EntradaMaterial.objects.get().quantidade_adicionada, Decimal('3'))
+        self.assertEqual(soma_do_historico(linho), Decimal('8'))
+
+    def test_saldo_informado_vira_ajuste(self):
+        linho = fabrica.material(quantidade_estoque=Decimal('10'), estoque_minimo=Decimal('1'))
+        resultado = importar_estoque(csv('material;Linho cru;;metro;10.00;0.5;1;;;'))
+
+        self.assertEqual(resultado.materiais_atualizados, 1)
+        linho.refresh_from_db()
+        self.assertEqual(linho.quantidade_estoque, Decimal('0.5'))
+        self.assertEqual(MovimentacaoEstoque.objects.filter(material=linho).latest('pk').quantidade, Decimal('-9.5'))
+        self.assertEqual(list(AlertaEstoque.objects.filter(material=linho).values_list('tipo', flat=True)), [AlertaEstoque.ENTROU])
+
+    def test_saldo_informado_depois_de_entradas_em_outro_lote(self):
+        importar_estoque(csv(
+            'material;Linho cru;;metro;10.00;10;1;;;',
+            'entrada;;;;;;;Linho cru;5;10.00',
+            'material;Linho cru;;metro;10.00;20;1;;;',
+            'entrada;;;;;;;Linho cru;2;10.00',
+            'material;Linho cru;;metro;10.00;20;1;;;',
+        ), tamanho_lote=2)
+
+        linho = Material.objects.get()
+        self.assertEqual(linho.quantidade_estoque, Decimal('20'))
+        self.assertEqual(soma_do_historico(linho), Decimal('20'))
+        self.assertEqual(
+            list(MovimentacaoEstoque.objects.filter(material=linho).order_by('pk').values_list('tipo', 'quantidade')),
+            [
+                (MovimentacaoEstoque.AJUSTE, Decimal('10')),
+                (MovimentacaoEstoque.ENTRADA, Decimal('5')),
+                (MovimentacaoEstoque.AJUSTE, Decimal('5')),
+                (MovimentacaoEstoque.ENTRADA, Decimal('2')),
+                (MovimentacaoEstoque.AJUSTE, Decimal('-2')),
+            ],
+        )
+
+    def test_linhas_com_erro_nao_impedem_as_demais(self):
+        resultado = importar_estoque(io.StringIO(
+            '{"tipo": "material", "nome": "Botão", "unidade_medida": "unidade", "preco_unitario": "0.50", "quantidade_estoque": "100"}\n'
+            '{"tipo": "material", "nome": "Fita", "unidade_medida": "légua", "preco_unitario": "1", "quantidade_estoque": "1"}\n'
+            '{"tipo": "entrada", "material": "Inexistente", "quantidade_adicionada": "1", "preco_unitario_na_compra": "1"}\n'
+            '{"tipo": "outro"}\n'
+            'isto não é json\n'
+        ), formato='jsonl')
+
+        self.assertEqual((resultado.linhas, resultado.materiais_criados, resultado.total_erros), (5, 1, 4))
+        self.assertEqual([numero for numero, _mensagem in resultado.erros], [2, 4, 5, 3])
+        self.assertEqual(list(Material.objects.values_list('nome', flat=True)), ['Botão'])
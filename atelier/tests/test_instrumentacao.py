@@ -0,0 +1,99 @@
+import re
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from atelier import instrumentacao
+from atelier.instrumentacao import InstrumentacaoMiddleware
+from atelier.models import Cliente
+from atelier.tests import fabrica
+
+LIGADA = {**settings.INSTRUMENTACAO, 'ATIVA': True, 'ORCAMENTO_CONSULTAS': 20, 'ORCAMENTO_MS': 60000}
+
+
+def campos(linha):
+    return dict(re.findall(r'(\w+)=(\S+)', linha.splitlines()[0]))
+
+
+@override_settings(INSTRUMENTACAO=LIGADA)
+class InstrumentacaoMiddlewareTest(TestCase):
+    def setUp(self):
+        historico = mock.patch.dict(instrumentacao._historico, clear=True)
+        historico.start()
+        self.addCleanup(historico.stop)
+
+    def view_com_n_mais_1(self, request):
+        # A mesma consulta para cada cliente (valores diferentes) e uma outra
+        for cliente in Cliente.objects.order_by('pk'):
+            list(Cliente.objects.filter(pk=cliente.pk))
+        return HttpResponse(Template('{{ texto }}').render(Context({'texto': 'ok'})))
+
+    def requisitar(self, **configuracao):
+        with override_settings(INSTRUMENTACAO={**LIGADA, **configuracao}):
+            middleware = InstrumentacaoMiddleware(self.view_com_n_mais_1)
+        request = RequestFactory().get('/clientes/')
+        request.resolver_match = resolve('/clientes/')
+        return middleware(request)
+
+    def test_linha_de_log_com_consultas_repetidas_e_templates(self):
+        fabrica.cliente(nome='Maria')
+        fabrica.cliente(nome='João')
+        with self.assertLogs('atelier.instrumentacao', 'INFO') as logs:
+            self.requisitar()
+
+        [linha] = logs.records
+        self.assertEqual(linha.levelname, 'INFO')
+        registro = campos(linha.getMessage())
+        self.assertEqual((registro['view'], registro['status']), ('atelier:lista_clientes', '200'))
+        self.assertEqual((registro['sql'], registro['repetidas']), ('3', '2'))
+        self.assertGreater(float(registro['sql_ms']), 0)
+        self.assertIn('template_ms', registro)
+        self.assertNotIn('acima_do_orcamento', registro)
+
+    def test_orcamento_estourado_vira_aviso_com_as_repetidas(self):
+        fabrica.cliente(nome='Maria')
+        fabrica.cliente(nome='João')
+        with self.assertLogs('atelier.instrumentacao', 'INFO') as logs:
+            self.requisitar(ORCAMENTO_CONSULTAS=2)
+
+        [linha] = logs.records
+        self.assertEqual(linha.levelname, 'WARNING')
+        mensagem = linha.getMessage()
+        self.assertEqual(campos(mensagem)['acima_do_orcamento'], 'sql>2')
+        # A consulta repetida aparece uma vez, com a contagem e a assinatura
+        [detalhe] = mensagem.splitlines()[1:]
+        self.assertRegex(detalhe, r'^  2x \[[0-9a-f]{8}\] SELECT ')
+
+    def test_assinatura_ignora_valores_e_tamanho_do_in(self):
+        self.assertEqual(
+            instrumentacao.assinatura('SELECT * FROM t WHERE id IN (%s, %s)'),
+            instrumentacao.assinatura('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+        )
+
+    def test_desligada_sai_da_cadeia(self):
+        with override_settings(INSTRUMENTACAO={**LIGADA, 'ATIVA': False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                InstrumentacaoMiddleware(self.view_com_n_mais_1)
+
+    def test_estatisticas_so_para_a_equipe(self):
+        url = reverse('atelier:instrumentacao')
+        with self.assertLogs('atelier.instrumentacao', 'INFO'):
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+            self.client.force_login(User.objects.create_user('ana', is_staff=True))
+            self.client.get(reverse('atelier:lista_clientes'))
+            self.client.get(reverse('atelier:lista_clientes'))
+            dados = self.client.get(url).json()
+
+        self.assertEqual(dados['intervalos_ms'], list(instrumentacao.INTERVALOS_MS))
+        lista = dados['views']['atelier:lista_clientes']
+        self.assertEqual(lista['requisicoes'], 2)
+        # Histograma acumulado: o último intervalo é o total
+        self.assertEqual(lista['histograma'][-1], 2)
+        self.assertEqual(lista['histograma'], sorted(lista['histograma']))
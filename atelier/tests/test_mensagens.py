@@ -0,0 +1,209 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from atelier import mensagens
+from atelier.management.commands.whatsapp_falso import ServidorFalso
+from atelier.mensagens import ErroPermanente, ErroTemporario, Transporte, TransporteHttp, enviar_lote, reenviar, reservar_lote
+from atelier.models import MensagemWhatsapp
+from atelier.tests import fabrica
+
+
+class TransporteRoteirizado(Transporte):
+    """Transporte de teste: levanta o erro previsto para a chave da mensagem"""
+
+    def __init__(self, roteiro=None):
+        super().__init__()
+        self.roteiro = roteiro or {}
+        self.enviadas = []
+
+    def enviar(self, mensagem):
+        self.enviadas.append(mensagem.chave)
+        erro = self.roteiro.get(mensagem.chave)
+        if callable(erro):
+            erro()
+        elif erro:
+            raise erro
+
+
+def iniciar_servidor_falso(teste, **opcoes):
+    """Servidor falso numa porta livre, encerrado no fim do teste; devolve (servidor, url)"""
+    servidor = ServidorFalso(porta=0, **opcoes)
+    threading.Thread(target=servidor.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    teste.addCleanup(servidor.server_close)
+    teste.addCleanup(servidor.shutdown)
+    return servidor, f'http://127.0.0.1:{servidor.server_address[1]}/v1/messages'
+
+
+def mensagem(chave, **campos):
+    return MensagemWhatsapp.objects.create(chave=chave, telefone='5511987654321', texto='Recibo', **campos)
+
+
+class CaixaDeSaidaTest(TestCase):
+    def test_venda_com_whatsapp_entra_na_caixa_de_saida(self):
+        venda = fabrica.venda(cliente=fabrica.cliente(telefone='(11) 98765-4321'))
+        fabrica.venda(cliente=fabrica.cliente(nome='Sem DDD', telefone='98765-4321'))
+
+        recibo = MensagemWhatsapp.objects.get()
+        self.assertEqual((recibo.chave, recibo.telefone, recibo.venda_id), (f'recibo-{venda.pk}', '5511987654321', venda.pk))
+        self.assertEqual(recibo.situacao, MensagemWhatsapp.PENDENTE)
+
+    def test_lote_reservado_nao_e_pego_de_novo(self):
+        mensagem('a')
+        mensagem('b')
+        mensagem('futura', proxima_tentativa=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual([reservada.chave for reservada in reservar_lote()], ['a', 'b'])
+        self.assertEqual(reservar_lote(), [])
+
+    def test_resultado_de_cada_envio(self):
+        for chave in ('ok', 'limite', 'recusada', 'quebrou'):
+            mensagem(chave)
+        transporte = TransporteRoteirizado({
+            'limite': ErroTemporario("HTTP 429", espera=120),
+            'recusada': ErroPermanente("HTTP 400"),
+            'quebrou': RuntimeError("inesperado"),
+        })
+        antes = timezone.now()
+        with self.assertLogs('atelier.mensagens', 'WARNING'):
+            self.assertEqual(enviar_lote(transporte, reservar_lote()), (1, 2, 1))
+
+        situacoes = {item.chave: item for item in MensagemWhatsapp.objects.all()}
+        self.assertEqual(situacoes['ok'].situacao, MensagemWhatsapp.ENVIADA)
+        self.assertIsNotNone(situacoes['ok'].enviada_em)
+        self.assertEqual(situacoes['recusada'].situacao, MensagemWhatsapp.FALHOU)
+        # Retry-After da API manda na espera; sem ele, espera exponencial
+        limite = situacoes['limite']
+        self.assertEqual((limite.situacao, limite.tentativas), (MensagemWhatsapp.PENDENTE, 1))
+        self.assertGreaterEqual(limite.proxima_tentativa, antes + timedelta(seconds=120))
+        quebrou = situacoes['quebrou']
+        self.assertEqual(quebrou.situacao, MensagemWhatsapp.PENDENTE)
+        self.assertGreaterEqual(quebrou.proxima_tentativa, antes + timedelta(seconds=mensagens.ESPERA_INICIAL / 2))
+
+    def test_desiste_depois_do_maximo_de_tentativas_e_reenvio_volta_para_a_fila(self):
+        mensagem('teimosa', tentativas=mensagens.MAXIMO_TENTATIVAS - 1)
+        with self.assertLogs('atelier.mensagens', 'WARNING'):
+            enviar_lote(TransporteRoteirizado({'teimosa': ErroTemporario("HTTP 503")}), reservar_lote())
+        self.assertEqual(MensagemWhatsapp.objects.get().situacao, MensagemWhatsapp.FALHOU)
+
+        self.assertEqual(reenviar(MensagemWhatsapp.objects.all()), 1)
+        transporte = TransporteRoteirizado()
+        self.assertEqual(enviar_lote(transporte, reservar_lote()), (1, 0, 0))
+        self.assertEqual(transporte.enviadas, ['teimosa'])
+
+    def test_resultado_gravado_a_cada_envio(self):
+        mensagem('primeira')
+        mensagem('segunda')
+        # O worker cai no meio do lote: a primeira já está gravada como enviada
+        with self.assertRaises(KeyboardInterrupt):
+            enviar_lote(TransporteRoteirizado({'segunda': KeyboardInterrupt()}), reservar_lote())
+        self.assertEqual(
+            dict(MensagemWhatsapp.objects.values_list('chave', 'situacao')),
+            {'primeira': MensagemWhatsapp.ENVIADA, 'segunda': MensagemWhatsapp.PENDENTE},
+        )
+
+    def test_lote_demorado_devolve_as_restantes_para_a_fila(self):
+        for chave in ('lenta', 'b', 'c'):
+            mensagem(chave)
+        transporte = TransporteRoteirizado({'lenta': lambda: time.sleep(0.05)})
+        with mock.patch.object(mensagens, 'DURACAO_MAXIMA_LOTE', timedelta(milliseconds=10)):
+            with self.assertLogs('atelier.mensagens', 'WARNING'):
+                self.assertEqual(enviar_lote(transporte, reservar_lote()), (1, 0, 0))
+
+        self.assertEqual(transporte.enviadas, ['lenta'])
+        restantes = MensagemWhatsapp.objects.filter(situacao=MensagemWhatsapp.PENDENTE)
+        self.assertEqual(sorted(restantes.values_list('chave', 'tentativas')), [('b', 0), ('c', 0)])
+        self.assertEqual([reservada.chave for reservada in reservar_lote()], ['b', 'c'])
+
+    def test_reserva_retomada_por_outro_worker_nao_e_sobrescrita(self):
+        mensagem('disputada')
+        lote = reservar_lote()
+        # A reserva venceu e outro worker pegou a mensagem
+        MensagemWhatsapp.objects.update(proxima_tentativa=timezone.now())
+        reservar_lote()
+        enviar_lote(TransporteRoteirizado({'disputada': ErroPermanente("HTTP 400")}), lote)
+        self.assertEqual(MensagemWhatsapp.objects.get().situacao, MensagemWhatsapp.PENDENTE)
+
+
+class TransporteHttpTest(SimpleTestCase):
+    """TransporteHttp contra o servidor falso (python manage.py whatsapp_falso)"""
+
+    def servidor(self, **opcoes):
+        servidor, url = iniciar_servidor_falso(self, **opcoes)
+        transporte = TransporteHttp(url, token='segredo')
+        self.addCleanup(transporte.fechar)
+        return servidor, transporte
+
+    def mensagem(self, chave='recibo-1', telefone='5511987654321'):
+        return MensagemWhatsapp(chave=chave, telefone=telefone, texto='Recibo')
+
+    def test_aceita_e_reaproveita_a_conexao(self):
+        servidor, transporte = self.servidor()
+        transporte.enviar(self.mensagem('recibo-1'))
+        conexao = transporte.conexao
+        transporte.enviar(self.mensagem('recibo-2'))
+        self.assertIs(transporte.conexao, conexao)
+        self.assertEqual(list(servidor.recebidas), ['recibo-1', 'recibo-2'])
+
+    def test_chave_de_idempotencia_nao_duplica(self):
+        servidor, transporte = self.servidor()
+        transporte.enviar(self.mensagem())
+        transporte.enviar(self.mensagem())
+        self.assertEqual(servidor.recebidas, {'recibo-1': 'wamid.falso.1'})
+
+    def test_limite_com_retry_after(self):
+        _servidor, transporte = self.servidor(limite_por_minuto=1)
+        transporte.enviar(self.mensagem('recibo-1'))
+        with self.assertRaises(ErroTemporario) as erro:
+            transporte.enviar(self.mensagem('recibo-2'))
+        self.assertIn("HTTP 429", str(erro.exception))
+        self.assertTrue(55 <= erro.exception.espera <= 60)
+
+    def test_erro_do_servidor_e_temporario_sem_espera(self):
+        _servidor, transporte = self.servidor(falhas=1)
+        with self.assertRaises(ErroTemporario) as erro:
+            transporte.enviar(self.mensagem())
+        self.assertIn("HTTP 503", str(erro.exception))
+        self.assertIsNone(erro.exception.espera)
+
+    def test_numero_invalido_e_permanente(self):
+        servidor, transporte = self.servidor()
+        with self.assertRaises(ErroPermanente):
+            transporte.enviar(self.mensagem(telefone='123'))
+        self.assertEqual(servidor.recebidas, {})
+
+    def test_servidor_fora_do_ar_e_temporario(self):
+        servidor, transporte = self.servidor()
+        servidor.shutdown()
+        servidor.server_close()
+        with self.assertRaises(ErroTemporario):
+            transporte.enviar(self.mensagem())
+        self.assertIsNone(transporte.conexao)
+
+
+class EnvioPelaApiTest(TestCase):
+    """O lote inteiro pelo TransporteHttp: espera do Retry-After e espera exponencial nos 5xx"""
+
+    def test_retry_after_e_espera_exponencial(self):
+        servidor, url = iniciar_servidor_falso(self, limite_por_minuto=1)
+        mensagem('aceita')
+        mensagem('limitada')
+        antes = timezone.now()
+        with TransporteHttp(url) as transporte:
+            self.assertEqual(enviar_lote(transporte, reservar_lote()), (1, 1, 0))
+        limitada = MensagemWhatsapp.objects.get(chave='limitada')
+        self.assertGreaterEqual(limitada.proxima_tentativa, antes + timedelta(seconds=55))
+
+        servidor.falhas = 1
+        MensagemWhatsapp.objects.filter(chave='limitada').update(proxima_tentativa=timezone.now())
+        antes = timezone.now()
+        with TransporteHttp(url) as transporte:
+            self.assertEqual(enviar_lote(transporte, reservar_lote()), (0, 1, 0))
+        limitada.refresh_from_db()
+        # Segunda tentativa: entre metade e o total de 2 * ESPERA_INICIAL
+        self.assertEqual(limitada.tentativas, 2)
+        self.assertGreaterEqual(limitada.proxima_tentativa, antes + timedelta(seconds=mensagens.ESPERA_INICIAL))
+        self.assertLessEqual(limitada.proxima_tentativa, timezone.now() + timedelta(seconds=2 * mensagens.ESPERA_INICIAL))
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from decimal import Decimal
+from django.conf import settings
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from atelier import metricas
+from atelier.tests import fabrica
+
+
+class MetricasTest(TestCase):
+    def setUp(self):
+        # Cada teste começa com um arquivo de métricas vazio
+        metricas.gravar(recontar_estoque=False)
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        arquivo = override_settings(METRICAS={**settings.METRICAS, 'ARQUIVO': os.path.join(pasta.name, 'metricas.sqlite3')})
+        arquivo.enable()
+        self.addCleanup(arquivo.disable)
+
+    def series(self):
+        return [linha for linha in metricas.exportar().splitlines() if not linha.startswith('#')]
+
+    def test_contadores_somam_entre_gravacoes(self):
+        metricas.incrementar('atelier_vendas_total', metodo='PIX')
+        metricas.gravar()
+        metricas.incrementar('atelier_vendas_total', 2, metodo='PIX')
+        metricas.incrementar('atelier_vendas_valor_reais_total', 12.5)
+        self.assertEqual(self.series(), [
+            'atelier_vendas_total{metodo="PIX"} 3',
+            'atelier_vendas_valor_reais_total 12.5',
+        ])
+
+    def test_histograma_acumulado_em_ordem_numerica(self):
+        metricas.observar('atelier_requisicao_segundos', 0.03, view='lista')
+        metricas.observar('atelier_requisicao_segundos', 7, view='lista')
+        series = self.series()
+        self.assertEqual(series[:2], [
+            'atelier_requisicao_segundos_bucket{view="lista",le="0.05"} 1',
+            'atelier_requisicao_segundos_bucket{view="lista",le="0.1"} 1',
+        ])
+        self.assertIn('atelier_requisicao_segundos_bucket{view="lista",le="5"} 1', series)
+        self.assertEqual(series[-3:], [
+            'atelier_requisicao_segundos_bucket{view="lista",le="+Inf"} 2',
+            'atelier_requisicao_segundos_count{view="lista"} 2',
+            'atelier_requisicao_segundos_sum{view="lista"} 7.03',
+        ])
+
+    def test_estoque_baixo_recontado_na_gravacao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            fabrica.material(quantidade_estoque=Decimal('0'))
+        metricas.gravar()
+        self.assertIn('atelier_materiais_estoque_baixo 1', self.series())
+
+    def test_coleta_nao_consulta_o_banco(self):
+        metricas.incrementar('atelier_recibos_gerados_total')
+        with self.assertNumQueries(0):
+            resposta = self.client.get(reverse('atelier:metricas'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('atelier_recibos_gerados_total 1', resposta.content.decode())
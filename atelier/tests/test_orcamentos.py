@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from atelier.dados_sinteticos import gerar_dados
+from atelier.medicao import urls_das_views, contar_consultas
+
+# Máximo de consultas de cada view (GET, cache vazio) na base sintética de
+# teste. Uma view nova precisa entrar aqui; se um orçamento estourar, é sinal
+# de N+1 ou de consulta esquecida: corrigir a view antes de aumentar o número.
+ORCAMENTO_CONSULTAS = {
+    'atelier:lista_produtos': 5,
+    'atelier:criar_produto': 1,
+    'atelier:editar_produto': 6,
+    'atelier:detalhar_produto': 2,
+    'atelier:excluir_produto': 1,
+    'atelier:lista_materiais': 3,
+    'atelier:cadastrar_material': 1,
+    'atelier:cadastrar_material_modal': 0,
+    'atelier:cadastrar_categoria': 0,
+    'atelier:editar_material': 2,
+    'atelier:excluir_material': 1,
+    'atelier:registrar_venda': 1,
+    'atelier:gerar_recibo': 3,  # primeira vez: gera e grava o recibo
+    'atelier:recibo_pdf': 1,
+    'atelier:recibos_em_lote': 0,
+    'atelier:registrar_entrada': 1,
+    'atelier:importar_estoque': 0,
+    'atelier:reposicao': 2,
+    'atelier:lista_clientes': 1,
+    'atelier:cadastrar_cliente': 0,
+    'atelier:autocompletar_clientes': 2,
+    'atelier:detalhe_cliente': 2,
+    'atelier:editar_cliente': 1,
+    'atelier:excluir_cliente': 1,
+    'atelier:exportar_dados': 0,
+    'atelier:busca': 2,
+    'atelier:relatorio_vendas': 4,
+    # A coleta não pode tocar no banco principal
+    'atelier:metricas': 0,
+    # Estatísticas da memória do processo (sem login, só o redirecionamento)
+    'atelier:instrumentacao': 0,
+}
+
+
+# Listagens do admin: o mesmo número de consultas com 1 ou 100 linhas na página
+# (sessão e usuário, contagem, página e os filtros laterais)
+ORCAMENTO_CONSULTAS_ADMIN = {
+    'atelier_produto': 4,
+    'atelier_venda': 8,
+    'atelier_material': 5,
+    'atelier_entradamaterial': 8,
+    'atelier_cliente': 4,
+}
+
+
+class OrcamentoConsultasTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados('teste')
+
+    def test_views_dentro_do_orcamento(self):
+        for nome, url, parametros in urls_das_views(modulos=('atelier.urls',)):
+            with self.subTest(view=nome):
+                self.assertIn(nome, ORCAMENTO_CONSULTAS, f"{nome} sem orçamento de consultas")
+                consultas = contar_consultas(self.client, url, parametros)
+                self.assertLessEqual(consultas, ORCAMENTO_CONSULTAS[nome], f"{url}: {consultas} consultas")
+
+
+class OrcamentoConsultasAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados('teste')
+        cls.usuario = User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+
+    def test_listagens_dentro_do_orcamento(self):
+        self.client.force_login(self.usuario)
+        for modelo, orcamento in ORCAMENTO_CONSULTAS_ADMIN.items():
+            with self.subTest(modelo=modelo):
+                url = reverse(f'admin:{modelo}_changelist')
+                consultas = contar_consultas(self.client, url)
+                self.assertLessEqual(consultas, orcamento, f"{url}: {consultas} consultas")
@@ -0,0 +1,66 @@
+from decimal import Decimal
+from django.test import TestCase
+
+from atelier.models import Cliente
+from atelier.paginacao import _codificar_cursor, paginar_por_chave
+from atelier.tests import fabrica
+
+
+class PaginacaoPorChaveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Nomes repetidos: o desempate é pelo id
+        for nome in ('Ana', 'Bia', 'Bia', 'Bia', 'Caio', 'Dora', 'Dora'):
+            fabrica.cliente(nome=nome)
+
+    def percorrer(self, ordenacao, tamanho):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            pagina = paginar_por_chave(Cliente.objects.all(), ordenacao, cursor, tamanho)
+            self.assertEqual(pagina.e_primeira, paginas == 0)
+            vistos += [cliente.pk for cliente in pagina]
+            paginas += 1
+            if not pagina.tem_proxima:
+                return vistos, paginas
+            cursor = pagina.proximo_cursor
+
+    def test_percorre_todas_as_linhas_sem_repetir(self):
+        for ordenacao in (('nome', 'id'), ('-nome', '-id'), ('-id',)):
+            with self.subTest(ordenacao=ordenacao):
+                esperado = list(Cliente.objects.order_by(*ordenacao).values_list('pk', flat=True))
+                self.assertEqual(self.percorrer(ordenacao, 2), (esperado, 4))
+
+    def test_cada_pagina_e_uma_consulta(self):
+        primeira = paginar_por_chave(Cliente.objects.all(), ('nome', 'id'), tamanho=3)
+        with self.assertNumQueries(1):
+            paginar_por_chave(Cliente.objects.all(), ('nome', 'id'), primeira.proximo_cursor, 3)
+
+    def test_cursor_invalido_volta_para_a_primeira_pagina(self):
+        primeira = [cliente.pk for cliente in paginar_por_chave(Cliente.objects.all(), ('nome', 'id'), tamanho=2)]
+        for cursor in ('%%%', 'bm9wZQ==', 'WzFd'):
+            with self.subTest(cursor=cursor):
+                pagina = paginar_por_chave(Cliente.objects.all(), ('nome', 'id'), cursor, 2)
+                self.assertTrue(pagina.e_primeira)
+                self.assertEqual([cliente.pk for cliente in pagina], primeira)
+
+    def test_cursor_com_valores_de_outro_tipo_volta_para_a_primeira_pagina(self):
+        casos = {
+            ('-id',): [['x'], ['abc'], [None], [{'id': 1}], [[1]]],
+            ('nome', 'id'): [['Bia', 'abc'], [['Bia'], 1], ['Bia', None]],
+            ('-total_gasto', '-id'): [['NaN', 1], ['Infinity', 1], ['abc', 1]],
+        }
+        for ordenacao, cursores in casos.items():
+            primeira = [cliente.pk for cliente in paginar_por_chave(Cliente.objects.all(), ordenacao, tamanho=2)]
+            for valores in cursores:
+                with self.subTest(ordenacao=ordenacao, valores=valores):
+                    pagina = paginar_por_chave(Cliente.objects.all(), ordenacao, _codificar_cursor(valores), 2)
+                    self.assertTrue(pagina.e_primeira)
+                    self.assertEqual([cliente.pk for cliente in pagina], primeira)
+
+    def test_valores_do_cursor_convertidos_pelo_campo(self):
+        Cliente.objects.filter(nome='Ana').update(total_gasto=Decimal('99.90'))
+        # Decimal e id chegam como texto (como fica no JSON)
+        cursor = _codificar_cursor(['99.90', str(Cliente.objects.get(nome='Ana').pk)])
+        pagina = paginar_por_chave(Cliente.objects.all(), ('-total_gasto', '-id'), cursor, 10)
+        self.assertFalse(pagina.e_primeira)
+        self.assertEqual(len(pagina), 6)
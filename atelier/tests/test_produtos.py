@@ -0,0 +1,42 @@
+import datetime
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from atelier.models import Material, Produto
+from atelier.tests import fabrica
+
+
+class PrecoProdutoTest(TestCase):
+    def test_atalhos_calculam_pela_composicao_atual(self):
+        linho = fabrica.material(preco_unitario=Decimal('10.00'))
+        bolsa = fabrica.produto(itens=[(linho, '1.5')], tempo_trabalho_horas=datetime.time(4, 30))
+        # Preço mudado sem passar pela reprecificação: os atalhos usam o preço atual do material
+        Material.objects.filter(pk=linho.pk).update(preco_unitario=Decimal('20.00'))
+
+        self.assertEqual(bolsa.get_tempo_em_decimal(), Decimal('4.5'))
+        self.assertEqual(bolsa.get_custo_total_materiais(), Decimal('30'))
+        # (30 + 4,5h x 20) x 1,5
+        self.assertEqual(bolsa.get_preco_final_sugerido(), Decimal('180.00'))
+        self.assertEqual(bolsa.get_lucro_liquido(), Decimal('60.00'))
+        # As colunas guardadas continuam com o preço antigo
+        self.assertEqual(Produto.objects.get(pk=bolsa.pk).preco_sugerido, Decimal('157.50'))
+
+
+class ProdutoAdminTest(TestCase):
+    def test_custo_base_ordenavel(self):
+        barato = fabrica.produto(nome='Chaveiro', tempo_trabalho_horas=datetime.time(0, 30))
+        caro = fabrica.produto(nome='Bolsa', tempo_trabalho_horas=datetime.time(5, 0))
+        medio = fabrica.produto(
+            nome='Estojo', tempo_trabalho_horas=datetime.time(1, 0), itens=[(fabrica.material(), '2')],
+        )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        url = reverse('admin:atelier_produto_changelist')
+
+        resposta = self.client.get(url)
+        coluna = list(resposta.context['cl'].list_display).index('custo_base')
+        for ordem, esperado in ((f'{coluna}', [barato, medio, caro]), (f'-{coluna}', [caro, medio, barato])):
+            with self.subTest(ordem=ordem):
+                resposta = self.client.get(url, {'o': ordem})
+                self.assertEqual(list(resposta.context['cl'].result_list), esperado)
@@ -0,0 +1,100 @@
+import datetime
+import re
+import zlib
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from atelier import recibos
+from atelier.models import Recibo, Venda
+from atelier.tests import fabrica
+
+
+def ler_pdf(teste, dados):
+    """Confere a estrutura do PDF (cabeçalho, xref e trailer) e devolve o texto de cada página"""
+    teste.assertTrue(dados.startswith(b'%PDF-1.4\n'))
+    teste.assertTrue(dados.endswith(b'%%EOF\n'))
+    inicio_xref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', dados)[1])
+    teste.assertEqual(dados[inicio_xref:inicio_xref + 5], b'xref\n')
+
+    tamanho = int(re.search(rb'trailer\n<< /Size (\d+) ', dados)[1])
+    entradas = re.findall(rb'(\d{10}) (\d{5}) ([fn]) \n', dados[inicio_xref:])
+    teste.assertEqual(len(entradas), tamanho)
+    for numero, (posicao, _geracao, uso) in enumerate(entradas[1:], start=1):
+        teste.assertEqual(uso, b'n')
+        # Cada posição da tabela aponta para o início do objeto de mesmo número
+        posicao = int(posicao)
+        teste.assertEqual(dados[posicao:dados.index(b'\n', posicao)], b'%d 0 obj' % numero)
+
+    paginas = re.search(rb'/Type /Pages /Kids \[([^\]]*)\] /Count (\d+)', dados)
+    filhos = re.findall(rb'(\d+) 0 R', paginas[1])
+    teste.assertEqual(len(filhos), int(paginas[2]))
+    textos = []
+    for filho in filhos:
+        conteudo_id = re.search(rb'\n%s 0 obj\n<< /Type /Page .*?/Contents (\d+) 0 R' % filho, dados)[1]
+        fluxo = re.search(rb'\n%s 0 obj\n<< /Length (\d+) /Filter /FlateDecode >>\nstream\n' % conteudo_id, dados)
+        comprimido = dados[fluxo.end():fluxo.end() + int(fluxo[1])]
+        textos.append(zlib.decompress(comprimido).decode('cp1252'))
+    return textos
+
+
+class ReciboTest(TestCase):
+    def vender(self, **campos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return fabrica.venda(fabrica.produto(nome='Bolsa de linho'), **campos)
+
+    def test_montado_na_venda_e_servido_sem_renderizar(self):
+        venda = self.vender(cliente=fabrica.cliente(nome='Maria Souza'))
+        self.assertTrue(Recibo.objects.filter(venda=venda).exists())
+
+        with mock.patch.object(recibos, '_html') as html, mock.patch.object(recibos, '_pagina_pdf') as pagina:
+            with self.assertNumQueries(1):
+                resposta = self.client.get(reverse('atelier:gerar_recibo', args=[venda.pk]))
+            self.assertContains(resposta, 'Maria Souza')
+            with self.assertNumQueries(1):
+                resposta = self.client.get(reverse('atelier:recibo_pdf', args=[venda.pk]))
+        html.assert_not_called()
+        pagina.assert_not_called()
+        self.assertIn('(Maria Souza)', ler_pdf(self, resposta.content)[0])
+
+    def test_venda_sem_recibo_tem_o_recibo_montado_na_primeira_leitura(self):
+        venda = fabrica.venda()
+        self.assertFalse(Recibo.objects.filter(venda=venda).exists())
+        self.client.get(reverse('atelier:gerar_recibo', args=[venda.pk]))
+        self.assertTrue(Recibo.objects.filter(venda=venda).exists())
+
+    def test_venda_alterada_refaz_o_recibo(self):
+        venda = self.vender(cliente=fabrica.cliente(nome='Maria Souza'))
+        with self.captureOnCommitCallbacks(execute=True):
+            venda = Venda.objects.get(pk=venda.pk)
+            venda.cliente = fabrica.cliente(nome='João Lima')
+            venda.valor_venda = Decimal('80.00')
+            venda.save()
+
+        recibo = Recibo.objects.get(venda=venda)
+        self.assertIn('João Lima', recibo.html)
+        self.assertNotIn('Maria Souza', recibo.html)
+        texto = zlib.decompress(recibo.pagina_pdf).decode('cp1252')
+        self.assertIn('(João Lima)', texto)
+        self.assertIn('(R$ 80.00)', texto)
+
+    def test_lote_com_uma_pagina_por_venda_do_periodo(self):
+        hoje = timezone.localtime().replace(hour=12)
+        for dias, nome in ((10, 'Fora do período'), (2, 'Ana'), (1, 'Bruno'), (0, 'Carla')):
+            self.vender(cliente=fabrica.cliente(nome=nome), data_venda=hoje - datetime.timedelta(days=dias))
+        # Venda antiga, de antes dos recibos guardados: montada na hora
+        Recibo.objects.filter(venda__cliente__nome='Bruno').delete()
+
+        with mock.patch.object(recibos, 'TAMANHO_BLOCO', 2):
+            resposta = self.client.get(reverse('atelier:recibos_em_lote'), {
+                'inicio': (hoje - datetime.timedelta(days=2)).date().isoformat(), 'fim': hoje.date().isoformat(),
+            })
+        self.assertTrue(resposta.streaming)
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
+        paginas = ler_pdf(self, b''.join(resposta.streaming_content))
+
+        self.assertEqual(len(paginas), 3)
+        for pagina, nome in zip(paginas, ('Ana', 'Bruno', 'Carla')):
+            self.assertIn(f'({nome})', pagina)
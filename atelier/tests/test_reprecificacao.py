@@ -0,0 +1,70 @@
+import datetime
+import io
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import TestCase
+
+from atelier.models import Material, Produto
+from atelier.reprecificacao import reprecificar_por_material, reprecificar_produtos
+from atelier.tests import fabrica
+
+
+class ReprecificacaoTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.linho = fabrica.material(preco_unitario=Decimal('7.33'))
+        botao = fabrica.material(nome='Botão', preco_unitario=Decimal('0.45'))
+        cls.bolsa = fabrica.produto(
+            itens=[(cls.linho, '1.5'), (botao, '3')], margem_lucro_percentual=Decimal('37.5'),
+            desconto_valor=Decimal('4.99'), tempo_trabalho_horas=datetime.time(3, 20),
+        )
+        cls.necessaire = fabrica.produto(
+            nome='Nécessaire', itens=[(cls.linho, '0.333')], valor_hora_trabalho=Decimal('17.90'),
+        )
+        cls.chaveiro = fabrica.produto(nome='Chaveiro', itens=[(botao, '1')], tempo_trabalho_horas=datetime.time(0, 10))
+        cls.sem_itens = fabrica.produto(nome='Sem materiais')
+        # Preços novos sem passar pelos receivers: as colunas guardadas ficam desatualizadas
+        Material.objects.filter(pk=cls.linho.pk).update(preco_unitario=Decimal('9.87'))
+        Material.objects.filter(pk=botao.pk).update(preco_unitario=Decimal('0.61'))
+
+    def colunas(self):
+        return {
+            produto['pk']: produto
+            for produto in Produto.objects.values('pk', *Produto.CAMPOS_CALCULADOS)
+        }
+
+    def pelo_save(self):
+        """Os valores que Produto.save() calcularia, um produto por vez"""
+        for produto in Produto.objects.all():
+            produto.calcular_e_salvar_preco()
+        return self.colunas()
+
+    def test_lotes_dao_o_mesmo_resultado_que_o_save(self):
+        antes = self.colunas()
+        # Lotes de 3 para 4 produtos: a paginação pela chave atravessa dois lotes
+        self.assertEqual(reprecificar_produtos(tamanho_lote=3), 4)
+        em_lote = self.colunas()
+
+        self.assertNotEqual(em_lote, antes)
+        self.assertEqual(em_lote, self.pelo_save())
+        self.assertEqual(em_lote[self.sem_itens.pk]['custo_materiais'], Decimal('0'))
+
+    def test_por_material_so_os_produtos_que_o_usam(self):
+        antes = self.colunas()
+        self.assertEqual(reprecificar_por_material(self.linho.pk), 2)
+        depois = self.colunas()
+        esperado = self.pelo_save()
+
+        for produto in (self.bolsa, self.necessaire):
+            self.assertEqual(depois[produto.pk], esperado[produto.pk])
+        self.assertEqual(depois[self.chaveiro.pk], antes[self.chaveiro.pk])
+        self.assertNotEqual(depois[self.chaveiro.pk], esperado[self.chaveiro.pk])
+
+    def test_comando(self):
+        saida = io.StringIO()
+        call_command('reprecificar_catalogo', '--material', str(self.linho.pk), stdout=saida)
+        self.assertIn("2 produto(s) reprecificado(s)", saida.getvalue())
+
+        call_command('reprecificar_catalogo', '--lote', '1', stdout=saida)
+        self.assertIn("4 produto(s) reprecificado(s)", saida.getvalue())
+        self.assertEqual(self.colunas(), self.pelo_save())
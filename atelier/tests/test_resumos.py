@@ -0,0 +1,67 @@
+import datetime
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+
+from atelier.models import ResumoVendasDia, ResumoVendasMes, Venda
+from atelier.resumos import FUSO_RESUMOS, recalcular_resumos, totais_por_dia, totais_por_mes
+from atelier.tests import fabrica
+
+
+def resumos():
+    dias = ResumoVendasDia.objects.order_by('dia', 'metodo_pagamento')
+    meses = ResumoVendasMes.objects.order_by('mes', 'metodo_pagamento')
+    campos = ('metodo_pagamento', 'receita', 'quantidade', 'lucro')
+    return list(dias.values_list('dia', *campos)), list(meses.values_list('mes', *campos))
+
+
+class ResumosVendasTest(TestCase):
+    def setUp(self):
+        self.produto = fabrica.produto()
+        # 31/01 às 23h em São Paulo já é 01/02 em UTC: a venda é de janeiro
+        self.fim_de_janeiro = datetime.datetime(2026, 1, 31, 23, 0, tzinfo=FUSO_RESUMOS)
+
+    def venda(self, **campos):
+        return fabrica.venda(self.produto, **{'data_venda': self.fim_de_janeiro, 'custo_total': Decimal('60.00'), **campos})
+
+    def test_venda_soma_no_dia_e_no_mes_locais(self):
+        self.venda()
+        self.venda(valor_venda=Decimal('50.00'))
+        self.venda(metodo_pagamento='DINHEIRO')
+
+        dias, meses = resumos()
+        self.assertEqual(dias, [
+            (datetime.date(2026, 1, 31), 'DINHEIRO', Decimal('100.00'), 1, Decimal('40.00')),
+            (datetime.date(2026, 1, 31), 'PIX', Decimal('150.00'), 2, Decimal('30.00')),
+        ])
+        self.assertEqual([mes[0] for mes in meses], [datetime.date(2026, 1, 1)] * 2)
+        self.assertEqual(totais_por_mes(2026)[1]['receita'], Decimal('250.00'))
+        self.assertEqual(totais_por_mes(2026)[1]['metodos'], {'DINHEIRO': Decimal('100.00'), 'PIX': Decimal('150.00')})
+        self.assertEqual([linha['quantidade'] for linha in totais_por_dia(2026, 1)], [3])
+
+    def test_edicao_troca_a_contribuicao_e_exclusao_desfaz(self):
+        venda = Venda.objects.get(pk=self.venda().pk)
+        venda.metodo_pagamento = 'CREDITO'
+        venda.data_venda = self.fim_de_janeiro + datetime.timedelta(days=1)
+        venda.save()
+
+        dias, _meses = resumos()
+        self.assertEqual(
+            [(dia, metodo, quantidade) for dia, metodo, _receita, quantidade, _lucro in dias],
+            [(datetime.date(2026, 1, 31), 'PIX', 0), (datetime.date(2026, 2, 1), 'CREDITO', 1)],
+        )
+
+        venda.delete()
+        dias, meses = resumos()
+        self.assertTrue(all(quantidade == 0 and receita == 0 for _dia, _metodo, receita, quantidade, _lucro in dias))
+        self.assertTrue(all(quantidade == 0 and receita == 0 for _mes, _metodo, receita, quantidade, _lucro in meses))
+
+    def test_recalcular_chega_aos_mesmos_resumos(self):
+        self.venda()
+        self.venda(metodo_pagamento='DEBITO', data_venda=timezone.now())
+        incrementais = resumos()
+
+        ResumoVendasDia.objects.all().delete()
+        ResumoVendasMes.objects.all().delete()
+        self.assertEqual(recalcular_resumos(), (2, 2))
+        self.assertEqual(resumos(), incrementais)
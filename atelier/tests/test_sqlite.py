@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.sqlite import banco_sqlite
+
+
+class PerfilSqliteTest(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.arquivo = os.path.join(pasta.name, 'perfil.sqlite3')
+
+    def conexao(self, perfil, **opcoes):
+        """Conexão nova (fora do banco de teste) com o arquivo temporário e o perfil"""
+        banco = banco_sqlite(self.arquivo, perfil)
+        banco['OPTIONS'].update(opcoes)
+        # As chaves que faltam (TIME_ZONE, TEST...) preenchidas como nas conexões do settings.py
+        conexao = ConnectionHandler({DEFAULT_DB_ALIAS: {}, perfil: banco})[perfil]
+        self.addCleanup(conexao.close)
+        return conexao
+
+    def pragmas(self, conexao):
+        with conexao.cursor() as cursor:
+            return tuple(
+                cursor.execute(f'PRAGMA {nome}').fetchone()[0]
+                for nome in ('journal_mode', 'busy_timeout', 'synchronous')
+            )
+
+    def test_pragmas_aplicados_a_cada_conexao(self):
+        # synchronous: 1 = NORMAL, 2 = FULL (o padrão do SQLite)
+        self.assertEqual(self.pragmas(self.conexao('desempenho')), ('wal', 5000, 1))
+        self.assertEqual(self.conexao('desempenho').settings_dict['CONN_MAX_AGE'], 600)
+
+    def test_basico_fica_como_o_sqlite_vem(self):
+        self.assertEqual(self.pragmas(self.conexao('basico', timeout=2)), ('delete', 2000, 2))
+        self.assertEqual(self.conexao('basico').settings_dict['CONN_MAX_AGE'], 0)
+
+    def test_transacao_pede_a_trava_de_escrita_no_inicio(self):
+        rapida = self.conexao('desempenho')
+        # Sem espera: a escrita bloqueada falha na hora
+        outra = self.conexao('basico', timeout=0)
+        with outra.cursor() as cursor:
+            cursor.execute('CREATE TABLE nota (texto TEXT)')
+
+        self.assertEqual(rapida.settings_dict['OPTIONS'], {'transaction_mode': 'IMMEDIATE'})
+        with CaptureQueriesContext(rapida) as consultas:
+            # Como o atomic() abre a transação
+            rapida.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            # Nenhuma escrita ainda, mas a trava já é desta transação
+            with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                with outra.cursor() as cursor:
+                    cursor.execute("INSERT INTO nota VALUES ('bloqueada')")
+        finally:
+            rapida.rollback()
+            rapida.set_autocommit(True)
+        self.assertEqual(consultas[0]['sql'], 'BEGIN IMMEDIATE')
+
+        with outra.cursor() as cursor:
+            cursor.execute("INSERT INTO nota VALUES ('liberada')")
+
+    def test_perfil_escolhido_pelo_ambiente(self):
+        def banco(perfil):
+            return subprocess.run(
+                [sys.executable, '-c', (
+                    "import json; from core import settings; "
+                    "banco = settings.DATABASES['default']; "
+                    "print(json.dumps([banco['PERFIL'], banco['OPTIONS'], banco['PRAGMAS']]))"
+                )],
+                cwd=settings.BASE_DIR, env={**os.environ, 'SQLITE_PERFIL': perfil}, capture_output=True, text=True,
+            )
+
+        perfil, opcoes, pragmas = json.loads(banco('desempenho').stdout)
+        self.assertEqual((perfil, opcoes, pragmas['journal_mode']), ('desempenho', {'transaction_mode': 'IMMEDIATE'}, 'WAL'))
+        self.assertEqual(json.loads(banco('basico').stdout), ['basico', {}, {}])
+
+        desconhecido = banco('rapidinho')
+        self.assertNotEqual(desconhecido.returncode, 0)
+        self.assertIn("Perfil de SQLite desconhecido: rapidinho", desconhecido.stderr)
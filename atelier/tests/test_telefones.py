@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from atelier.busca import autocompletar_clientes
+from atelier.tests import fabrica
+
+
+class AutocompletarClientesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.maria = fabrica.cliente(nome='Maria Souza', telefone='+55 (11) 98765-4321')
+        cls.joao = fabrica.cliente(nome='João Lima', telefone='(21) 3333-4444')
+        cls.ana = fabrica.cliente(nome='Ana Prado', telefone='(55) 3222-1111')
+
+    def nomes(self, texto):
+        return [sugestao['nome'] for sugestao in autocompletar_clientes(texto)]
+
+    def test_pelo_telefone_com_ou_sem_ddd(self):
+        self.assertEqual(self.nomes('1198'), ['Maria Souza'])
+        self.assertEqual(self.nomes('98765'), ['Maria Souza'])
+        self.assertEqual(self.nomes('(21) 33'), ['João Lima'])
+        self.assertEqual(self.nomes('9'), [])
+        self.assertEqual(autocompletar_clientes('1198')[0]['telefone'], '(11) 98765-4321')
+
+    def test_codigo_do_pais_na_consulta_parcial(self):
+        self.assertEqual(self.nomes('+55 11 9'), ['Maria Souza'])
+        self.assertEqual(self.nomes('55 11 98'), ['Maria Souza'])
+        # Sem o '+', 55 também é DDD (Santa Maria/RS): vale das duas formas
+        self.assertEqual(self.nomes('5532'), ['Ana Prado'])
+        self.assertEqual(self.nomes('+55 54'), [])
+        self.assertEqual(self.nomes('+55 21 33'), ['João Lima'])
+
+    def test_pelo_nome(self):
+        self.assertEqual(self.nomes('joao'), ['João Lima'])
+        self.assertEqual(self.nomes('sou'), ['Maria Souza'])
@@ -0,0 +1,178 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from atelier import trabalhos
+from atelier.models import Material, Produto, Trabalho
+from atelier.tests import fabrica
+
+
+def somar(a, b):
+    return a + b
+
+
+def quebrar():
+    raise RuntimeError("deu errado")
+
+
+@override_settings(TRABALHOS={'EM_SEGUNDO_PLANO': True})
+class FilaTrabalhosTest(TestCase):
+    def setUp(self):
+        registro = mock.patch.dict(trabalhos.REGISTRO, {
+            'somar': (somar, None),
+            'quebrar': (quebrar, None),
+            'recorrente': (lambda: 'ok', timedelta(hours=1)),
+        }, clear=True)
+        registro.start()
+        self.addCleanup(registro.stop)
+
+    def test_chave_nao_duplica_pendente(self):
+        trabalhos.enfileirar('somar', {'a': 1, 'b': 2}, chave='soma')
+        trabalhos.enfileirar('somar', {'a': 1, 'b': 2}, chave='soma')
+        trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+        self.assertEqual(Trabalho.objects.filter(chave='soma').count(), 1)
+        self.assertEqual(Trabalho.objects.count(), 2)
+        with self.assertRaises(ValueError):
+            trabalhos.enfileirar('inexistente')
+
+    def test_reserva_e_de_um_processo_so(self):
+        trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+        trabalhos.enfileirar('somar', {'a': 3, 'b': 4}, executar_em=timezone.now() + timedelta(hours=1))
+
+        reservado = trabalhos.reservar('processo-1')
+        self.assertEqual((reservado.situacao, reservado.reservado_por, reservado.tentativas), (Trabalho.EXECUTANDO, 'processo-1', 1))
+        # O outro ainda não venceu e o primeiro já tem dono
+        self.assertIsNone(trabalhos.reservar('processo-2'))
+
+        # Processo que caiu: depois da reserva vencida, outro retoma
+        Trabalho.objects.filter(pk=reservado.pk).update(reservado_ate=timezone.now() - timedelta(seconds=1))
+        retomado = trabalhos.reservar('processo-2')
+        self.assertEqual((retomado.pk, retomado.reservado_por, retomado.tentativas), (reservado.pk, 'processo-2', 2))
+
+        # O primeiro processo não grava mais o resultado de um trabalho que não é dele
+        self.assertTrue(trabalhos.executar(retomado))
+        trabalhos._concluir(reservado, situacao=Trabalho.FALHOU)
+        self.assertEqual(Trabalho.objects.get(pk=reservado.pk).situacao, Trabalho.CONCLUIDO)
+
+    def test_sucesso_grava_o_resultado(self):
+        trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+        self.assertTrue(trabalhos.executar(trabalhos.reservar('processo')))
+        trabalho = Trabalho.objects.get()
+        self.assertEqual((trabalho.situacao, trabalho.resultado), (Trabalho.CONCLUIDO, 3))
+        self.assertIsNone(trabalho.reservado_ate)
+
+    def test_falha_tenta_de_novo_com_espera_ate_desistir(self):
+        trabalhos.enfileirar('quebrar', maximo_tentativas=2)
+        with self.assertLogs('atelier.trabalhos', 'ERROR'):
+            self.assertFalse(trabalhos.executar(trabalhos.reservar('processo')))
+        trabalho = Trabalho.objects.get()
+        self.assertEqual(trabalho.situacao, Trabalho.PENDENTE)
+        self.assertIn("deu errado", trabalho.ultimo_erro)
+        self.assertGreater(trabalho.executar_em, timezone.now() + timedelta(seconds=trabalhos.ESPERA_INICIAL - 5))
+
+        Trabalho.objects.update(executar_em=timezone.now())
+        with self.assertLogs('atelier.trabalhos', 'ERROR'):
+            trabalhos.executar(trabalhos.reservar('processo'))
+        trabalho.refresh_from_db()
+        self.assertEqual((trabalho.situacao, trabalho.tentativas), (Trabalho.FALHOU, 2))
+        self.assertIsNotNone(trabalho.concluido_em)
+
+    def test_nova_tentativa_com_outro_igual_pendente(self):
+        trabalhos.enfileirar('quebrar', chave='unico')
+        executando = trabalhos.reservar('processo')
+        # Enquanto este executa, o mesmo trabalho entra de novo na fila
+        trabalhos.enfileirar('quebrar', chave='unico')
+
+        with self.assertLogs('atelier.trabalhos', 'ERROR'):
+            self.assertFalse(trabalhos.executar(executando))
+        self.assertEqual(Trabalho.objects.get(pk=executando.pk).situacao, Trabalho.FALHOU)
+        self.assertEqual(Trabalho.objects.filter(chave='unico', situacao=Trabalho.PENDENTE).count(), 1)
+
+    def test_recorrente_agenda_a_proxima(self):
+        trabalhos.agendar_recorrentes()
+        trabalhos.agendar_recorrentes()
+        self.assertEqual(Trabalho.objects.filter(nome='recorrente').count(), 1)
+
+        primeira = trabalhos.reservar('processo')
+        trabalhos.executar(primeira)
+        proxima = Trabalho.objects.get(nome='recorrente', situacao=Trabalho.PENDENTE)
+        self.assertEqual(proxima.executar_em, primeira.executar_em + timedelta(hours=1))
+
+    def test_trabalhar_executa_os_vencidos(self):
+        for numero in range(3):
+            trabalhos.enfileirar('somar', {'a': numero, 'b': 1})
+        self.assertEqual(trabalhos.trabalhar(intervalo=0, somente_vencidos=True), 3)
+        self.assertEqual(
+            sorted(Trabalho.objects.values_list('resultado', flat=True)), [1, 2, 3],
+        )
+
+    def test_trabalhar_sobrevive_a_erro_ao_gravar(self):
+        trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+        with mock.patch.object(trabalhos, '_concluir', side_effect=DatabaseError("database is locked")):
+            with self.assertLogs('atelier.trabalhos', 'ERROR'):
+                self.assertEqual(trabalhos.trabalhar(intervalo=0, somente_vencidos=True), 1)
+        self.assertEqual(Trabalho.objects.get().situacao, Trabalho.EXECUTANDO)
+
+    @override_settings(TRABALHOS={'EM_SEGUNDO_PLANO': False})
+    def test_sem_worker_executa_depois_do_commit(self):
+        # Vencido na fila, de quando havia worker: não é deste commit e fica onde está
+        trabalhos._inserir('somar', {'a': 5, 'b': 5})
+        with self.captureOnCommitCallbacks(execute=True):
+            trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+            trabalhos.enfileirar('somar', {'a': 3, 'b': 4}, executar_em=timezone.now() + timedelta(hours=1))
+            self.assertFalse(Trabalho.objects.exclude(situacao=Trabalho.PENDENTE).exists())
+        self.assertEqual(
+            list(Trabalho.objects.filter(nome='somar').order_by('pk').values_list('situacao', 'resultado')),
+            [(Trabalho.PENDENTE, None), (Trabalho.CONCLUIDO, 3), (Trabalho.PENDENTE, None)],
+        )
+
+    @override_settings(TRABALHOS={'EM_SEGUNDO_PLANO': False})
+    def test_sem_worker_enfileirado_durante_outro_roda_no_mesmo_laco(self):
+        def encadear():
+            trabalhos.enfileirar('somar', {'a': 2, 'b': 2})
+
+        with mock.patch.dict(trabalhos.REGISTRO, {'encadear': (encadear, None)}):
+            with self.captureOnCommitCallbacks(execute=True):
+                trabalhos.enfileirar('encadear')
+        self.assertEqual(Trabalho.objects.get(nome='somar').resultado, 4)
+
+    @override_settings(TRABALHOS={'EM_SEGUNDO_PLANO': False})
+    def test_sem_worker_recorrentes_rodam_com_os_outros_trabalhos(self):
+        def recorrentes():
+            return list(Trabalho.objects.filter(nome='recorrente').order_by('pk').values_list('situacao', flat=True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+        # A primeira execução roda já e a próxima fica agendada
+        self.assertEqual(recorrentes(), [Trabalho.CONCLUIDO, Trabalho.PENDENTE])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+        self.assertEqual(recorrentes(), [Trabalho.CONCLUIDO, Trabalho.PENDENTE])
+
+        Trabalho.objects.filter(nome='recorrente', situacao=Trabalho.PENDENTE).update(executar_em=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            trabalhos.enfileirar('somar', {'a': 1, 'b': 2})
+        self.assertEqual(recorrentes(), [Trabalho.CONCLUIDO, Trabalho.CONCLUIDO, Trabalho.PENDENTE])
+
+@override_settings(TRABALHOS={'EM_SEGUNDO_PLANO': False})
+class ReprecificacaoSemWorkerTest(TestCase):
+    def test_preco_do_material_chega_aos_produtos(self):
+        linho = fabrica.material(preco_unitario=Decimal('10.00'))
+        bolsa = fabrica.produto(itens=[(linho, '2')])
+        self.assertEqual(Produto.objects.get(pk=bolsa.pk).custo_materiais, Decimal('20.00'))
+
+        linho = Material.objects.get(pk=linho.pk)
+        linho.preco_unitario = Decimal('15.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            linho.save()
+        self.assertEqual(Produto.objects.get(pk=bolsa.pk).custo_materiais, Decimal('30.00'))
+        self.assertEqual(Trabalho.objects.get(nome='reprecificar_materiais').situacao, Trabalho.CONCLUIDO)
+        # Sem worker, os recorrentes entram na fila junto com o primeiro trabalho
+        self.assertEqual(
+            set(Trabalho.objects.filter(chave__startswith=trabalhos.PREFIXO_RECORRENTE).values_list('nome', flat=True)),
+            {'limpar_trabalhos', 'fotografar_estoque'},
+        )
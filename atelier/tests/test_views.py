@@ -0,0 +1,43 @@
+from decimal import Decimal
+from django.utils import timezone
+from django.test import TestCase
+from django.urls import reverse
+
+from atelier.resumos import dia_local
+from atelier.tests import fabrica
+
+
+class ListaClientesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        fabrica.cliente(nome='Maria Souza', total_gasto=Decimal('150.00'))
+        fabrica.cliente(nome='João Lima', total_gasto=Decimal('20.00'))
+
+    def nomes(self, gasto_minimo):
+        resposta = self.client.get(reverse('atelier:lista_clientes'), {'gasto_minimo': gasto_minimo})
+        self.assertEqual(resposta.status_code, 200)
+        return sorted(cliente.nome for cliente in resposta.context['clientes']), resposta.context['gasto_minimo']
+
+    def test_gasto_minimo(self):
+        self.assertEqual(self.nomes('100,50'), (['Maria Souza'], '100,50'))
+
+    def test_gasto_minimo_invalido_e_ignorado(self):
+        for valor in ('abc', 'NaN', '-nan', 'sNaN', 'Infinity', '-inf'):
+            with self.subTest(valor=valor):
+                self.assertEqual(self.nomes(valor), (['João Lima', 'Maria Souza'], ''))
+
+
+class RelatorioVendasTest(TestCase):
+    def test_ano_fora_do_calendario_volta_para_o_atual(self):
+        hoje = dia_local(timezone.now())
+        for ano in ('0', '1', '-5', '9999', '10000', 'abc'):
+            with self.subTest(ano=ano):
+                resposta = self.client.get(reverse('atelier:relatorio_vendas'), {'ano': ano, 'mes': '12'})
+                self.assertEqual(resposta.status_code, 200)
+                self.assertEqual((resposta.context['ano'], resposta.context['mes']), (hoje.year, hoje.month))
+
+    def test_anos_nos_limites(self):
+        for ano in (2, 9998):
+            with self.subTest(ano=ano):
+                resposta = self.client.get(reverse('atelier:relatorio_vendas'), {'ano': ano, 'mes': '12'})
+                self.assertEqual((resposta.context['ano'], resposta.context['mes']), (ano, 12))
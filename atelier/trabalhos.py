@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from atelier.models import Trabalho
+
+logger = logging.getLogger(__name__)
+
+# Tempo que um trabalho fica reservado para o processo que o pegou; se o
+# processo cair no meio, outro retoma o trabalho depois disso
+RESERVA = timedelta(minutes=30)
+
+# Nova tentativa em 1min, 2min, 4min... até 1h entre tentativas
+ESPERA_INICIAL = 60  # segundos
+ESPERA_MAXIMA = 60 * 60
+
+# Trabalhos vencidos examinados por vez na disputa entre os processos
+CANDIDATOS = 10
+
+# nome -> (função, intervalo dos recorrentes ou None)
+REGISTRO = {}
+
+# Prefixo da chave dos trabalhos recorrentes (uma execução pendente por trabalho)
+PREFIXO_RECORRENTE = 'recorrente:'
+
+# Sem worker: filtros dos trabalhos a executar neste processo; os enfileirados
+# durante a execução de outro entram no mesmo laço
+_executando_agora = threading.local()
+
+
+def trabalho(funcao=None, *, a_cada=None):
+    """
+    Registra a função como trabalho em segundo plano (argumentos nomeados e
+    serializáveis em JSON). Com a_cada, o trabalho é recorrente: o worker
+    mantém sempre uma execução agendada.
+    """
+    def registrar(funcao):
+        REGISTRO[funcao.__name__] = (funcao, a_cada)
+        return funcao
+    return registrar(funcao) if funcao else registrar
+
+
+# --- FILA ---
+def enfileirar(nome, argumentos=None, executar_em=None, chave='', maximo_tentativas=3):
+    """
+    Coloca o trabalho na fila (na transação atual, se houver: só fica
+    visível para os workers depois do commit). Com chave, não duplica um
+    trabalho igual que ainda está pendente. Sem worker
+    (TRABALHOS['EM_SEGUNDO_PLANO'] desligado), este trabalho e os recorrentes
+    vencidos rodam neste processo logo depois do commit.
+    """
+    novo = _inserir(nome, argumentos, executar_em, chave, maximo_tentativas)
+    if not settings.TRABALHOS['EM_SEGUNDO_PLANO']:
+        # Com chave, o INSERT pode ter sido ignorado: vale o pendente que já estava lá
+        filtro = Q(pk=novo.pk) if novo.pk is not None else Q(chave=chave)
+        transaction.on_commit(lambda: executar_sem_worker(filtro))
+
+
+def _inserir(nome, argumentos=None, executar_em=None, chave='', maximo_tentativas=3):
+    if nome not in REGISTRO:
+        raise ValueError(f"Trabalho desconhecido: {nome}")
+    novo = Trabalho(
+        nome=nome, argumentos=argumentos or {}, chave=chave, maximo_tentativas=maximo_tentativas,
+        executar_em=executar_em or timezone.now(),
+    )
+    if chave:
+        # INSERT OR IGNORE na restrição única das chaves pendentes
+        Trabalho.objects.bulk_create([novo], ignore_conflicts=True)
+    else:
+        novo.save()
+    return novo
+
+
+def executar_sem_worker(filtro):
+    """
+    Sem worker, não há quem agende nem execute os recorrentes: eles entram na
+    fila aqui e rodam junto com o trabalho que acabou de ser enfileirado. O
+    resto da fila fica para "executar_trabalhos --uma-vez": uma requisição
+    não paga pelo atraso acumulado das outras.
+    """
+    agendar_recorrentes()
+    return executar_vencidos(filtro | Q(chave__startswith=PREFIXO_RECORRENTE))
+
+
+def executar_vencidos(filtro=None):
+    """Executa neste processo os trabalhos vencidos da fila que atendem ao filtro (sem filtro, todos); devolve quantos"""
+    pendentes = getattr(_executando_agora, 'filtros', None)
+    if pendentes is not None:
+        pendentes.append(filtro)
+        return 0
+    _executando_agora.filtros = pendentes = [filtro]
+    try:
+        trabalhador = nome_do_trabalhador()
+        executados = 0
+        while pendentes:
+            filtro_atual = pendentes.pop(0)
+            while (trabalho_atual := reservar(trabalhador, filtro_atual)) is not None:
+                executar(trabalho_atual)
+                executados += 1
+        return executados
+    finally:
+        _executando_agora.filtros = None
+
+
+def agendar_recorrentes():
+    """Garante uma execução pendente de cada trabalho recorrente (sem duplicar)"""
+    recorrentes = [nome for nome, (_funcao, a_cada) in REGISTRO.items() if a_cada]
+    agendados = set(Trabalho.objects.filter(
+        nome__in=recorrentes, situacao__in=[Trabalho.PENDENTE, Trabalho.EXECUTANDO],
+    ).values_list('nome', flat=True))
+    for nome in recorrentes:
+        if nome not in agendados:
+            _inserir(nome, chave=f'{PREFIXO_RECORRENTE}{nome}')
+
+
+def _proxima_execucao(anterior, a_cada):
+    """Mantém o horário da série (todo dia às 3h continua às 3h), pulando as execuções perdidas"""
+    agora = timezone.now()
+    atrasadas = max(0, (agora - anterior) // a_cada)
+    return anterior + a_cada * (atrasadas + 1)
+
+
+def reservar(trabalhador, filtro=None):
+    """
+    Pega o próximo trabalho vencido (que atenda ao filtro, se houver) para
+    este processo. Entre os candidatos, o UPDATE condicional (compare-and-swap
+    na situação e na reserva lidas) só funciona para um processo: quem perde
+    a disputa tenta o próximo. Reservas vencidas (processo que caiu) também
+    são candidatas.
+    """
+    agora = timezone.now()
+    vencidos = Trabalho.objects.filter(
+        Q(situacao=Trabalho.PENDENTE, executar_em__lte=agora)
+        | Q(situacao=Trabalho.EXECUTANDO, reservado_ate__lt=agora)
+    ).order_by('executar_em', 'pk')
+    if filtro is not None:
+        vencidos = vencidos.filter(filtro)
+    for pk, situacao, reservado_ate in vencidos.values_list('pk', 'situacao', 'reservado_ate')[:CANDIDATOS]:
+        reservou = Trabalho.objects.filter(pk=pk, situacao=situacao, reservado_ate=reservado_ate).update(
+            situacao=Trabalho.EXECUTANDO, reservado_por=trabalhador, reservado_ate=agora + RESERVA,
+            tentativas=F('tentativas') + 1,
+        )
+        if reservou:
+            return Trabalho.objects.get(pk=pk)
+    return None
+
+
+def _concluir(trabalho_atual, **campos):
+    # Só grava se a reserva ainda é deste processo (ninguém retomou o trabalho)
+    Trabalho.objects.filter(
+        pk=trabalho_atual.pk, situacao=Trabalho.EXECUTANDO, reservado_por=trabalho_atual.reservado_por,
+    ).update(reservado_ate=None, **campos)
+
+
+def executar(trabalho_atual):
+    """Executa o trabalho reservado e grava o resultado (ou agenda nova tentativa)"""
+    funcao, a_cada = REGISTRO.get(trabalho_atual.nome, (None, None))
+    try:
+        if funcao is None:
+            raise LookupError(f"Trabalho desconhecido: {trabalho_atual.nome}")
+        resultado = funcao(**trabalho_atual.argumentos)
+    except Exception:
+        erro = traceback.format_exc()
+        logger.error("Trabalho %s falhou (tentativa %s):\n%s", trabalho_atual, trabalho_atual.tentativas, erro)
+        if funcao is not None and trabalho_atual.tentativas < trabalho_atual.maximo_tentativas:
+            espera = min(ESPERA_MAXIMA, ESPERA_INICIAL * 2 ** (trabalho_atual.tentativas - 1))
+            try:
+                with transaction.atomic():
+                    _concluir(
+                        trabalho_atual, situacao=Trabalho.PENDENTE, ultimo_erro=erro,
+                        executar_em=timezone.now() + timedelta(seconds=espera),
+                    )
+            except IntegrityError:
+                # Entrou outro igual (mesma chave) enquanto este executava: a nova tentativa fica com ele
+                _concluir(
+                    trabalho_atual, situacao=Trabalho.FALHOU, concluido_em=timezone.now(),
+                    ultimo_erro=erro + "\nSem nova tentativa: já há um trabalho pendente com a mesma chave.",
+                )
+        else:
+            _concluir(trabalho_atual, situacao=Trabalho.FALHOU, ultimo_erro=erro, concluido_em=timezone.now())
+        sucesso = False
+    else:
+        _concluir(
+            trabalho_atual, situacao=Trabalho.CONCLUIDO, concluido_em=timezone.now(),
+            resultado=_para_json(resultado),
+        )
+        sucesso = True
+
+    if a_cada:
+        # Recorrente: a próxima execução entra na fila, tenha esta dado certo ou não
+        _inserir(
+            trabalho_atual.nome, executar_em=_proxima_execucao(trabalho_atual.executar_em, a_cada),
+            chave=f'{PREFIXO_RECORRENTE}{trabalho_atual.nome}',
+        )
+    return sucesso
+
+
+def _para_json(valor):
+    """O retorno da função como JSON (Decimal e datas viram texto; o resto, a representação)"""
+    try:
+        return json.loads(json.dumps(valor, cls=DjangoJSONEncoder))
+    except TypeError:
+        return repr(valor)
+
+
+def nome_do_trabalhador():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def trabalhar(intervalo=5, parar=lambda: False, somente_vencidos=False):
+    """
+    Laço de um processo worker: executa um trabalho por vez; com a fila
+    vazia, espera `intervalo` segundos. somente_vencidos: termina quando não
+    houver mais nada vencido. Devolve quantos trabalhos foram executados.
+    """
+    trabalhador = nome_do_trabalhador()
+    executados = 0
+    while not parar():
+        close_old_connections()
+        try:
+            trabalho_atual = reservar(trabalhador)
+        except DatabaseError:
+            # Banco ocupado por outro processo (SQLite trava na escrita): tenta de novo depois
+            logger.warning("Fila indisponível, nova tentativa em %ss", intervalo, exc_info=True)
+            time.sleep(intervalo)
+            continue
+        if trabalho_atual is not None:
+            try:
+                executar(trabalho_atual)
+            except Exception:
+                # Erro ao gravar o resultado (a função em si já é tratada no executar): o
+                # worker segue; a reserva vence e o trabalho é retomado por outro processo
+                logger.exception("Erro no worker ao executar %s", trabalho_atual)
+            executados += 1
+        elif somente_vencidos:
+            break
+        else:
+            time.sleep(intervalo)
+    return executados
+
+
+def situacao_da_fila():
+    """Para o admin: por trabalho, pendentes (e quantos já atrasados), em execução e resultados das últimas 24h"""
+    agora = timezone.now()
+    ultimo_dia = agora - timedelta(days=1)
+    atrasado = Q(situacao=Trabalho.PENDENTE, executar_em__lte=agora)
+    return list(
+        Trabalho.objects
+        .filter(Q(situacao__in=[Trabalho.PENDENTE, Trabalho.EXECUTANDO]) | Q(concluido_em__gte=ultimo_dia))
+        .values('nome')
+        .annotate(
+            pendentes=Count('pk', filter=Q(situacao=Trabalho.PENDENTE)),
+            atrasados=Count('pk', filter=atrasado),
+            mais_antigo=Min('executar_em', filter=atrasado),
+            executando=Count('pk', filter=Q(situacao=Trabalho.EXECUTANDO)),
+            concluidos=Count('pk', filter=Q(situacao=Trabalho.CONCLUIDO)),
+            falhas=Count('pk', filter=Q(situacao=Trabalho.FALHOU)),
+        )
+        .order_by('nome')
+    )
+
+
+# --- TRABALHOS ---
+# As funções importam o que usam na hora: o estoque e os receivers dos
+# modelos importam este módulo para enfileirar trabalhos.
+@trabalho
+def reprecificar_materiais(material_ids):
+    """Produtos que usam os materiais cujo preço mudou"""
+    from atelier.dashboard import invalidar_totais_dashboard
+    from atelier.reprecificacao import reprecificar_por_materiais
+
+    total = reprecificar_por_materiais(material_ids)
+    # A atualização em massa não passa pelos signals que invalidam os totais
+    invalidar_totais_dashboard()
+    return total
+
+
+@trabalho
+def reprecificar_catalogo():
+    from atelier.dashboard import invalidar_totais_dashboard
+    from atelier.reprecificacao import reprecificar_produtos
+
+    total = reprecificar_produtos()
+    invalidar_totais_dashboard()
+    return total
+
+
+@trabalho
+def recalcular_resumos_vendas():
+    from atelier.resumos import recalcular_resumos
+
+    return list(recalcular_resumos())
+
+
+@trabalho(a_cada=timedelta(days=1))
+def limpar_trabalhos(dias=7):
+    """Apaga os trabalhos concluídos há mais de `dias` dias (as falhas ficam para consulta)"""
+    limite = timezone.now() - timedelta(days=dias)
+    return Trabalho.objects.filter(situacao=Trabalho.CONCLUIDO, concluido_em__lt=limite).delete()[0]
+
+
+@trabalho(a_cada=timedelta(days=1))
+def fotografar_estoque():
+    from atelier.estoque import gerar_fotografias
+
+    return gerar_fotografias()
+
+
+def reprecificar_em_segundo_plano(material_ids):
+    """
+    Reprecificação pela mudança de preço dos materiais, fora da requisição.
+    Para um material só, não entra de novo na fila enquanto a anterior não começou.
+    """
+    material_ids = sorted(material_ids)
+    chave = f'reprecificar-material:{material_ids[0]}' if len(material_ids) == 1 else ''
+    enfileirar('reprecificar_materiais', {'material_ids': material_ids}, chave=chave)
@@ -17,11 +17,26 @@ urlpatterns = [
     path('materiais/excluir/<int:material_id>/', views.excluir_material, name='excluir_material'),
     path('vender/<int:produto_id>/', views.registrar_venda, name='registrar_venda'),
     path('venda/recibo/<int:venda_id>/', views.gerar_recibo, name='gerar_recibo'),
+    path('venda/recibo/<int:venda_id>/pdf/', views.recibo_pdf, name='recibo_pdf'),
+    path('vendas/recibos/', views.recibos_em_lote, name='recibos_em_lote'),
     path('material/entrada/', views.registrar_entrada, name='registrar_entrada'),
+    path('materiais/importar/', views.importar_estoque, name='importar_estoque'),
+    path('materiais/reposicao/', views.reposicao, name='reposicao'),
     # URLs de Clientes
     path('clientes/', views.lista_clientes, name='lista_clientes'),
     path('clientes/novo/', views.cadastrar_cliente, name='cadastrar_cliente'),
+    path('clientes/autocompletar/', views.autocompletar_clientes, name='autocompletar_clientes'),
     path('clientes/<int:cliente_id>/', views.detalhe_cliente, name='detalhe_cliente'),
     path('clientes/<int:cliente_id>/editar/', views.editar_cliente, name='editar_cliente'),
     path('clientes/<int:cliente_id>/excluir/', views.excluir_cliente, name='excluir_cliente'),
+    # Exportação
+    path('exportar/', views.exportar_dados, name='exportar_dados'),
+    # Busca
+    path('busca/', views.busca, name='busca'),
+    # Relatórios
+    path('relatorios/vendas/', views.relatorio_vendas, name='relatorio_vendas'),
+    # Métricas para o Prometheus
+    path('metrics', views.metricas, name='metricas'),
+    # Instrumentação das requisições (só para a equipe)
+    path('instrumentacao/', views.instrumentacao, name='instrumentacao'),
 ]
\ No newline at end of file
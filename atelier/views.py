@@ -1,24 +1,63 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from atelier.models import Produto, Material, Venda, EntradaMaterial, CategoriaMaterial, Cliente
-from atelier.forms import ProdutoForm, ItemComposicaoFormSet, MaterialForm, VendaForm, EntradaMaterialForm, CategoriaMaterialForm, ClienteForm
-from django.db.models import Sum, F, Prefetch
+from atelier.models import Produto, Material, Venda, CategoriaMaterial, Cliente, ResumoVendasMes, ItemComposicao, AlertaEstoque
+from atelier.forms import ProdutoForm, ItemComposicaoFormSet, MaterialForm, VendaForm, EntradaMaterialForm, CategoriaMaterialForm, ClienteForm, ImportacaoEstoqueForm, ExportacaoForm, RecibosLoteForm
+from atelier.dashboard import obter_totais_dashboard
+from atelier.paginacao import paginar_por_chave
+from atelier.importacao import importar_estoque as importar_arquivo_estoque, detectar_formato
+from atelier.exportacao import gerar_exportacao, nome_do_arquivo, TIPOS_CONTEUDO
+from atelier.mensagens import link_whatsapp as link_whatsapp_da_venda
+from atelier.recibos import obter_recibo, gerar_lote_pdf, nome_do_lote
+from atelier.resumos import totais_por_mes, totais_por_dia, dia_local
+from atelier.armazenamento import e_nome_por_conteudo, hash_do_nome
+from atelier.pdf import documento_unico
+from atelier.busca import buscar, autocompletar_clientes as sugerir_clientes, TIPOS as TIPOS_BUSCA
+from atelier.metricas import incrementar, exportar as exportar_metricas
+from atelier.instrumentacao import INTERVALOS_MS, estatisticas as estatisticas_instrumentacao
+from atelier.precificacao import precificar
+from django.db.models import Prefetch
 from decimal import Decimal
 from django.contrib import messages
-from urllib.parse import quote
-from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
 from django.utils import timezone
 import datetime
+import io
+import logging
+import os
+import stat
+
+logger = logging.getLogger(__name__)
+
+
+# Materiais no aviso de reposição da página inicial (o resto fica na página de reposição)
+ALERTAS_NA_PAGINA_INICIAL = 10
+
+
+def _materiais_alerta():
+    """
+    Materiais no estoque mínimo ou abaixo, pelo índice parcial da coluna
+    estoque_baixo; um a mais só para saber se o aviso precisa do "ver todos".
+    """
+    materiais = list(
+        Material.objects.filter(estoque_baixo=True).order_by('nome', 'id')[:ALERTAS_NA_PAGINA_INICIAL + 1]
+    )
+    return materiais[:ALERTAS_NA_PAGINA_INICIAL], len(materiais) > ALERTAS_NA_PAGINA_INICIAL
 
 
 def index(request):
     # Filtramos apenas os materiais que estão abaixo ou igual ao estoque mínimo
-    materiais_alerta = Material.objects.filter(quantidade_estoque__lte=models.F('estoque_minimo'))
+    materiais_alerta, mais_alertas = _materiais_alerta()
     
     # Pegamos as últimas 5 vendas para um resumo rápido
     ultimas_vendas = Venda.objects.order_by('-data_venda')[:5]
     
     return render(request, 'atelier/lista_produtos.html', {
         'materiais_alerta': materiais_alerta,
+        'mais_alertas': mais_alertas,
         'ultimas_vendas': ultimas_vendas
     })
 
@@ -30,6 +69,7 @@ def registrar_entrada(request):
         form = EntradaMaterialForm(request.POST)
         if form.is_valid():
             form.save()
+            incrementar('atelier_entradas_estoque_total')
             return redirect('atelier:lista_materiais')
     else:
         # Se veio um ID na URL, já deixa esse material selecionado no formulário
@@ -39,6 +79,22 @@ def registrar_entrada(request):
     return render(request, 'atelier/registrar_entrada.html', {'form': form})
    
 
+def importar_estoque(request):
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacaoEstoqueForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['arquivo']
+            # Lê o upload como texto direto do arquivo temporário, sem carregar tudo na memória
+            arquivo = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            resultado = importar_arquivo_estoque(arquivo, detectar_formato(upload.name))
+            form = ImportacaoEstoqueForm()
+    else:
+        form = ImportacaoEstoqueForm()
+
+    return render(request, 'atelier/importar_estoque.html', {'form': form, 'resultado': resultado})
+
+
 def cadastrar_categoria(request):
     if request.method == 'POST':
         form = CategoriaMaterialForm(request.POST)
@@ -80,26 +136,48 @@ def cadastrar_material_modal(request):
     return JsonResponse({'success': False}, status=400)
 
 def lista_materiais(request):
-    # Cria uma instrução de busca para materiais já ordenada
-    prefetch_materiais = Prefetch(
-        'materiais', 
-        queryset=Material.objects.all().order_by('nome')
-    )
-    
-    # Aplica essa instrução na busca das categorias
-    categorias = CategoriaMaterial.objects.prefetch_related(prefetch_materiais).all().order_by('nome')
-    
-    # Busca materiais sem categoria e ordena alfabeticamente
-    materiais_sem_categoria = Material.objects.filter(categoria__isnull=True).order_by('nome')
+    # Filtros da busca (nome e categoria; "sem" = materiais sem categoria)
+    busca = request.GET.get('q', '').strip()
+    categoria = request.GET.get('categoria', '')
+
+    materiais = Material.objects.select_related('categoria')
+    if busca:
+        materiais = materiais.filter(nome__icontains=busca)
+    if categoria == 'sem':
+        materiais = materiais.filter(categoria__isnull=True)
+    elif categoria.isdigit():
+        materiais = materiais.filter(categoria_id=categoria)
+
+    # Página atual, ordenada por nome (ver Meta.indexes do Material)
+    pagina = paginar_por_chave(materiais, ('nome', 'id'), request.GET.get('cursor'))
     
     form_modal = MaterialForm()
     
     return render(request, 'atelier/lista_materiais.html', {
-        'categorias': categorias,
-        'materiais_sem_categoria': materiais_sem_categoria,
+        'pagina': pagina,
+        'categorias': CategoriaMaterial.objects.order_by('nome'),
+        'busca': busca,
+        'categoria_selecionada': categoria,
         'form_modal': form_modal,
     })
 
+# Passagens pelo estoque mínimo mostradas na página de reposição
+ULTIMAS_PASSAGENS = 20
+
+
+def reposicao(request):
+    # Só os materiais com estoque baixo, pelo índice parcial (nome, id) da coluna estoque_baixo
+    materiais = Material.objects.filter(estoque_baixo=True).select_related('categoria')
+    pagina = paginar_por_chave(materiais, ('nome', 'id'), request.GET.get('cursor'))
+
+    # Quem entrou ou saiu do alerta por último
+    passagens = AlertaEstoque.objects.select_related('material').order_by('-data', '-id')[:ULTIMAS_PASSAGENS]
+
+    return render(request, 'atelier/reposicao.html', {
+        'pagina': pagina,
+        'passagens': passagens,
+    })
+
 def editar_material(request, material_id):
     # Busca o material pelo ID ou retorna erro 404 se não existir
     material = get_object_or_404(Material, pk=material_id)
@@ -179,7 +257,7 @@ def criar_produto(request):
             produto = form.save(commit=False)
             
             # --- NÃO PRECISA MAIS DE CONVERSÃO MANUAL AQUI ---
-            # O get_tempo_em_decimal() do modelo cuidará disso na hora do cálculo
+            # O cálculo do preço (atelier/precificacao.py) lê as horas direto do TimeField
             
             produto.save()
             
@@ -202,67 +280,51 @@ def criar_produto(request):
     })  
     
 def detalhar_produto(request, produto_id):
-    # Busca o produto ou retorna 404
-    produto = get_object_or_404(Produto, pk=produto_id)
-    
-    # --- CORREÇÃO AQUI ---
-    # Busca o custo dos materiais (retorna Decimal)
-    custo_materiais = produto.get_custo_total_materiais()
-    
-    # Converte o tempo para Decimal antes de multiplicar (retorna Decimal)
-    tempo_decimal = produto.get_tempo_em_decimal()
-    custo_mao_de_obra = tempo_decimal * produto.valor_hora_trabalho
-    
-    # Cálculos usando os valores já corrigidos
-    preco_final = produto.get_preco_final_sugerido()
-    valor_lucro = preco_final - (custo_materiais + custo_mao_de_obra)
-    custo_total_base = custo_materiais + custo_mao_de_obra
-    # ---------------------
+    # Produto com a composição e os materiais em uma consulta a mais (não uma por item)
+    produto = get_object_or_404(
+        Produto.objects.prefetch_related(Prefetch('materiais', queryset=ItemComposicao.objects.select_related('material'))),
+        pk=produto_id,
+    )
+    itens = produto.materiais.all()
 
-    context = {
+    # Detalhamento do preço numa passada só pelos itens já carregados (os mesmos da tabela)
+    return render(request, 'atelier/detalhe_produto.html', {
         'produto': produto,
-        'custo_materiais': custo_materiais,
-        'custo_mao_de_obra': custo_mao_de_obra,
-        'custo_total_base': custo_total_base,
-        'preco_final': preco_final,
-        'valor_lucro': valor_lucro,
-    }
-    
-    return render(request, 'atelier/detalhe_produto.html', context)
+        'itens': itens,
+        'precos': precificar(produto, itens),
+    })
 
 def lista_produtos(request):
-    # 1. Buscar todos os produtos (essencial para a sua tabela funcionar)
-    produtos = Produto.objects.all().order_by('-id')
-    
-    # 2. Filtrar materiais para o alerta (quantidade <= estoque_minimo)
-    materiais_alerta = Material.objects.filter(quantidade_estoque__lte=F('estoque_minimo'))
-    
-    # 3. Cálculos dos Cards (Investimento, Faturamento, Lucro)
-    total_estoque_valor = sum(m.quantidade_estoque * m.preco_unitario for m in Material.objects.all())
-    
-    produtos_disponiveis = [p for p in produtos if not p.esta_vendido()]
-    faturamento_potencial = sum(p.get_preco_final_sugerido() for p in produtos_disponiveis)
-    lucro_estimado = sum(p.get_lucro_liquido() for p in produtos_disponiveis)
+    # 1. Produtos (custo, preço e lucro já vêm das colunas calculadas)
+    busca = request.GET.get('q', '').strip()
+    situacao = request.GET.get('situacao', '')
+
+    produtos = Produto.objects.com_situacao_venda()
+    if busca:
+        produtos = produtos.filter(nome__icontains=busca)
+    if situacao == 'disponivel':
+        produtos = produtos.filter(vendido=False)
+    elif situacao == 'vendido':
+        produtos = produtos.filter(vendido=True)
+
+    # Página atual, do mais novo para o mais antigo
+    pagina = paginar_por_chave(produtos, ('-id',), request.GET.get('cursor'))
     
-    # --- NOVO CÁLCULO FINANCEIRO REAL ---
-    # 1. Total faturado (soma de todas as vendas)
-    total_faturado_real = Venda.objects.aggregate(total=Sum('valor_venda'))['total'] or 0
+    # 2. Materiais para o alerta (quantidade <= estoque_minimo, pela coluna indexada)
+    materiais_alerta, mais_alertas = _materiais_alerta()
     
-    # 2. Lucro Real Acumulado
-    # Buscamos produtos que têm venda associada
-    produtos_vendidos = Produto.objects.filter(vendas__isnull=False).distinct()
-    lucro_real_acumulado = sum(p.get_lucro_liquido() for p in produtos_vendidos)
-    # -------------------------------------
+    # 3. Cards (Investimento, Faturamento, Lucro, Histórico Real), vindos do cache
+    totais = obter_totais_dashboard()
 
     # 4. Enviar TUDO para o template
     return render(request, 'atelier/lista_produtos.html', {
-        'produtos': produtos,
+        'produtos': pagina,
+        'pagina': pagina,
+        'busca': busca,
+        'situacao': situacao,
         'materiais_alerta': materiais_alerta,
-        'total_estoque_valor': total_estoque_valor,
-        'faturamento_potencial': faturamento_potencial,
-        'lucro_estimado': lucro_estimado,
-        'total_faturado_real': total_faturado_real,
-        'lucro_real_acumulado': lucro_real_acumulado,
+        'mais_alertas': mais_alertas,
+        **totais,
     })
     
 def registrar_venda(request, produto_id):
@@ -281,17 +343,13 @@ def registrar_venda(request, produto_id):
             venda.data_venda = timezone.now()
             
             venda.save()
+            incrementar('atelier_vendas_total', metodo=venda.metodo_pagamento)
+            incrementar('atelier_vendas_valor_reais_total', float(venda.valor_venda))
             # ---------------------
             
-            # ... Lógica do WhatsApp (igual antes) ...
-            link_whatsapp = ""
-            if venda.cliente:
-                mensagem = (
-                    f"Olá {venda.cliente.nome}! "
-                    f"Segue o recibo da sua compra: {venda.produto.nome}. "
-                    f"Valor: R$ {venda.valor_venda:.2f}"
-                )
-                link_whatsapp = f"https://wa.me/55{venda.cliente.telefone}?text={quote(mensagem)}"
+            # O recibo já está na caixa de saída do WhatsApp (gravado junto com a
+            # venda); o link fica para enviar à mão pelo celular
+            link_whatsapp = link_whatsapp_da_venda(venda)
 
             messages.success(request, f"Venda de {produto.nome} registrada!")
             return render(request, 'atelier/venda_confirmada.html', {
@@ -299,26 +357,84 @@ def registrar_venda(request, produto_id):
                 'link_whatsapp': link_whatsapp
             })
         else:
-            # DICA: Ver o erro no terminal
-            print("❌ FORMULÁRIO INVÁLIDO")
-            print(form.errors) 
-            
+            # Os erros aparecem no formulário; no log só para depuração
+            logger.debug("Venda do produto %s recusada: %s", produto.pk, form.errors.as_json())
+
     else:
-        preco_sugerido = round(produto.get_preco_final_sugerido(), 2)
+        preco_sugerido = produto.preco_sugerido
         form = VendaForm(initial={'valor_venda': preco_sugerido})
 
     return render(request, 'atelier/registrar_venda.html', {'form': form, 'produto': produto})
 
 # A gerar_recibo continua igual, ela serve para imprimir/ver o PDF
 def gerar_recibo(request, venda_id):
-    venda = get_object_or_404(Venda, id=venda_id)
-    return render(request, 'atelier/recibo.html', {'venda': venda})
+    # Recibo montado quando a venda foi salva: uma consulta, nada é renderizado de novo
+    return render(request, 'atelier/recibo.html', {'recibo': obter_recibo(venda_id)})
+
+
+def recibo_pdf(request, venda_id):
+    recibo = obter_recibo(venda_id)
+    resposta = HttpResponse(documento_unico(recibo.pagina_pdf), content_type='application/pdf')
+    resposta['Content-Disposition'] = f'inline; filename="recibo-{recibo.venda_id}.pdf"'
+    return resposta
+
+
+def recibos_em_lote(request):
+    """
+    Todos os recibos de um período num PDF só (uma página por venda), para
+    imprimir de uma vez. O arquivo é enviado em streaming, em blocos.
+    """
+    form = RecibosLoteForm(request.GET or None)
+    if not form.is_valid():
+        return render(request, 'atelier/recibos_lote.html', {'form': form})
+
+    inicio, fim = form.cleaned_data['inicio'], form.cleaned_data['fim']
+    resposta = StreamingHttpResponse(gerar_lote_pdf(inicio, fim), content_type='application/pdf')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_do_lote(inicio, fim)}"'
+    return resposta
 
 
 # LISTAGEM GERAL
+ORDENACOES_CLIENTES = {
+    'nome': ('nome', 'id'),
+    # Melhores clientes primeiro (maior total gasto)
+    'melhores': ('-total_gasto', '-id'),
+}
+
 def lista_clientes(request):
-    clientes = Cliente.objects.all().order_by('nome')
-    return render(request, 'atelier/lista_clientes.html', {'clientes': clientes})
+    busca = request.GET.get('q', '').strip()
+    ordem = request.GET.get('ordem', 'nome')
+    if ordem not in ORDENACOES_CLIENTES:
+        ordem = 'nome'
+    gasto_minimo = request.GET.get('gasto_minimo', '').strip()
+
+    clientes = Cliente.objects.all()
+    if busca:
+        clientes = clientes.filter(nome__icontains=busca)
+    if gasto_minimo:
+        try:
+            valor_minimo = Decimal(gasto_minimo.replace(',', '.'))
+        except ArithmeticError:
+            valor_minimo = None
+        # NaN e infinito são Decimal válidos, mas não servem de filtro
+        if valor_minimo is not None and valor_minimo.is_finite():
+            clientes = clientes.filter(total_gasto__gte=valor_minimo)
+        else:
+            gasto_minimo = ''
+
+    # Página atual pela ordenação escolhida (ver Meta.indexes do Cliente)
+    pagina = paginar_por_chave(clientes, ORDENACOES_CLIENTES[ordem], request.GET.get('cursor'))
+    return render(request, 'atelier/lista_clientes.html', {
+        'clientes': pagina,
+        'pagina': pagina,
+        'busca': busca,
+        'ordem': ordem,
+        'gasto_minimo': gasto_minimo,
+    })
+
+def autocompletar_clientes(request):
+    """Sugestões de clientes (JSON) por parte do telefone ou do nome, usadas no registro de venda"""
+    return JsonResponse({'resultados': sugerir_clientes(request.GET.get('q', ''))})
 
 # CADASTRO
 def cadastrar_cliente(request):
@@ -352,16 +468,176 @@ def excluir_cliente(request, cliente_id):
     return render(request, 'atelier/confirmar_exclusao.html', {'item': cliente, 'tipo': 'cliente'})
 
 # DETALHES E HISTÓRICO DE COMPRAS (A parte "Prudente")
+ULTIMAS_COMPRAS = 20
+
 def detalhe_cliente(request, cliente_id):
     cliente = get_object_or_404(Cliente, pk=cliente_id)
-    # Buscamos as vendas vinculadas a este cliente específico
-    compras = cliente.vendas.all().order_by('-data_venda')
-    total_compras = compras.aggregate(Sum('valor_venda'))['valor_venda__sum'] or 0
+    # Totais vêm das estatísticas guardadas no cliente; das vendas lemos só as
+    # últimas (índice cliente + data), sem percorrer o histórico inteiro
+    compras = cliente.vendas.select_related('produto').order_by('-data_venda')[:ULTIMAS_COMPRAS]
     return render(request, 'atelier/detalhe_cliente.html', {
         'cliente': cliente,
         'compras': compras,
-        'total_compras': total_compras
+        'ultimas_compras': ULTIMAS_COMPRAS,
     })
 
+# EXPORTAÇÃO
+def exportar_dados(request):
+    """
+    Com os parâmetros na URL devolve o arquivo em streaming: as linhas vão
+    sendo enviadas enquanto são lidas do banco, em blocos.
+    Sem parâmetros mostra o formulário.
+    """
+    form = ExportacaoForm(request.GET or None)
+    if not form.is_valid():
+        return render(request, 'atelier/exportar_dados.html', {'form': form})
+
+    dados = form.cleaned_data
+    resposta = StreamingHttpResponse(
+        gerar_exportacao(dados['conjunto'], dados['formato'], dados['inicio'], dados['fim'], dados['metodo']),
+        content_type=TIPOS_CONTEUDO[dados['formato']],
+    )
+    nome = nome_do_arquivo(dados['conjunto'], dados['formato'], dados['inicio'], dados['fim'])
+    resposta['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return resposta
+
+
+# RELATÓRIO DE VENDAS
+NOMES_MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+def relatorio_vendas(request):
+    """
+    Faturamento mês a mês do ano comparado com o ano anterior, por método de
+    pagamento, e o detalhe diário de um mês. Lê apenas as tabelas de resumo,
+    então o custo não cresce com o histórico de vendas.
+    """
+    hoje = dia_local(timezone.now())
+    try:
+        ano = int(request.GET.get('ano', hoje.year))
+        mes = int(request.GET.get('mes', hoje.month if ano == hoje.year else 12))
+    except ValueError:
+        ano, mes = hoje.year, hoje.month
+    # O relatório lê o ano anterior e o mês seguinte: os dois precisam caber no datetime.date
+    if not datetime.MINYEAR < ano < datetime.MAXYEAR:
+        ano, mes = hoje.year, hoje.month
+    mes = min(max(mes, 1), 12)
+
+    atual = totais_por_mes(ano)
+    anterior = totais_por_mes(ano - 1)
+
+    linhas = []
+    for numero in range(1, 13):
+        receita_anterior = anterior[numero]['receita']
+        variacao = None
+        if receita_anterior:
+            variacao = (atual[numero]['receita'] - receita_anterior) / receita_anterior * 100
+        linhas.append({
+            'numero': numero,
+            'nome': NOMES_MESES[numero - 1],
+            **atual[numero],
+            'receita_anterior': receita_anterior,
+            'variacao': variacao,
+        })
 
+    metodos = dict(Venda.METODO_PAGAMENTO)
+    por_metodo = {}
+    for linha in linhas:
+        for metodo, receita in linha['metodos'].items():
+            por_metodo[metodos.get(metodo, metodo)] = por_metodo.get(metodos.get(metodo, metodo), 0) + receita
 
+    anos = [data.year for data in ResumoVendasMes.objects.dates('mes', 'year')] or [hoje.year]
+
+    return render(request, 'atelier/relatorio_vendas.html', {
+        'ano': ano,
+        'mes': mes,
+        'nome_mes': NOMES_MESES[mes - 1],
+        'anos': anos,
+        'linhas': linhas,
+        'total_receita': sum(linha['receita'] for linha in linhas),
+        'total_receita_anterior': sum(linha['receita_anterior'] for linha in linhas),
+        'total_quantidade': sum(linha['quantidade'] for linha in linhas),
+        'total_lucro': sum(linha['lucro'] for linha in linhas),
+        'por_metodo': sorted(por_metodo.items(), key=lambda item: -item[1]),
+        'dias': totais_por_dia(ano, mes),
+        'grafico': {
+            'meses': NOMES_MESES,
+            'atual': [float(linha['receita']) for linha in linhas],
+            'anterior': [float(linha['receita_anterior']) for linha in linhas],
+        },
+    })
+
+
+# BUSCA GERAL
+def busca(request):
+    """
+    Busca em produtos, materiais, categorias e clientes pelo índice textual,
+    sem diferenciar acentos. Com ?formato=json devolve os resultados para
+    autocompletar.
+    """
+    texto = request.GET.get('q', '').strip()
+    tipo = request.GET.get('tipo') or None
+    if tipo not in TIPOS_BUSCA:
+        tipo = None
+    resultados = buscar(texto, tipo) if texto else []
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({'resultados': resultados})
+    return render(request, 'atelier/busca.html', {
+        'texto': texto,
+        'tipo': tipo,
+        'tipos': TIPOS_BUSCA,
+        'resultados': resultados,
+    })
+
+
+def metricas(request):
+    """Coleta do Prometheus: lê só o arquivo de métricas, nenhuma consulta ao banco principal"""
+    return HttpResponse(exportar_metricas(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+def instrumentacao(request):
+    """
+    Estatísticas da instrumentação por view (tempos, consultas e histograma das
+    últimas requisições deste processo); vazio com INSTRUMENTACAO desligada.
+    """
+    return JsonResponse({'intervalos_ms': INTERVALOS_MS, 'views': estatisticas_instrumentacao()})
+
+
+# Um ano: o máximo que os navegadores respeitam
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+
+def servir_midia(request, caminho):
+    """
+    Arquivos da media (fotos e versões reduzidas). Nomes por conteúdo (hash)
+    nunca mudam: cache imutável, a visita seguinte nem pergunta ao servidor.
+    Os demais (fotos antigas com o nome original) são revalidados pelo ETag
+    e, sem mudança, voltam como 304 sem corpo.
+    """
+    try:
+        completo = safe_join(settings.MEDIA_ROOT, caminho)
+        info = os.stat(completo)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("Arquivo não encontrado.")
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404("Arquivo não encontrado.")
+
+    hash_conteudo = hash_do_nome(caminho)
+    # Sem o hash no nome, tamanho + data de modificação (como fazem nginx e Apache)
+    etag = f'"{hash_conteudo or f"{info.st_mtime_ns:x}-{info.st_size:x}"}"'
+    cabecalhos = {
+        'ETag': etag,
+        'Last-Modified': http_date(info.st_mtime),
+        'Cache-Control': CACHE_IMUTAVEL if e_nome_por_conteudo(caminho) else 'no-cache',
+    }
+
+    # If-None-Match usa comparação fraca: W/"x" vale o mesmo que "x"
+    etags_do_navegador = [valor.removeprefix('W/') for valor in parse_etags(request.headers.get('If-None-Match', ''))]
+    if etag in etags_do_navegador or '*' in etags_do_navegador:
+        resposta = HttpResponseNotModified()
+    else:
+        resposta = FileResponse(open(completo, 'rb'))
+    for nome, valor in cabecalhos.items():
+        resposta.headers[nome] = valor
+    return resposta
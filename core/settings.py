@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
 
+from core.sqlite import banco_sqlite, PERFIL_PADRAO
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,6 +34,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Desligado (INSTRUMENTACAO abaixo), sai da cadeia na inicialização
+    "atelier.instrumentacao.InstrumentacaoMiddleware",
+    "atelier.metricas.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,10 +70,29 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Perfil do SQLite por ambiente (core/sqlite.py): "desempenho" (padrão) usa WAL,
+# conexões persistentes e BEGIN IMMEDIATE; "basico" é o SQLite como vem no Django.
+# Comparação dos dois: python manage.py medir_banco
 DATABASES = {
+    "default": banco_sqlite(
+        os.environ.get("SQLITE_ARQUIVO", BASE_DIR / "db.sqlite3"),
+        os.environ.get("SQLITE_PERFIL", PERFIL_PADRAO),
+    ),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Usado para os totais do dashboard. Em arquivos numa pasta única para todos os
+# processos (workers do gunicorn, worker de trabalhos): a invalidação feita por
+# um vale para todos. A trava do recálculo é um arquivo criado com O_EXCL nesta
+# mesma pasta (o cache.add do cache em arquivo não é atômico entre processos);
+# com Redis (django.core.cache.backends.redis.RedisCache) ela volta a ser o cache.add.
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_PASTA", os.path.join(BASE_DIR, 'cache')),
     }
 }
 
@@ -120,6 +144,66 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads gravados com o nome do hash do conteúdo (deduplicados e com cache imutável)
+STORAGES = {
+    "default": {"BACKEND": "atelier.armazenamento.ArmazenamentoPorConteudo"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Trabalhos em segundo plano (atelier/trabalhos.py): reprecificação pelo preço
+# dos materiais, resumos de vendas... Com TRABALHOS_EM_SEGUNDO_PLANO=1 eles ficam
+# na fila para o worker "python manage.py executar_trabalhos", que passa a ser
+# obrigatório. Sem worker, cada trabalho roda na própria requisição, depois do
+# commit, junto com os recorrentes vencidos (as fotografias do estoque saem no
+# primeiro trabalho do dia; para um horário certo, "executar_trabalhos --uma-vez"
+# no cron).
+TRABALHOS = {
+    "EM_SEGUNDO_PLANO": os.environ.get("TRABALHOS_EM_SEGUNDO_PLANO", "") == "1",
+}
+
+# Envio dos recibos pelo WhatsApp (atelier/mensagens.py), feito pelo worker
+# "python manage.py enviar_mensagens". Sem configuração as mensagens só vão
+# para o log; para a API (ou o servidor falso "python manage.py whatsapp_falso"):
+# WHATSAPP_TRANSPORTE=atelier.mensagens.TransporteHttp WHATSAPP_URL=http://127.0.0.1:8025/
+WHATSAPP = {
+    "TRANSPORTE": os.environ.get("WHATSAPP_TRANSPORTE", "atelier.mensagens.TransporteLog"),
+    "OPCOES": {
+        "url": os.environ.get("WHATSAPP_URL", ""),
+        "token": os.environ.get("WHATSAPP_TOKEN", ""),
+    },
+}
+
+# Instrumentação das requisições (atelier/instrumentacao.py): uma linha de log
+# por requisição com a view, o tempo, as consultas SQL e o tempo dos templates,
+# e aviso quando passa dos orçamentos; as estatísticas por view ficam em
+# /instrumentacao/ (só para a equipe). Ligar com INSTRUMENTACAO=1.
+INSTRUMENTACAO = {
+    "ATIVA": os.environ.get("INSTRUMENTACAO", "") == "1",
+    "ORCAMENTO_CONSULTAS": int(os.environ.get("INSTRUMENTACAO_CONSULTAS", 20)),
+    "ORCAMENTO_MS": int(os.environ.get("INSTRUMENTACAO_MS", 500)),
+}
+
+# Métricas do Prometheus em /metrics (atelier/metricas.py), somadas entre os
+# processos num arquivo SQLite separado do banco principal
+METRICAS = {
+    "ATIVAS": os.environ.get("METRICAS", "1") == "1",
+    "ARQUIVO": os.environ.get("METRICAS_ARQUIVO", os.path.join(BASE_DIR, 'metricas.sqlite3')),
+}
+
+# Os testes gravam as métricas e o cache numa pasta temporária (core/testes.py)
+TEST_RUNNER = "core.testes.ExecutorDeTestes"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "atelier": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
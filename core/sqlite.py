@@ -0,0 +1,71 @@
+"""
+Perfis de desempenho do SQLite, escolhidos por ambiente (variável
+SQLITE_PERFIL, ver settings.py). Os PRAGMAs valem por conexão e são
+aplicados assim que o Django abre cada uma (signal connection_created).
+"""
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PERFIS = {
+    # O SQLite como vem no Django: journal de rollback, uma conexão por requisição
+    'basico': {
+        'pragmas': {},
+        'conn_max_age': 0,
+        'transaction_mode': None,
+    },
+    'desempenho': {
+        'pragmas': {
+            # WAL: leitores não bloqueiam o escritor nem são bloqueados por ele
+            'journal_mode': 'WAL',
+            # Com WAL, NORMAL só sincroniza o disco nos checkpoints (sem risco de corromper;
+            # uma queda de energia pode perder só as últimas transações)
+            'synchronous': 'NORMAL',
+            # Leitura do arquivo por memória mapeada e 64 MB de cache de páginas por conexão
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+            # Espera até 5s pela trava de escrita em vez de falhar com "database is locked"
+            'busy_timeout': 5000,
+            'temp_store': 'MEMORY',
+        },
+        # Conexão reaproveitada entre as requisições (os PRAGMAs rodam uma vez por conexão)
+        'conn_max_age': 600,
+        # BEGIN IMMEDIATE nos atomic(): a trava de escrita é pedida no início da
+        # transação, onde o busy_timeout espera, e não no meio dela (onde o SQLite
+        # desistiria na hora para evitar um deadlock)
+        'transaction_mode': 'IMMEDIATE',
+    },
+}
+
+PERFIL_PADRAO = 'desempenho'
+
+
+def banco_sqlite(nome, perfil=PERFIL_PADRAO):
+    """A entrada de DATABASES para o arquivo SQLite com o perfil escolhido"""
+    if perfil not in PERFIS:
+        raise ValueError(f"Perfil de SQLite desconhecido: {perfil} (opções: {', '.join(PERFIS)})")
+    configuracao = PERFIS[perfil]
+    banco = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': nome,
+        'CONN_MAX_AGE': configuracao['conn_max_age'],
+        # Conexão persistente que caiu é descartada antes de ser usada
+        'CONN_HEALTH_CHECKS': bool(configuracao['conn_max_age']),
+        'OPTIONS': {},
+        # Lido pelo receiver abaixo (o Django ignora chaves que não conhece)
+        'PRAGMAS': configuracao['pragmas'],
+        'PERFIL': perfil,
+    }
+    if configuracao['transaction_mode']:
+        banco['OPTIONS']['transaction_mode'] = configuracao['transaction_mode']
+    return banco
+
+
+@receiver(connection_created)
+def aplicar_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    if pragmas:
+        with connection.cursor() as cursor:
+            for nome, valor in pragmas.items():
+                cursor.execute(f'PRAGMA {nome} = {valor}')
@@ -0,0 +1,39 @@
+"""
+Executor dos testes (TEST_RUNNER em settings.py). As métricas e o cache vão
+para uma pasta temporária, apagada no fim: rodar os testes não deixa nada na
+pasta do projeto nem mistura as contagens (ou os totais em cache) dos testes
+com os de verdade.
+"""
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ExecutorDeTestes(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.pasta_temporaria = tempfile.mkdtemp(prefix='atelier-testes-')
+        self.configuracao_temporaria = override_settings(
+            METRICAS={**settings.METRICAS, 'ARQUIVO': os.path.join(self.pasta_temporaria, 'metricas.sqlite3')},
+            CACHES={
+                apelido: {**cache, 'LOCATION': os.path.join(self.pasta_temporaria, 'cache', apelido)}
+                for apelido, cache in settings.CACHES.items()
+            },
+        )
+        self.configuracao_temporaria.enable()
+
+    def teardown_databases(self, old_config, **kwargs):
+        from atelier import metricas
+
+        # O acumulado é gravado agora, enquanto o banco de teste existe (e não no atexit)
+        metricas.gravar()
+        super().teardown_databases(old_config, **kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        self.configuracao_temporaria.disable()
+        shutil.rmtree(self.pasta_temporaria, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,10 +1,14 @@
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from atelier.views import servir_midia
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("tarefas", include("tarefas.urls")),
+    path("tarefas/", include("tarefas.urls")),
     path('', include('atelier.urls')), # O seu novo sistema
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Media com ETag e cache imutável para os nomes por conteúdo (ver atelier/armazenamento.py)
+    re_path(r'^%s(?P<caminho>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), servir_midia),
+]
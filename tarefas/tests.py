@@ -1,3 +1,25 @@
 from django.test import TestCase
 
-# Create your tests here.
+from atelier.dados_sinteticos import gerar_dados
+from atelier.medicao import urls_das_views, contar_consultas
+
+# Máximo de consultas de cada view (GET) na base sintética de teste (ver atelier/tests/test_orcamentos.py)
+ORCAMENTO_CONSULTAS = {
+    'listar_tarefas': 1,
+    'criar_tarefa': 0,
+    'editar_tarefa': 1,
+    'excluir_tarefa': 1,
+}
+
+
+class OrcamentoConsultasTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados('teste')
+
+    def test_views_dentro_do_orcamento(self):
+        for nome, url, parametros in urls_das_views(modulos=('tarefas.urls',)):
+            with self.subTest(view=nome):
+                self.assertIn(nome, ORCAMENTO_CONSULTAS, f"{nome} sem orçamento de consultas")
+                consultas = contar_consultas(self.client, url, parametros)
+                self.assertLessEqual(consultas, ORCAMENTO_CONSULTAS[nome], f"{url}: {consultas} consultas")